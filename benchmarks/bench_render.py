@@ -0,0 +1,274 @@
+"""Rendering cost benchmarks.
+
+Runs widget actions on the headless backend and reports, per action, the
+output bytes, write syscalls and wall time (p50/p99). Results can be saved
+as JSON to compare between versions:
+
+    python3 benchmarks/bench_render.py --output bench.json
+    python3 benchmarks/bench_render.py --scenario listbox_paging --repeat 1000
+
+Input recorded with zen_tui.record.RecordingBackend can be replayed against
+the example dialog, reporting latency from input to output:
+
+    python3 benchmarks/bench_render.py --replay session.rec
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+sys.path.append(os.path.realpath(os.path.join(os.path.dirname(__file__), "..")))
+
+from zen_tui.backend import HeadlessBackend
+from zen_tui.basewidget import Widget
+from zen_tui.defs import Color, Keys
+from zen_tui.editor import Editor
+from zen_tui.menu import WMenuBar, WMenuBox
+from zen_tui.record import ReplayBackend
+from zen_tui.screen import Screen
+from zen_tui.widgets import ACTION_OK, ACTION_CANCEL, Dialog, WAutoComplete, WButton, WCheckbox, WComboBox, \
+    WDropDown, WFrame, WLabel, WListBox, WMultiEntry, WPasswdEntry, WRadioButton, WTextEntry
+
+
+SCREEN_WIDTH = 100
+SCREEN_HEIGHT = 30
+
+
+def make_words(count: int, seed: int = 0) -> list[str]:
+    rnd = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rnd.choice(letters) for _ in range(rnd.randint(3, 12))) for _ in range(count)]
+
+
+def example_dialog() -> Dialog:
+    """The dialog from example_widgets.py."""
+    d = Dialog(5, 5, 50, 12)
+    d.add(1, 1, "Label:")
+    d.add(11, 1, WLabel("it's me!"))
+    d.add(1, 2, "Entry:")
+    d.add(11, 2, WTextEntry(4, "foo"))
+    d.add(1, 3, "Dropdown:")
+    d.add(11, 3, WDropDown(10, ["Red", "Green", "Yellow"]))
+    d.add(1, 4, "Combo:")
+    d.add(11, 4, WComboBox(8, "fo", ["foo", "foobar", "bar", "long string"]))
+    d.add(1, 5, "Auto complete:")
+    d.add(15, 5, WAutoComplete(8, "fo", ["foo", "foobar", "bar", "car", "dar"]))
+    d.add(1, 6, "Password:")
+    d.add(11, 6, WPasswdEntry(10, ""))
+    d.add(1, 8, "Multiline:")
+    d.add(1, 9, WMultiEntry(26, 3, ["Example", "Text"]))
+    d.add(30, 1, WFrame(18, 6, "Frame"))
+    d.add(31, 2, WCheckbox("State"))
+    d.add(31, 3, WRadioButton(["Red", "Green", "Yellow"]))
+    d.add(30, 8, "List:")
+    d.add(30, 9, WListBox(16, 4, [f"choice{i}" for i in range(10)]))
+    d.add(1, 13, "Button:")
+    d.add(10, 13, WButton(9, "Kaboom!"))
+    d.add(1, 15, "Dialog buttons:")
+    b = WButton(8, "OK")
+    d.add(10, 16, b)
+    b.finish_dialog = ACTION_OK
+    b = WButton(8, "Cancel")
+    d.add(30, 16, b)
+    b.finish_dialog = ACTION_CANCEL
+    return d
+
+
+# Scenarios: name -> (setup(backend) -> state, action(state, i), default repeat count).
+# Setup output isn't measured, each action runs as one frame.
+
+def setup_dialog(_backend):
+    d = example_dialog()
+    d.redraw()
+    return d
+
+
+def action_dialog_redraw(d, _i):
+    d.redraw()
+
+
+def action_dialog_redraw_cls(d, _i):
+    d.attr_color(Color.C_WHITE, Color.C_BLUE)
+    d.cls()
+    d.attr_reset()
+    d.redraw()
+
+
+def setup_listbox(_backend):
+    lb = WListBox(40, SCREEN_HEIGHT - 2, [f"item {i:6d} {w}" for i, w in enumerate(make_words(100_000))])
+    lb.set_xy(2, 1)
+    lb.redraw()
+    return lb
+
+
+def action_listbox_paging(lb, i):
+    lb.handle_input(Keys.KEY_PGDN if i % 50 < 40 else Keys.KEY_PGUP)
+
+
+def setup_autocomplete(_backend):
+    ac = WAutoComplete(20, "", make_words(50_000))
+    return ac, [w[:2] for w in make_words(100, seed=1)]
+
+
+def action_autocomplete(state, i):
+    ac, prefixes = state
+    ac.get_choices(prefixes[i % len(prefixes)])
+
+
+def setup_editor(_backend):
+    e = Editor(0, 1, SCREEN_WIDTH, SCREEN_HEIGHT - 2)
+    e.set_lines([f"{i:5d} " + " ".join(make_words(8, seed=i)) for i in range(10_000)])
+    e.top_line = e.cur_line = 5000
+    e.redraw()
+    return e
+
+
+def action_editor_typing(e, i):
+    e.handle_input(b"abcdefghijklmnopqrstuvwxyz "[i % 27:i % 27 + 1])
+
+
+def setup_large_editor(_backend):
+    e = Editor(0, 1, SCREEN_WIDTH, SCREEN_HEIGHT - 2)
+    e.set_lines([f"{i:6d} " + " ".join(make_words(8, seed=i % 1000)) for i in range(200_000)])
+    e.redraw()
+    return e
+
+
+def action_large_editor_lines(e, i):
+    # Type and split lines near the top of a large file
+    if e.cur_line > 20:
+        e.cur_line = e.row = 0
+    e.handle_input(Keys.KEY_ENTER if i % 2 else b"x")
+
+
+def setup_menu(backend):
+    d = example_dialog()
+    d.redraw()
+    menu_file = WMenuBox([("Open...", "Open"), ("Save", "S"), ("Exit", "ex")])
+    menu_edit = WMenuBox([("Copy", "copy"), ("Paste", "paste")])
+    m = WMenuBar([("File", menu_file), ("Edit", menu_edit), ("About", "About")])
+    m.permanent = True
+    m.redraw()
+    return m, backend
+
+
+def action_menu_open_close(state, _i):
+    m, backend = state
+    m.focus = True
+    # Pull down, and pick an item from the pulldown's own loop
+    backend.feed(b"\x1b[B", b"\r")
+    m.handle_input(Keys.KEY_ENTER)
+
+
+SCENARIOS = {
+    "dialog_redraw": (setup_dialog, action_dialog_redraw, 200),
+    "dialog_redraw_cls": (setup_dialog, action_dialog_redraw_cls, 200),
+    "listbox_paging": (setup_listbox, action_listbox_paging, 500),
+    "autocomplete_get_choices": (setup_autocomplete, action_autocomplete, 50),
+    "editor_typing": (setup_editor, action_editor_typing, 500),
+    "large_editor_lines": (setup_large_editor, action_large_editor_lines, 500),
+    "menu_open_close": (setup_menu, action_menu_open_close, 200),
+}
+
+
+def percentile(values: list[float], p: float) -> float:
+    """Nearest-rank percentile."""
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def run_scenario(name: str, repeat: int | None = None) -> dict:
+    setup, action, default_repeat = SCENARIOS[name]
+    repeat = repeat or default_repeat
+    backend = HeadlessBackend(SCREEN_WIDTH, SCREEN_HEIGHT)
+    Screen.set_backend(backend)
+    Widget._damage.clear()
+    screen = Screen()
+    state = setup(backend)
+    screen.flush()
+    times = []
+    out_bytes = []
+    writes = []
+    for i in range(repeat):
+        start_bytes, start_writes = backend.bytes_written, backend.writes
+        start = time.perf_counter()
+        with screen.frame():
+            action(state, i)
+        times.append((time.perf_counter() - start) * 1000)
+        out_bytes.append(backend.bytes_written - start_bytes)
+        writes.append(backend.writes - start_writes)
+    return {
+        "scenario": name,
+        "actions": repeat,
+        "bytes_per_action": sum(out_bytes) / repeat,
+        "bytes_max": max(out_bytes),
+        "syscalls_per_action": sum(writes) / repeat,
+        "syscalls_max": max(writes),
+        "time_ms_p50": percentile(times, 50),
+        "time_ms_p99": percentile(times, 99),
+    }
+
+
+def run_replay(path: str, realtime: bool = False) -> dict:
+    backend = ReplayBackend.load(path, realtime=realtime)
+    Screen.set_backend(backend)
+    Widget._damage.clear()
+    d = example_dialog()
+    try:
+        d.loop()
+    except EOFError:
+        # Recording is over
+        pass
+    times = [t * 1000 for t in backend.latencies] or [0.0]
+    actions = len(backend.latencies) or 1
+    return {
+        "scenario": "replay:" + os.path.basename(path),
+        "actions": len(backend.latencies),
+        "bytes_per_action": backend.bytes_written / actions,
+        "bytes_max": 0,
+        "syscalls_per_action": backend.writes / actions,
+        "syscalls_max": 0,
+        "time_ms_p50": percentile(times, 50),
+        "time_ms_p99": percentile(times, 99),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", "-o", help="write results as JSON to this file")
+    parser.add_argument("--scenario", "-s", action="append", choices=sorted(SCENARIOS),
+                        help="scenario to run (can be repeated), default all")
+    parser.add_argument("--repeat", "-r", type=int, help="actions per scenario, default per-scenario")
+    parser.add_argument("--replay", action="append", default=[], help="replay recorded input (can be repeated)")
+    parser.add_argument("--realtime", action="store_true", help="replay with recorded pacing")
+    args = parser.parse_args()
+
+    if args.replay:
+        results = [run_replay(path, args.realtime) for path in args.replay]
+    else:
+        results = [run_scenario(name, args.repeat) for name in args.scenario or SCENARIOS]
+
+    print(f"{'scenario':26} {'bytes/act':>10} {'max':>7} {'writes/act':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for r in results:
+        print(f"{r['scenario']:26} {r['bytes_per_action']:10.1f} {r['bytes_max']:7d} "
+              f"{r['syscalls_per_action']:10.2f} {r['time_ms_p50']:8.3f} {r['time_ms_p99']:8.3f}")
+
+    if args.output:
+        report = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "screen": [SCREEN_WIDTH, SCREEN_HEIGHT],
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@
 from zen_tui.menu import WMenuBar, WMenuBox
 from zen_tui.widgets import ACTION_OK, ACTION_CANCEL, Dialog, WLabel, WButton, WListBox, WDropDown
 from zen_tui.context import Context
+from zen_tui.decoder import MouseEvent
 from zen_tui.defs import Color, Keys
 
 
@@ -26,8 +27,12 @@ def main_loop(m):
     """Main Loop."""
     while 1:
         key = m.get_input()
+        if key is None:
+            # Timers, pending redraws or a screen resize are due
+            m.handle_timers()
+            continue
 
-        if isinstance(key, list):
+        if isinstance(key, MouseEvent) and key.action == MouseEvent.PRESS:
             # Mouse click
             x, y = key
             if m.inside(x, y):
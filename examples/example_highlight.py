@@ -0,0 +1,36 @@
+"""This example shows a file (this one by default) with Python syntax highlighting in a CharColorViewer."""
+
+import os
+import sys
+sys.path.append(os.path.realpath(os.path.join(os.path.dirname(__file__), "..")))
+
+from zen_tui.context import Context
+from zen_tui.defs import Color
+from zen_tui.editorext import CharColorViewer
+from zen_tui.highlight import RegexTokenizer
+
+
+KEYWORDS = ("and as assert break class continue def del elif else except finally for from global if import in is "
+            "lambda nonlocal not or pass raise return try while with yield None True False").split()
+
+# Triple-quoted strings span lines, so they have states of their own
+python_tokenizer = RegexTokenizer({
+    "root": (Color.C_WHITE, [
+        (r"#.*", Color.C_CYAN, None),
+        (r'"""', Color.C_GREEN, "dq3"),
+        (r"'''", Color.C_GREEN, "sq3"),
+        (r'"(?:\\.|[^"\\])*"?|' + r"'(?:\\.|[^'\\])*'?", Color.C_GREEN, None),
+        (r"\b(?:%s)\b" % "|".join(KEYWORDS), Color.C_B_YELLOW, None),
+        (r"\b\d+\b", Color.C_MAGENTA, None),
+    ]),
+    "dq3": (Color.C_GREEN, [(r'"""', Color.C_GREEN, "root")]),
+    "sq3": (Color.C_GREEN, [(r"'''", Color.C_GREEN, "root")]),
+})
+
+
+with Context() as ctx:
+    width, height = ctx.screen.screen_size()
+    v = CharColorViewer(0, 0, width, height)
+    v.load_file(sys.argv[1] if len(sys.argv) > 1 else __file__)
+    v.set_tokenizer(python_tokenizer)
+    v.loop()
@@ -15,12 +15,11 @@ from zen_tui.defs import Color
 d = None
 
 
-# This routine is called on screen resize
+# This routine is called on screen resize, once the window edge stops moving
 def screen_resize(s):
-    global d
-    # Widgets in dialog store absolute screen coordinates, so
-    # we need to recreate it from scratch for new dimensions.
-    d = create_dialog()
+    # Moving dialog moves its widgets along, so it's just centered again
+    width, height = s.screen_size()
+    d.set_xy((width - d.w) // 2, (height - d.h) // 2)
     screen_redraw(s)
 
 
@@ -0,0 +1,217 @@
+"""Unit tests for zen_tui.widgets.Dialog"""
+
+import asyncio
+import unittest
+from zen_tui.backend import HeadlessBackend, TtyBackend
+from zen_tui.basewidget import Widget
+from zen_tui.defs import Keys
+from zen_tui.screen import Screen
+from zen_tui.decoder import MouseEvent
+from zen_tui.widgets import ACTION_CANCEL, Dialog, WButton, WCheckbox, WDropDown, WLabel, WListBox
+
+
+class DialogTest(unittest.TestCase):
+    """ DialogTest class."""
+    def setUp(self):
+        self.backend = HeadlessBackend(40, 12)
+        Screen.set_backend(self.backend)
+        Widget._damage.clear()
+        Widget._last_render = 0.0
+
+    def tearDown(self):
+        Screen.set_backend(TtyBackend())
+        Screen._resize_handler = None
+        Widget.max_fps = 30
+
+    def count_redraws(self, *widgets):
+        redraws = []
+        for w in widgets:
+            def redraw(w=w, org=w.redraw):
+                redraws.append(w)
+                org()
+            w.redraw = redraw
+        return redraws
+
+    def test_event_redraws_each_widget_once(self):
+        """Test that widgets invalidated several times while handling an event are redrawn once."""
+        d = Dialog(0, 0, 30, 8)
+        first = WCheckbox("First")
+        second = WCheckbox("Second")
+        d.add(1, 1, first)
+        d.add(1, 2, second)
+        with d.frame():
+            d.redraw()
+        redraws = self.count_redraws(d, first, second)
+        # Focus change invalidates both checkboxes, then the click flips the second one
+        d.handle_input(MouseEvent(2, 2, MouseEvent.BUTTON_LEFT, MouseEvent.PRESS))
+        self.assertTrue(second.choice)
+        self.assertCountEqual(redraws, [first, second])
+        self.assertEqual(self.backend.text()[2][1:5], "[x] ")
+
+    def test_children_of_damaged_owner_skipped(self):
+        """Test that a child isn't redrawn on its own when its owner is redrawn as a whole."""
+        d = Dialog(0, 0, 30, 8)
+        checkbox = WCheckbox("First")
+        d.add(1, 1, checkbox)
+        with d.frame():
+            d.redraw()
+        redraws = self.count_redraws(d, checkbox)
+        checkbox.invalidate()
+        d.invalidate()
+        d.handle_input(None)
+        self.assertEqual(redraws, [d, checkbox])
+
+    def test_aloop_runs_tasks_and_popups(self):
+        """Test that aloop() renders changes made by other tasks, and awaits popups."""
+        d = Dialog(0, 0, 30, 8)
+        label = WLabel("waiting", w=10)
+        d.add(1, 1, label)
+        dropdown = WDropDown(10, ["Red", "Green", "Blue"])
+        d.add(1, 2, dropdown)
+
+        async def task():
+            await asyncio.sleep(0.01)
+            label.t = "done"
+            label.invalidate()
+            await asyncio.sleep(0.01)
+            self.assertEqual(self.backend.text()[1][1:11], "done      ")
+            # Open dropdown, pick next item, then close dialog
+            self.backend.feed(b"\x1b[B")
+            await asyncio.sleep(0.01)
+            self.assertEqual(self.backend.text()[5][2:7], "Green")
+            self.backend.feed(b"\x1b[B", b"\r")
+            await asyncio.sleep(0.01)
+            self.backend.feed(b"\x1b")
+
+        async def main():
+            bg = asyncio.ensure_future(task())
+            res = await asyncio.wait_for(d.aloop(), 2)
+            await bg
+            return res
+
+        self.assertEqual(asyncio.run(main()), ACTION_CANCEL)
+        self.assertEqual(dropdown.choice, 1)
+        self.assertEqual(self.backend.text()[2][1:6], "Green")
+
+    def test_dropdown_handle_key(self):
+        """Test that calling handle_key() directly, outside of any loop, runs the popup."""
+        dropdown = WDropDown(10, ["Red", "Green", "Blue"])
+        dropdown.set_xy(1, 2)
+        self.backend.feed(b"\x1b[B", b"\r")
+        dropdown.handle_key(Keys.KEY_ENTER)
+        self.assertEqual(dropdown.choice, 1)
+        self.assertFalse(Widget._popups)
+
+    def test_dropdown_popup_restores_screen(self):
+        """Test that closing a popup puts back the cells under it, without repainting the dialog."""
+        d = Dialog(0, 0, 30, 10)
+        for y in range(3, 9):
+            d.add(1, y, f"row {y} " * 4)
+        dropdown = WDropDown(10, ["Red", "Green", "Blue"])
+        d.add(1, 2, dropdown)
+        with d.frame():
+            d.redraw()
+        before = (self.backend.text(), [row[:] for row in self.backend.vt.attrs])
+        redraws = []
+        d.redraw = lambda: redraws.append(d)
+        written = self.backend.bytes_written
+        self.backend.feed(b"\x1b")
+        dropdown.handle_input(Keys.KEY_ENTER)
+        self.assertGreater(self.backend.bytes_written, written)
+        self.assertEqual((self.backend.text(), self.backend.vt.attrs), before)
+        self.assertEqual(redraws, [])
+
+    def test_changes_made_from_popup_are_drawn(self):
+        """Test that a widget changed when a popup is done is drawn after the screen under the popup is restored."""
+        d = Dialog(0, 0, 30, 10)
+        dropdown = WDropDown(10, ["All", "Some"])
+        d.add(1, 1, dropdown)
+        lb = WListBox(10, 4, ["a", "b", "c"])
+        d.add(1, 3, lb)
+        dropdown.on("changed", lambda w: lb.set_items(["b"]))
+        with d.frame():
+            d.redraw()
+        self.backend.feed(b"\x1b[B", b"\r")
+        d.handle_input(Keys.KEY_ENTER)
+        self.assertEqual([line[1:2] for line in self.backend.text()[3:6]], ["b", " ", " "])
+
+    def test_resize_burst_relayouts_once(self):
+        """Test that a burst of resize signals is handled by the loop with one relayout, moving children along."""
+        d = Dialog(10, 3, 20, 5)
+        button = WButton(6, "OK")
+        d.add(1, 1, button)
+        resizes = []
+
+        def screen_resize(s):
+            width, height = s.screen_size()
+            resizes.append((width, height))
+            d.set_xy((width - d.w) // 2, (height - d.h) // 2)
+            s.cls()
+            d.redraw()
+            self.backend.feed(b"\x1b")
+
+        def drag():
+            for width in (44, 50, 60):
+                self.backend.resize(width, 16)
+                Screen._on_winch(None, None)
+
+        d.set_screen_resize(screen_resize)
+        d.call_later(0, drag)
+        self.assertEqual(d.loop(), ACTION_CANCEL)
+        self.assertEqual(resizes, [(60, 16)])
+        self.assertEqual((button.x, button.y), (21, 6))
+        self.assertEqual(self.backend.text()[6][20:27], "│  OK  ")
+
+    def test_timer_under_open_dropdown(self):
+        """Test that a widget changed by a timer under an open popup shows when the popup closes, not over it."""
+        d = Dialog(0, 0, 30, 10)
+        dropdown = WDropDown(10, ["All", "Some"])
+        d.add(1, 1, dropdown)
+        lb = WListBox(10, 5, [f"old{i}" for i in range(5)])
+        d.add(1, 2, lb)
+        with d.frame():
+            d.redraw()
+        Widget.max_fps = 10000
+        popup_rows = []
+
+        def tick():
+            lb.set_items([f"new{i}" for i in range(5)])
+            timer.cancel()
+            # Checked on the next loop iteration, once rendered
+            d.call_later(0, lambda: (popup_rows.append(self.backend.text()[2][1:11]), self.backend.feed(b"\x1b")))
+
+        timer = d.call_every(0.001, tick)
+        dropdown.handle_input(Keys.KEY_ENTER)
+        self.assertEqual(popup_rows, ["┌────────┐"])
+        self.assertEqual([line[1:5] for line in self.backend.text()[2:7]], [f"new{i}" for i in range(5)])
+        self.assertEqual(Widget._open_popups, [])
+
+    def test_resize_redraws_open_popup(self):
+        """Test that a popup is drawn over the screen the resize handler redraws, and what it saved is up to date."""
+        d = Dialog(0, 0, 30, 10)
+        dropdown = WDropDown(10, ["All", "Some"])
+        d.add(1, 1, dropdown)
+        with d.frame():
+            d.redraw()
+
+        def screen_resize(s):
+            s.cls()
+            d.set_xy(2, 0)
+            d.redraw()
+
+        def resize():
+            self.backend.resize(50, 16)
+            Screen._on_winch(None, None)
+
+        def check():
+            rows.append(self.backend.text()[2][1:11])
+            self.backend.feed(b"\x1b")
+
+        rows = []
+        d.set_screen_resize(screen_resize)
+        d.call_later(0, resize)
+        d.call_later(Screen.resize_delay + 0.01, check)
+        dropdown.handle_input(Keys.KEY_ENTER)
+        self.assertEqual(rows, ["┌────────┐"])
+        # Dialog moved right, its border is put back under the popup
+        self.assertEqual(self.backend.text()[2][:3], "  │")
@@ -0,0 +1,130 @@
+"""Unit tests for zen_tui.highlight and CharColorViewer highlighting"""
+
+import unittest
+from array import array
+from zen_tui.backend import HeadlessBackend, TtyBackend
+from zen_tui.basewidget import Widget
+from zen_tui.defs import Color
+from zen_tui.editorext import CharColorViewer
+from zen_tui.highlight import Highlighter, RegexTokenizer
+from zen_tui.scheduler import Scheduler
+from zen_tui.screen import Screen
+
+
+class CountingTokenizer(RegexTokenizer):
+    """C-like comments and keywords, counting lines lexed."""
+
+    def __init__(self):
+        super().__init__({
+            "root": (Color.C_WHITE, [(r"/\*", Color.C_GREEN, "comment"), (r"\b(?:if|else)\b", Color.C_YELLOW, None)]),
+            "comment": (Color.C_GREEN, [(r"\*/", Color.C_GREEN, "root")]),
+        })
+        self.lexed = 0
+
+    def tokenize(self, line, state):
+        self.lexed += 1
+        return super().tokenize(line, state)
+
+
+class HighlighterTest(unittest.TestCase):
+    """ HighlighterTest class."""
+    def setUp(self):
+        self.tokenizer = CountingTokenizer()
+        self.lines = [f"if x{i} else y" for i in range(10000)]
+        self.h = Highlighter(self.tokenizer, self.lines)
+
+    def test_tokenize(self):
+        """Test spans, states across lines, and that spans are packed."""
+        spans, state = self.tokenizer.tokenize("if a /* b", "root")
+        self.assertEqual(list(spans), [(2, Color.C_YELLOW), (5, Color.C_WHITE), (7, Color.C_GREEN), (9, Color.C_GREEN)])
+        self.assertEqual(state, "comment")
+        self.assertEqual(self.tokenizer.tokenize("if */ else", "comment")[1], "root")
+        spans = self.h.spans(0)
+        self.assertIsInstance(spans, array)
+        self.assertEqual(list(spans), [2, Color.C_YELLOW, 6, Color.C_WHITE, 10, Color.C_YELLOW, 12, Color.C_WHITE])
+
+    def test_lex_on_demand(self):
+        """Test that only lines up to the one asked for are lexed, and spans are cached."""
+        self.h.spans(100)
+        self.assertEqual(self.tokenizer.lexed, 101)
+        self.h.spans(100)
+        self.h.spans(50)
+        self.assertEqual(self.tokenizer.lexed, 102)
+        self.assertIsNone(self.h.spans(5000, max_lex=1000))
+        self.assertEqual(self.tokenizer.lexed, 102)
+
+    def test_relex_until_converged(self):
+        """Test that after a change, lines are lexed again only until the state is as before."""
+        h = self.h
+        h.spans(9000)
+        self.tokenizer.lexed = 0
+        self.lines[10] = "x"
+        self.assertEqual(h.lines_changed(10, 1, 1), 11)
+        self.assertEqual(self.tokenizer.lexed, 1)
+        # Opening a comment changes all lines after it
+        self.lines[20] = "/* if"
+        self.assertEqual(h.lines_changed(20, 1, 1, limit=100), len(self.lines))
+        self.assertEqual(list(h.spans(50)), [13, Color.C_GREEN])
+        self.assertEqual(h.lexed, 101)
+        # Closing it lines later, only those are lexed again
+        self.tokenizer.lexed = 0
+        self.lines[30:31] = ["*/", "if"]
+        self.assertEqual(h.lines_changed(30, 1, 2), 102)
+        # Closing it earlier, lines up to the old end are lexed again
+        self.lines[21:21] = ["*/"]
+        self.tokenizer.lexed = 0
+        self.assertEqual(h.lines_changed(21, 0, 1), 32)
+        self.assertEqual(self.tokenizer.lexed, 11)
+        self.assertEqual(list(h.spans(22)), [2, Color.C_YELLOW, 7, Color.C_WHITE, 11, Color.C_YELLOW, 13, Color.C_WHITE])
+
+
+class CharColorViewerTest(unittest.TestCase):
+    """ CharColorViewerTest class."""
+    def setUp(self):
+        self.backend = HeadlessBackend(40, 10)
+        Screen.set_backend(self.backend)
+        Widget._damage.clear()
+        Widget.scheduler = Scheduler()
+        self.tokenizer = CountingTokenizer()
+        self.v = CharColorViewer(0, 0, 40, 5)
+        self.v.set_lines([f"if x{i} else y" for i in range(100000)])
+        self.v.set_tokenizer(self.tokenizer)
+        self.render()
+
+    def tearDown(self):
+        Screen.set_backend(TtyBackend())
+
+    def render(self):
+        with self.v.frame():
+            self.v.update()
+
+    def test_highlight_visible(self):
+        """Test that shown lines are highlighted, and that changes redraw lines whose highlighting changed."""
+        vt = self.backend.vt
+        self.assertEqual(self.tokenizer.lexed, 5)
+        self.assertEqual(vt.colors_at(0, 1)[0], Color.C_YELLOW)
+        self.assertEqual(vt.colors_at(3, 1)[0], Color.C_WHITE)
+        self.v.update_lines(1, 2, ["/* if"])
+        self.assertEqual(Widget._damage[self.v], (0, 1, 40, 4))
+        self.render()
+        self.assertEqual(vt.line(1).rstrip(), "/* if")
+        self.assertEqual(vt.colors_at(0, 3)[0], Color.C_GREEN)
+
+    def test_jump_lexes_in_slices(self):
+        """Test that lines far from lexed ones are shown plain until lexed between input events."""
+        v = self.v
+        v.lex_chunk = 20000
+        v.top_line = 90000
+        v.redraw()
+        self.assertEqual(self.tokenizer.lexed, 5)
+        self.assertEqual(self.backend.vt.line(0).rstrip(), "if x90000 else y")
+        v.handle_timers()
+        self.assertEqual(self.tokenizer.lexed, 20005)
+        while Widget.scheduler.timeout() is not None:
+            v.handle_timers()
+        self.render()
+        self.assertEqual(self.backend.vt.colors_at(0, 0)[0], Color.C_YELLOW)
+
+
+if __name__ == "__main__":
+    unittest.main()
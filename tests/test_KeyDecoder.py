@@ -0,0 +1,96 @@
+"""Unit tests for zen_tui.decoder.KeyDecoder"""
+
+import unittest
+from zen_tui.backend import HeadlessBackend, TtyBackend
+from zen_tui.basewidget import Widget
+from zen_tui.decoder import KeyDecoder, MouseEvent, Paste, Report
+from zen_tui.defs import Keys
+from zen_tui.screen import Screen
+from zen_tui.widgets import WMultiEntry, WTextEntry
+
+
+class KeyDecoderTest(unittest.TestCase):
+    """ KeyDecoderTest class."""
+    def decode(self, decoder, data, final=False):
+        decoder.feed(data)
+        events = []
+        while (event := decoder.get(final)) is not None:
+            events.append(event)
+        return events
+
+    def test_several_keys_in_one_read(self):
+        """Test that all keystrokes of a chunk are decoded, in order."""
+        d = KeyDecoder()
+        self.assertEqual(self.decode(d, b"\x1b[Ax\r\x1b[M !!\xc3\xa9"),
+                         [Keys.KEY_UP, b"x", Keys.KEY_ENTER, [0, 0], "é".encode()])
+        self.assertFalse(d.pending)
+
+    def test_split_sequences(self):
+        """Test that sequences split between reads wait for the rest."""
+        d = KeyDecoder()
+        self.assertEqual(self.decode(d, b"\x1b[2"), [])
+        self.assertEqual(self.decode(d, b"1~\x1b[?2026;"), [Keys.KEY_F10])
+        self.assertEqual(self.decode(d, b"1$y\x1b[1;5A\xe2\x86"), [Report(b"\x1b[?2026;1$y")])
+        self.assertEqual(self.decode(d, b"\x93"), ["↓".encode()])
+
+    def test_lone_esc_after_timeout(self):
+        """Test that ESC is a key when nothing follows it in time."""
+        Screen.set_backend(HeadlessBackend())
+        try:
+            w = Widget()
+            Screen.backend.feed(b"\x1b", b"\x1bO", b"P")
+            self.assertEqual(w.get_input(), Keys.KEY_ESC)
+            self.assertEqual(w.get_input(), Keys.KEY_F1)
+        finally:
+            Screen.set_backend(TtyBackend())
+
+    def test_sgr_mouse(self):
+        """Test SGR extended mouse events: any column, release, wheel, modifiers, drag merging."""
+        d = KeyDecoder()
+        press, release, wheel, drag1, drag2 = self.decode(
+            d, b"\x1b[<0;300;2M\x1b[<0;300;2m\x1b[<81;1;1M\x1b[<32;5;5M\x1b[<32;6;5M")
+        self.assertEqual((press, press.button, press.action), ([299, 1], MouseEvent.BUTTON_LEFT, MouseEvent.PRESS))
+        self.assertEqual(release.action, MouseEvent.RELEASE)
+        self.assertEqual((wheel.action, wheel.count, wheel.ctrl, wheel.shift), (MouseEvent.WHEEL, 1, True, False))
+        self.assertEqual(drag1.action, MouseEvent.DRAG)
+        self.assertIs(drag1.merge(drag2), drag2)
+        self.assertEqual(wheel.merge(wheel).count, 2)
+        self.assertIsNone(drag1.merge(wheel))
+
+    def test_bracketed_paste(self):
+        """Test that pasted text is one event, split reads or not."""
+        d = KeyDecoder()
+        self.assertEqual(self.decode(d, b"a\x1b[200~line1\r\nli"), [b"a"])
+        self.assertEqual(self.decode(d, b"ne2\x1b[2"), [])
+        events = self.decode(d, b"01~\x1b[A")
+        self.assertEqual(events, [Paste("line1\nline2"), Keys.KEY_UP])
+        self.assertIsInstance(events[0], Paste)
+
+    def test_paste_into_multientry(self):
+        """Test that a multi-line paste is inserted at cursor as a whole."""
+        Screen.set_backend(HeadlessBackend(30, 6))
+        try:
+            w = WMultiEntry(20, 3, ["hello world"])
+            w.set_xy(0, 0)
+            w.col = 6
+            w.redraw()
+            Screen.backend.feed(b"\x1b[200~one\rtwo\rthree\rfour \x1b[201~")
+            w.handle_input(w.get_input())
+            self.assertEqual(w.get(), ["hello one", "two", "three", "four world"])
+            self.assertEqual((w.cur_line, w.top_line, w.row, w.col), (3, 1, 2, 5))
+            self.assertEqual([line[:10] for line in Screen.backend.text()[:3]], ["two       ", "three     ", "four world"])
+        finally:
+            Screen.set_backend(TtyBackend())
+
+    def test_paste_into_text_entry(self):
+        """Test that a paste replaces the initial text of a one-line entry, up to the first line break."""
+        Screen.set_backend(HeadlessBackend(30, 6))
+        try:
+            w = WTextEntry(20, "initial")
+            w.set_xy(0, 0)
+            w.handle_input(Paste("one\ntwo"))
+            self.assertEqual(w.get(), "one")
+            w.handle_input(Paste(" more"))
+            self.assertEqual(w.get(), "one more")
+        finally:
+            Screen.set_backend(TtyBackend())
@@ -0,0 +1,55 @@
+"""Unit tests for zen_tui.textbuf.MappedLines"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+from zen_tui.backend import HeadlessBackend, TtyBackend
+from zen_tui.basewidget import Widget
+from zen_tui.editor import Editor
+from zen_tui.scheduler import Scheduler
+from zen_tui.screen import Screen
+from zen_tui.textbuf import MappedLines
+
+
+class MappedLinesTest(unittest.TestCase):
+    """ MappedLinesTest class."""
+    def setUp(self):
+        Screen.set_backend(HeadlessBackend(40, 10))
+        Widget._damage.clear()
+        Widget.scheduler = Scheduler()
+        fd, self.path = tempfile.mkstemp()
+        self.text = "".join(f"line {i} é\r\n" if i % 3 else f"line {i}\n" for i in range(5000)) + "last"
+        os.write(fd, self.text.encode())
+        os.close(fd)
+        # Index in small slices
+        patcher = mock.patch.multiple(MappedLines, block_size=1000, index_chunk=3000)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        Screen.set_backend(TtyBackend())
+        os.unlink(self.path)
+
+    def test_lines_match_splitlines(self):
+        """Test that lines are split and decoded as str.splitlines() would, however much is indexed."""
+        lines = MappedLines(self.path)
+        expected = self.text.splitlines()
+        while not lines.complete:
+            self.assertEqual(lines[len(lines) - 1], expected[len(lines) - 1])
+            lines.index_more()
+        self.assertEqual(list(lines), expected)
+        self.assertEqual(lines[-1], "last")
+
+    def test_editor_indexes_file_while_idle(self):
+        """Test that the editor shows the first screen right away, and gets more lines from a timer."""
+        e = Editor(0, 0, 40, 10)
+        e.load_file(self.path)
+        e.redraw()
+        self.assertLess(e.total_lines, 500)
+        self.assertEqual(Screen.backend.text()[1].rstrip(), "line 1 é")
+        e.handle_edit_key(b"x")
+        while e.total_lines < 5001:
+            e.handle_timers()
+        self.assertEqual(e.total_lines, 5001)
+        self.assertEqual(list(e.content), ["xline 0"] + self.text.splitlines()[1:])
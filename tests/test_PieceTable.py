@@ -0,0 +1,54 @@
+"""Unit tests for zen_tui.textbuf.PieceTable"""
+
+import random
+import unittest
+from zen_tui.defs import Keys
+from zen_tui.editor import Editor
+from zen_tui.textbuf import PieceTable
+
+
+class PieceTableTest(unittest.TestCase):
+    """ PieceTableTest class."""
+
+    def test_edits_match_list(self):
+        """Test that random replaces, inserts and deletes give the same lines as with a list."""
+        rnd = random.Random(1)
+        original = [f"line{i}" for i in range(1000)]
+        expected = list(original)
+        buf = PieceTable(original)
+        for n in range(2000):
+            i = rnd.randrange(len(expected) + 1)
+            op = rnd.randrange(4)
+            if op == 0 and i < len(expected):
+                buf[i] = expected[i] = f"edit{n}"
+            elif op == 1:
+                lines = [f"new{n}.{k}" for k in range(rnd.randrange(3))]
+                j = min(i + rnd.randrange(3), len(expected))
+                buf[i:j] = lines
+                expected[i:j] = lines
+            elif op == 2 and i < len(expected):
+                del buf[i]
+                del expected[i]
+            else:
+                buf.insert(i, f"ins{n}")
+                expected.insert(i, f"ins{n}")
+            self.assertEqual(len(buf), len(expected))
+        self.assertEqual(list(buf), expected)
+        self.assertEqual([buf[i] for i in range(len(buf))], expected)
+        self.assertEqual(buf[-1], expected[-1])
+        self.assertEqual(original, [f"line{i}" for i in range(1000)])
+
+    def test_typing_and_enter_dont_add_pieces(self):
+        """Test that editing an added line in place, and adding lines after each other, keep pieces few."""
+        e = Editor(0, 0, 40, 10)
+        e.set_lines([f"line{i}" for i in range(100)])
+        e.cur_line = e.row = 5
+        e.col = 5
+        for key in [b"x", b"y"] * 10:
+            e.handle_edit_key(key)
+        pieces = e.content.pieces()
+        for _ in range(50):
+            e.handle_edit_key(Keys.KEY_ENTER)
+        self.assertEqual(e.total_lines, 150)
+        self.assertEqual(e.content[5], "line5" + "xy" * 10)
+        self.assertLessEqual(e.content.pieces(), pieces + 2)
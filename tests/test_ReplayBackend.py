@@ -0,0 +1,57 @@
+"""Unit tests for zen_tui.record.ReplayBackend"""
+
+import os
+import tempfile
+import unittest
+from zen_tui.backend import HeadlessBackend, TtyBackend
+from zen_tui.basewidget import ACTION_OK, Widget
+from zen_tui.record import RecordingBackend, ReplayBackend
+from zen_tui.screen import Screen
+from zen_tui.widgets import WPopupList
+
+
+class ReplayBackendTest(unittest.TestCase):
+    """ ReplayBackendTest class."""
+    def setUp(self):
+        Widget._damage.clear()
+        fd, self.path = tempfile.mkstemp(suffix=".rec")
+        os.close(fd)
+
+    def tearDown(self):
+        Screen.set_backend(TtyBackend())
+        os.unlink(self.path)
+
+    def run_list(self, backend):
+        Screen.set_backend(backend)
+        widget = WPopupList.OneShotList(10, 5, [f"item{i}" for i in range(20)])
+        widget.set_xy(0, 0)
+        self.assertEqual(widget.loop(), ACTION_OK)
+        return widget
+
+    def test_record_and_replay(self):
+        """Test that replaying a recorded session gives the same result, and measures latency."""
+        live = HeadlessBackend(20, 8)
+        live.feed(b"\x1b[B", b"\x1b[B\x1b[B", b"\x1b[6~", b"\r")
+        recorder = RecordingBackend(live, self.path)
+        widget = self.run_list(recorder)
+        recorder.close()
+        self.assertEqual(list(widget.key_story), [b"\x1b[B", b"\x1b[B\x1b[B", b"\x1b[6~", b"\r"])
+
+        replay = ReplayBackend.load(self.path)
+        self.assertEqual(replay.size(), (20, 8))
+        self.assertEqual([data for _t, data in replay.events], list(widget.key_story))
+        # Spread the recording in time, for each chunk to be handled separately
+        replay.events = [(i * 10.0, data) for i, (_t, data) in enumerate(replay.events)]
+        replayed = self.run_list(replay)
+        self.assertEqual(replayed.cur_line, widget.cur_line)
+        self.assertEqual(replay.text(), live.text())
+        # Enter finishes the loop without changing anything on screen
+        self.assertEqual(len(replay.latencies), 3)
+
+    def test_key_story_is_bounded(self):
+        """Test that only the most recent input is kept in key_story."""
+        backend = HeadlessBackend(20, 8)
+        backend.feed(*[b"\x1b[B"] * 100, b"\r")
+        widget = self.run_list(backend)
+        self.assertEqual(len(widget.key_story), Widget.key_story_len)
+        self.assertEqual(widget.key_story[-1], b"\r")
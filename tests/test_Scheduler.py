@@ -0,0 +1,125 @@
+"""Unit tests for zen_tui.scheduler.Scheduler"""
+
+import threading
+import unittest
+from zen_tui.backend import HeadlessBackend, TtyBackend
+from zen_tui.basewidget import ACTION_CANCEL, Widget
+from zen_tui.scheduler import Scheduler
+from zen_tui.screen import Screen
+from zen_tui.widgets import Dialog, WButton, WLabel, WListBox
+
+
+class SchedulerTest(unittest.TestCase):
+    """ SchedulerTest class."""
+    def setUp(self):
+        self.now = 0.0
+        self.scheduler = Scheduler(clock=lambda: self.now)
+
+    def test_timers_run_in_order_when_due(self):
+        """Test one-shot and repeating timers, cancelling, and the wait timeout."""
+        calls = []
+        self.assertIsNone(self.scheduler.timeout())
+        self.scheduler.call_later(0.5, calls.append, "later")
+        every = self.scheduler.call_every(0.2, calls.append, "every")
+        cancelled = self.scheduler.call_later(0.1, calls.append, "cancelled")
+        cancelled.cancel()
+        self.assertAlmostEqual(self.scheduler.timeout(), 0.2)
+        self.now = 0.5
+        self.assertEqual(self.scheduler.run_due(), 2)
+        self.assertEqual(calls, ["every", "later"])
+        # Missed ticks aren't run in a burst
+        self.assertAlmostEqual(self.scheduler.timeout(), 0.2)
+        self.now = 0.6
+        self.assertEqual(self.scheduler.run_due(), 0)
+        self.now = 0.7
+        self.assertEqual(self.scheduler.run_due(), 1)
+        every.cancel()
+        self.now = 10
+        self.assertEqual(self.scheduler.run_due(), 0)
+        self.assertEqual(calls, ["every", "later", "every"])
+        self.assertIsNone(self.scheduler.timeout())
+
+
+class LoopTimersTest(unittest.TestCase):
+    """ LoopTimersTest class."""
+    def setUp(self):
+        self.backend = HeadlessBackend(40, 12)
+        Screen.set_backend(self.backend)
+        Widget._damage.clear()
+        Widget._last_render = 0.0
+        Widget.scheduler = Scheduler()
+
+    def tearDown(self):
+        Screen.set_backend(TtyBackend())
+        Widget.max_fps = 30
+
+    def run_counter(self, ticks):
+        d = Dialog(0, 0, 20, 5)
+        label = WLabel("0", w=5)
+        d.add(1, 1, label)
+        d.add(1, 2, WButton(6, "OK"))
+        count = [0]
+        frames = []
+
+        def tick():
+            count[0] += 1
+            label.t = str(count[0])
+            label.invalidate()
+            frames.append(self.backend.writes)
+            if count[0] == ticks:
+                timer.cancel()
+                self.backend.feed(b"\x1b")
+
+        timer = d.call_every(0.001, tick)
+        self.assertEqual(d.loop(), ACTION_CANCEL)
+        return self.backend.text()[1][1:6], frames
+
+    def test_loop_runs_timers(self):
+        """Test that loop() runs timers while waiting for input and renders their changes."""
+        Widget.max_fps = 10000
+        text, frames = self.run_counter(5)
+        self.assertEqual(text, "5    ")
+        self.assertEqual(len(set(frames)), 5)
+
+    def test_frame_rate_cap(self):
+        """Test that changes made by timers are rendered at most max_fps times a second."""
+        Widget.max_fps = 20
+        text, frames = self.run_counter(30)
+        self.assertEqual(text, "30   ")
+        # 30 ticks take ~30 ms, at most one frame is due in between
+        self.assertLessEqual(frames[-1] - frames[0], 2)
+
+    def test_posted_calls_render_once_per_batch(self):
+        """Test that calls posted before the loop waits are applied together and rendered once."""
+        d = Dialog(0, 0, 20, 6)
+        lb = WListBox(10, 3, ["empty"])
+        d.add(1, 1, lb)
+        for i in range(5):
+            d.post(lb.set_items, [f"item{i}", f"next{i}"])
+        d.post(self.backend.feed, b"\x1b")
+        writes = self.backend.writes
+        self.assertEqual(d.loop(), ACTION_CANCEL)
+        # Initial draw, then one frame for all the posted updates
+        self.assertEqual(self.backend.writes - writes, 2)
+        self.assertEqual([line[1:6] for line in self.backend.text()[1:3]], ["item4", "next4"])
+
+    def test_post_from_thread(self):
+        """Test that calls posted by a worker thread run on the loop's thread."""
+        d = Dialog(0, 0, 20, 6)
+        lb = WListBox(10, 3, ["empty"])
+        d.add(1, 1, lb)
+        threads = []
+
+        def worker():
+            d.post(lambda: threads.append(threading.current_thread()))
+            d.post(lb.set_items, ["fetched"])
+            d.post(self.backend.feed, b"\x1b")
+
+        # Headless read() doesn't block, keep the loop waiting until posted calls arrive
+        d.call_every(0.005, lambda: None)
+        worker_thread = threading.Thread(target=worker)
+        worker_thread.start()
+        self.assertEqual(d.loop(), ACTION_CANCEL)
+        worker_thread.join()
+        self.assertEqual(threads, [threading.current_thread()])
+        self.assertEqual(self.backend.text()[1][1:8], "fetched")
@@ -0,0 +1,224 @@
+"""Unit tests for zen_tui.screen.Screen"""
+
+import unittest
+from zen_tui.backend import HeadlessBackend, TtyBackend
+from zen_tui.basewidget import Widget
+from zen_tui.screen import SYNC_BEGIN, SYNC_END, Screen
+from zen_tui.defs import Color, Keys
+from zen_tui.editor import Editor
+
+
+class ScreenFrameTest(unittest.TestCase):
+    """ ScreenFrameTest class."""
+    def setUp(self):
+        self.backend = HeadlessBackend()
+        Screen.set_backend(self.backend)
+
+    def tearDown(self):
+        Screen.set_backend(TtyBackend())
+
+    def test_frame_batches_output(self):
+        """Test that output inside a frame is written with one syscall."""
+        s = Screen()
+        with s.frame():
+            s.goto(1, 2)
+            s.wr("abc")
+            with s.frame():
+                s.wr(b"def")
+            self.assertEqual(self.backend.writes, 0)
+        self.assertEqual(self.backend.last_write, b"\x1b[3;2H\x1b[0mabcdef")
+        self.assertEqual(self.backend.text()[2][:7], " abcdef")
+        self.assertEqual(Screen.stats.syscalls, 1)
+        self.assertEqual(Screen.stats.bytes, 16)
+
+    def test_unchanged_cells_not_rewritten(self):
+        """Test that redrawing the same content only emits the changed cells."""
+        s = Screen()
+        with s.frame():
+            s.goto(0, 0)
+            s.wr("hello world")
+        with s.frame():
+            s.goto(0, 0)
+            s.wr("hello")
+            s.goto(6, 0)
+            s.wr("WORLD")
+        self.assertEqual(self.backend.last_write, b"\x1b[5DWORLD")
+        self.assertEqual(self.backend.text()[0][:11], "hello WORLD")
+        self.assertEqual(Screen.stats.bytes, 9)
+
+    def test_attr_changes_are_minimal(self):
+        """Test that only the changed SGR components are emitted."""
+        s = Screen()
+        with s.frame():
+            s.goto(0, 0)
+            s.attr_color(Color.C_BLACK, Color.C_GREEN)
+            s.wr("a")
+            s.attr_color(Color.C_WHITE, Color.C_GREEN)
+            s.wr("b")
+            s.attr_color(Color.C_WHITE, Color.C_GREEN)
+            s.wr("c")
+            s.attr_reset()
+        self.assertEqual(self.backend.last_write, b"\x1b[H\x1b[0;30;42ma\x1b[37mbc")
+        self.assertEqual(self.backend.vt.colors_at(1, 0), (Color.C_WHITE, Color.C_GREEN))
+
+    def test_cursor_moves_are_cheapest(self):
+        """Test that cursor moves use the shortest encoding and no-op moves are skipped."""
+        s = Screen()
+        with s.frame():
+            s.goto(10, 5)
+            s.wr("a")
+        self.assertEqual(self.backend.last_write, b"\x1b[6;11H\x1b[0ma")
+        with s.frame():
+            s.goto(10, 6)
+            s.wr("b")
+            s.goto(0, 7)
+            s.wr("c")
+            s.goto(1, 7)
+        self.assertEqual(self.backend.last_write, b"\x1b[B\bb\x1b[8Hc")
+        s.backbuf().raw_lf = True
+        with s.frame():
+            s.goto(0, 8)
+            s.wr("d")
+        self.assertEqual(self.backend.last_write, b"\n\bd")
+        self.assertEqual([line[:2] for line in self.backend.text()[5:9]], ["  ", "  ", "c ", "d "])
+
+    def test_cursor_move_after_wide_char_is_absolute(self):
+        """Test that no relative move is planned from where a double-width character left the cursor."""
+        s = Screen()
+        with s.frame():
+            s.goto(0, 0)
+            s.wr("\u4e2d")
+            s.goto(3, 0)
+            s.wr("a")
+        self.assertTrue(self.backend.last_write.endswith("\u4e2d\x1b[1;4Ha".encode()))
+
+    def test_wide_chars_take_two_cells(self):
+        """Test that changes after wide characters are drawn at their terminal columns, and split ones are blanked."""
+        s = Screen()
+        with s.frame():
+            s.goto(0, 0)
+            s.wr("\u65e5\u672cabc")
+        with s.frame():
+            s.goto(0, 0)
+            s.wr("\u65e5\u672cabX")
+        self.assertEqual(self.backend.last_write, b"\bX")
+        self.assertEqual(self.backend.vt.line(0)[:5], "\u65e5\u672cabX")
+        with s.frame():
+            s.goto(1, 0)
+            s.wr("e\u0301")
+        self.assertEqual(self.backend.vt.line(0)[:6], " e\u0301\u672cab")
+        self.assertEqual(s.backbuf().front_chars[0][:7], self.backend.vt.chars[0][:7])
+
+    def test_size_cached_until_resize(self):
+        """Test that terminal size is read once, and again only after SIGWINCH."""
+        reads = []
+        size = self.backend.size
+        self.backend.size = lambda: reads.append(1) or size()
+        s = Screen()
+        self.assertEqual(s.screen_size(), (80, 24))
+        self.assertEqual(Widget().screen_size(), (80, 24))
+        self.assertEqual(len(reads), 1)
+        self.backend.vt.width = 100
+        Screen._on_winch(None, None)
+        self.assertEqual(s.screen_size(), (100, 24))
+        self.assertEqual(len(reads), 2)
+
+    def test_reports_decoded_from_input(self):
+        """Test that query replies are decoded with the input, which isn't lost while waiting for them."""
+        w = Widget()
+        with w.frame():
+            w.goto(4, 2)
+        w.query_device_attrs()
+        self.backend.feed(b"x")
+        self.assertEqual(w.get_cursor_pos(), (4, 2))
+        self.assertEqual(Screen.device_attrs, (62, 22))
+        self.assertEqual(w.get_input(), b"x")
+
+    def test_sync_output_detected_from_report(self):
+        """Test that DECRPM reply in input enables synchronized output frames."""
+        w = Widget()
+        w.kbuf = b"\x1b[?2026;2$y\t"
+        self.assertIsNone(w.get_input())
+        self.assertTrue(Screen.sync_output)
+        self.assertEqual(w.get_input(), Keys.KEY_TAB)
+        with w.frame():
+            for y in range(5):
+                w.goto(0, y)
+                w.wr("x" * 80)
+        out = self.backend.last_write
+        self.assertTrue(out.startswith(SYNC_BEGIN))
+        self.assertTrue(out.endswith(SYNC_END))
+
+
+class ScreenScrollTest(unittest.TestCase):
+    """ ScreenScrollTest class."""
+    def setUp(self):
+        self.backend = HeadlessBackend(20, 8)
+        Screen.set_backend(self.backend)
+        Widget._damage.clear()
+
+    def tearDown(self):
+        Screen.set_backend(TtyBackend())
+
+    def assert_in_sync(self):
+        buf = Screen().backbuf()
+        vt = self.backend.vt
+        for y in range(vt.height):
+            for x in range(vt.width):
+                if buf.front_chars[y][x] is not None:
+                    self.assertEqual((buf.front_chars[y][x], buf.front_attrs[y][x]),
+                                     (vt.chars[y][x], vt.attrs[y][x]), (x, y))
+        self.assertEqual(buf.front_chars, buf.chars)
+
+    def test_editor_full_width_scroll(self):
+        """Test that a full-width editor scrolls with DECSTBM + SU/SD and draws only the exposed row."""
+        e = Editor(0, 1, 20, 5)
+        e.set_lines([f"line{i}" for i in range(20)])
+        with e.frame():
+            e.redraw()
+        e.cur_line = e.row = 4
+        e.handle_input(Keys.KEY_DOWN)
+        out = self.backend.last_write
+        self.assertIn(b"\x1b[2;6r\x1b[1S\x1b[r", out)
+        self.assertIn(b"line5", out)
+        self.assertNotIn(b"line4", out)
+        e.handle_input(Keys.KEY_PGUP)
+        self.assertIn(b"\x1b[2;6r\x1b[1T\x1b[r", self.backend.last_write)
+        self.assertEqual([line[:5] for line in self.backend.text()[1:6]], [f"line{i}" for i in range(5)])
+        self.assert_in_sync()
+
+    def test_partial_width_scroll(self):
+        """Test that a rectangle narrower than the screen is scrolled only with left/right margins."""
+        s = Screen()
+        with s.frame():
+            for y in range(4):
+                s.goto(0, y)
+                s.wr(f"{y}" * 20)
+        with s.frame():
+            self.assertFalse(s.scroll_rect(2, 0, 5, 4, 1))
+        self.assertEqual(self.backend.text()[0], "0" * 20)
+        s.backbuf().lrmm = True
+        with s.frame():
+            self.assertTrue(s.scroll_rect(2, 0, 5, 4, 1))
+        self.assertIn(b"\x1b[1;4r\x1b[?69h\x1b[3;7s\x1b[1S\x1b[s\x1b[?69l\x1b[r", self.backend.last_write)
+        self.assertEqual(self.backend.text()[:4], ["00111110000000000000", "11222221111111111111",
+                                                   "22333332222222222222", "33     3333333333333"])
+        self.assert_in_sync()
+
+    def test_scroll_exposes_black_background(self):
+        """Test that lines exposed in black on black are known to differ from default blanks."""
+        s = Screen()
+        with s.frame():
+            s.attr_color(Color.C_BLACK, Color.C_BLACK)
+            for y in range(4):
+                s.goto(0, y)
+                s.wr(f"{y}" * 20)
+        with s.frame():
+            self.assertTrue(s.scroll_rect(0, 0, 20, 4, 1))
+        with s.frame():
+            s.attr_reset()
+            s.goto(0, 3)
+            s.wr(" " * 20)
+        self.assertEqual(self.backend.vt.colors_at(0, 3), self.backend.vt.colors_at(0, 5))
+        self.assert_in_sync()
+
@@ -0,0 +1,110 @@
+"""Unit tests for zen_tui.search and EditorExt search and replace"""
+
+import unittest
+from zen_tui.backend import HeadlessBackend, TtyBackend
+from zen_tui.basewidget import Widget
+from zen_tui.defs import Color, Keys
+from zen_tui.editorext import EditorExt
+from zen_tui.scheduler import Scheduler
+from zen_tui.screen import Screen
+from zen_tui.search import Search, compile_pattern
+
+
+class SearchTest(unittest.TestCase):
+    """ SearchTest class."""
+    def setUp(self):
+        self.backend = HeadlessBackend(40, 10)
+        Screen.set_backend(self.backend)
+        Widget._damage.clear()
+        Widget.scheduler = Scheduler()
+        self.e = EditorExt(0, 0, 40, 5)
+        self.e.set_lines([f"line {i} foo" if i % 100 == 99 else f"line {i}" for i in range(1000)])
+        self.e.redraw()
+
+    def tearDown(self):
+        Screen.set_backend(TtyBackend())
+
+    def render(self):
+        with self.e.frame():
+            self.e.update()
+
+    def run_timers(self):
+        while Widget.scheduler.timeout() is not None:
+            self.e.handle_timers()
+
+    def test_search(self):
+        """Test plain, regex and empty matches, and that patterns are compiled once."""
+        s = Search("a.", regex=False)
+        self.assertEqual(s.spans("aa.a.b"), [(1, 3), (3, 5)])
+        self.assertEqual(Search("A+", regex=True, ignore_case=True).spans("xaAx"), [(1, 3)])
+        self.assertEqual(Search("x*", regex=True).spans("axxb"), [(1, 3)])
+        self.assertEqual(Search(r"(\d+)", regex=True).replace("a1b22", r"<\1>"), ("a<1>b<22>", 2))
+        self.assertIs(compile_pattern("a.", False, False), s.re)
+
+    def test_find_in_slices_from_cursor(self):
+        """Test that search starts at the cursor, wraps around, runs between input events, and centers the match."""
+        e = self.e
+        e.search_chunk = 50
+        done = []
+        e.on("search_done", lambda w: done.append(w.found))
+        e.goto_line(500)
+        e.find("foo")
+        self.assertEqual(done, [])
+        self.run_timers()
+        self.assertEqual(done, [(599, 9, 12)])
+        self.assertEqual((e.cur_line, e.top_line, e.col), (599, 597, 9))
+        e.goto_line(950)
+        e.find("foo")
+        self.run_timers()
+        self.assertEqual(e.cur_line, 999)
+        e.find_next()
+        self.run_timers()
+        self.assertEqual(e.cur_line, 99)
+        e.find("nothing")
+        self.run_timers()
+        self.assertEqual(done[-1], None)
+
+    def test_visible_matches_highlighted(self):
+        """Test that matches are drawn in match colors, and incremental search restarts from its origin."""
+        e = self.e
+        e.find("line 9", line=0, col=0)
+        e.find("line 99", line=0, col=0)
+        self.assertEqual(e.cur_line, 99)
+        self.render()
+        self.assertEqual(self.backend.text()[2][:11], "line 99 foo")
+        self.assertEqual(self.backend.vt.colors_at(6, 2), (Color.C_BLACK, Color.C_YELLOW))
+        self.assertNotEqual(self.backend.vt.colors_at(8, 2), (Color.C_BLACK, Color.C_YELLOW))
+        e.find("")
+        self.render()
+        self.assertNotEqual(self.backend.vt.colors_at(6, 2), (Color.C_BLACK, Color.C_YELLOW))
+
+    def test_replace_all_is_one_step(self):
+        """Test that replace all is applied when every slice is searched, and undone at once."""
+        e = self.e
+        e.search_chunk = 300
+        redraws = []
+        org = e.redraw
+        e.redraw = lambda: redraws.append(1) or org()
+        e.replace_all("foo", "bar")
+        self.assertEqual((e.content[99], e.replaced), ("line 99 foo", 0))
+        self.run_timers()
+        self.assertEqual((e.content[99], e.content[999], e.replaced), ("line 99 bar", "line 999 bar", 10))
+        self.render()
+        self.assertEqual(len(redraws), 1)
+        e.handle_input(Keys.KEY_UNDO)
+        self.assertEqual([line for line in e.content if "foo" in line][-1], "line 999 foo")
+        self.assertFalse([line for line in e.content if "bar" in line])
+
+    def test_replace_all_after_lines_edited_meanwhile(self):
+        """Test that lines edited or moved while replace all is in progress are searched again."""
+        e = self.e
+        e.search_chunk = 300
+        e.replace_all("foo", "bar")
+        e.goto_line(0, col=0)
+        e.handle_input(Keys.KEY_ENTER)
+        e.goto_line(200, col=0)
+        e.handle_input(b"x")
+        self.run_timers()
+        self.assertFalse([line for line in e.content if "foo" in line])
+        self.assertEqual((e.content[0], e.content[200], e.content[1000]), ("", "xline 199 bar", "line 999 bar"))
+        self.assertEqual(e.replaced, 10)
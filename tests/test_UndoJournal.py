@@ -0,0 +1,80 @@
+"""Unit tests for zen_tui.undo.UndoJournal"""
+
+import unittest
+from zen_tui.backend import HeadlessBackend, TtyBackend
+from zen_tui.basewidget import Widget
+from zen_tui.defs import Keys
+from zen_tui.editor import Editor
+from zen_tui.screen import Screen
+from zen_tui.undo import UndoJournal
+from zen_tui.widgets import WTextEntry
+
+
+class UndoJournalTest(unittest.TestCase):
+    """ UndoJournalTest class."""
+    def setUp(self):
+        self.backend = HeadlessBackend(40, 10)
+        Screen.set_backend(self.backend)
+        Widget._damage.clear()
+
+    def tearDown(self):
+        Screen.set_backend(TtyBackend())
+
+    def test_keystrokes_merge_and_old_edits_are_dropped(self):
+        """Test that consecutive typing and deleting make one record each, and the size cap drops the oldest."""
+        journal = UndoJournal(max_size=3 * UndoJournal.record_overhead + 10)
+        for i, c in enumerate("word"):
+            journal.record(0, i, "", c)
+        journal.record(0, 3, "d", "")
+        journal.record(0, 2, "r", "")
+        journal.seal()
+        journal.record(0, 2, "", "x")
+        self.assertEqual(len(journal), 3)
+        journal.record(5, 0, "", "\n")
+        self.assertEqual(len(journal), 3)
+        [edit] = journal.undo()
+        self.assertEqual((edit.line, edit.col, edit.removed, edit.inserted), (5, 0, "", "\n"))
+        journal.undo()
+        [edit] = journal.undo()
+        self.assertEqual((edit.line, edit.col, edit.removed, edit.inserted), (0, 2, "rd", ""))
+        self.assertEqual(journal.undo(), [])
+        self.assertEqual(journal.redo(), [edit])
+
+    def test_editor_undo_redo(self):
+        """Test undoing and redoing typing, Enter and paste, redrawing only the changed lines."""
+        e = Editor(0, 0, 40, 5)
+        e.set_lines([f"line{i}" for i in range(20)])
+        e.redraw()
+        e.col = 4
+        for key in (b"a", b"b", Keys.KEY_ENTER, b"c", Keys.KEY_LEFT, Keys.KEY_BACKSPACE):
+            e.handle_input(key)
+        e.handle_paste("p\nq")
+        self.assertEqual(list(e.content[:4]), ["lineab", "p", "qc0", "line1"])
+        for _ in range(5):
+            e.handle_input(Keys.KEY_UNDO)
+        self.assertEqual(list(e.content[:2]), ["line0", "line1"])
+        self.assertEqual((e.cur_line, e.col), (0, 4))
+        self.assertEqual(self.backend.text()[:2], ["line0" + " " * 35, "line1" + " " * 35])
+        e.handle_input(Keys.KEY_REDO)
+        e.handle_input(Keys.KEY_REDO)
+        self.assertEqual(list(e.content[:3]), ["lineab", "0", "line1"])
+        self.assertEqual((e.cur_line, e.col), (1, 0))
+        # Changing a line redraws only it
+        e.handle_input(Keys.KEY_UNDO)
+        e.handle_input(Keys.KEY_REDO)
+        redrawn = []
+        e.redraw_rows = lambda start, end: redrawn.append((start, end))
+        e.handle_input(Keys.KEY_UNDO)
+        self.assertEqual(redrawn, [(0, 5)])
+        redrawn.clear()
+        e.handle_input(Keys.KEY_UNDO)
+        self.assertEqual(redrawn, [(0, 1)])
+
+    def test_undo_keeps_initial_entry_text(self):
+        """Test that undo on a freshly set entry isn't taken as typing over its text."""
+        entry = WTextEntry(10, "initial")
+        entry.handle_key(Keys.KEY_UNDO)
+        entry.handle_key(Keys.KEY_REDO)
+        self.assertEqual(entry.get(), "initial")
+        entry.handle_key(b"x")
+        self.assertEqual(entry.get(), "x")
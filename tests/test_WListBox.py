@@ -1,9 +1,13 @@
 """Unit tests for zen_tui.widgets.WListBox"""
 
 import unittest
-from zen_tui.widgets import WListBox
-from zen_tui.defs import Keys
+from zen_tui.backbuf import BG_DEFAULT, FG_DEFAULT
+from zen_tui.backend import HeadlessBackend, TtyBackend
+from zen_tui.basewidget import ACTION_OK, Widget
+from zen_tui.widgets import WListBox, WMultiEntry, WPopupList
+from zen_tui.defs import Color, Keys
 from zen_tui.context import Context
+from zen_tui.screen import Screen
 
 
 class User:
@@ -24,9 +28,72 @@ class UserListBox(WListBox):
 
 class WListBoxTest(unittest.TestCase):
     """ WListBoxTest class."""
+    def setUp(self):
+        self.backend = HeadlessBackend(20, 10)
+        Screen.set_backend(self.backend)
+        Widget._damage.clear()
+
+    def tearDown(self):
+        Screen.set_backend(TtyBackend())
+
     def test_handle_key_with_custom_type_of_items(self):
         """Test handle_key() with custom type of items."""
         with Context():
             users = [User('admin', 30), User('root', 27)]
             widget = UserListBox(width=5, height=5, items=users)
             self.assertIsNone(widget.handle_key(Keys.KEY_DOWN))
+
+    def test_items_changed_in_place(self):
+        """Test that items are kept by reference, so changing them and redrawing shows them."""
+        items = ["a", "b"]
+        widget = WListBox(5, 3, items)
+        self.assertIs(widget.content, items)
+        items.append("c")
+        widget.redraw()
+        self.assertEqual(self.backend.text()[2][:1], "c")
+
+    def test_loop_renders_highlight(self):
+        """Test that scripted keys move highlight on the rendered screen."""
+        widget = WPopupList.OneShotList(5, 2, ["admin", "root"])
+        widget.set_xy(1, 1)
+        self.backend.feed(b"\x1b[B", b"\r")
+        self.assertEqual(widget.loop(), ACTION_OK)
+        self.assertEqual(self.backend.text()[1:3], [" admin" + " " * 14, " root " + " " * 14])
+        self.assertEqual(self.backend.vt.colors_at(1, 1), (FG_DEFAULT, BG_DEFAULT))
+        self.assertEqual(self.backend.vt.colors_at(1, 2), (Color.C_BLACK, Color.C_GREEN))
+
+    def test_queued_keys_render_once(self):
+        """Test that input which already arrived is handled with one frame and one scroll."""
+        widget = WPopupList.OneShotList(20, 5, [f"item{i}" for i in range(50)])
+        widget.set_xy(0, 0)
+        widget.redraw()
+        for _ in range(4):
+            widget.handle_input(Keys.KEY_DOWN)
+        writes = self.backend.writes
+        self.backend.feed(b"\x1b[B", b"\x1b[B", b"\x1b[B", b"\r")
+        self.assertEqual(widget.loop(), ACTION_OK)
+        self.assertEqual(self.backend.writes, writes + 1)
+        self.assertIn(b"\x1b[3S", self.backend.last_write)
+        self.assertEqual([line.strip() for line in self.backend.text()[:5]], ["item3", "item4", "item5", "item6", "item7"])
+
+    def test_wheel_spin_is_one_scroll(self):
+        """Test that wheel notches which already arrived scroll the list once."""
+        widget = WPopupList.OneShotList(20, 10, [f"item{i}" for i in range(50)])
+        widget.set_xy(0, 0)
+        widget.redraw()
+        self.backend.feed(b"\x1b[<65;2;2M", b"\x1b[<65;2;2M", b"\x1b[<65;2;2M\r")
+        self.assertEqual(widget.loop(), ACTION_OK)
+        self.assertIn(b"\x1b[9S", self.backend.last_write)
+        self.assertEqual(self.backend.text()[0].strip(), "item9")
+        self.assertEqual(widget.cur_line, 9)
+
+    def test_edit_scrolled_out_and_back_is_drawn(self):
+        """Test that a row changed, scrolled out of view and back in one batch gets drawn."""
+        for keys in (b"X" + b"\x1b[B" * 5 + b"\x1b[A" * 5, b"X\x1b[<65;2;2M\x1b[<64;2;2M"):
+            widget = WMultiEntry(20, 5, [f"line{i}" for i in range(30)])
+            widget.set_xy(0, 0)
+            self.backend.feed(keys)
+            with self.assertRaises(EOFError):
+                widget.loop()
+            self.assertEqual(widget.get()[0], "Xline0")
+            self.assertEqual(self.backend.text()[0][:6], "Xline0")
@@ -0,0 +1,49 @@
+"""Unit tests for zen_tui.menu.WMenuBar"""
+
+import unittest
+from zen_tui.backend import HeadlessBackend, TtyBackend
+from zen_tui.basewidget import ACTION_CANCEL, Widget
+from zen_tui.menu import WMenuBar, WMenuBox
+from zen_tui.screen import Screen
+from zen_tui.widgets import Dialog, WButton
+
+
+class WMenuBarTest(unittest.TestCase):
+    """ WMenuBarTest class."""
+    def setUp(self):
+        self.backend = HeadlessBackend(40, 12)
+        Screen.set_backend(self.backend)
+        Widget._damage.clear()
+
+    def tearDown(self):
+        Screen.set_backend(TtyBackend())
+
+    def test_non_permanent_menu_restores_screen(self):
+        """Test that closing a menu puts back the cells under it and its pulldown, without repainting them."""
+        d = Dialog(0, 0, 40, 10, title="Title")
+        for y in range(1, 8):
+            d.add(1, y, f"row {y} " * 5)
+        d.add(1, 8, WButton(8, "OK"))
+        with d.frame():
+            d.redraw()
+        before = (self.backend.text(), [row[:] for row in self.backend.vt.attrs])
+        redraws = []
+        d.redraw = lambda: redraws.append(d)
+
+        menu_file = WMenuBox([("Open...", "Open"), ("Save", "S"), ("Exit", "ex")])
+        m = WMenuBar([("File", menu_file), ("About", "About")])
+        m.focus = True
+        # Pull down File, close it, then close the menu bar
+        self.backend.feed(b"\r", b"\x1b", b"\x1b")
+        self.assertEqual(m.loop(), ACTION_CANCEL)
+        self.assertEqual((self.backend.text(), self.backend.vt.attrs), before)
+        self.assertEqual(redraws, [])
+
+    def test_switching_pulldowns_doesnt_nest(self):
+        """Test that holding Right with a pulldown open switches pulldowns without recursion."""
+        menus = [(name, WMenuBox([(f"{name} item", name)])) for name in ("File", "Edit")]
+        m = WMenuBar(menus)
+        m.focus = True
+        self.backend.feed(b"\r", *[b"\x1b[C"] * 1001, b"\x1b", b"\x1b")
+        self.assertEqual(m.loop(), ACTION_CANCEL)
+        self.assertEqual(m.choice, 1)
@@ -0,0 +1,408 @@
+"""Back buffer module.
+
+Keeps an in-memory grid of screen cells (character + attribute) for the frame
+being drawn ("back") and for what the terminal currently shows ("front").
+Rendering emits only the cells which differ between the two.
+
+A cell is a terminal column. Wide (CJK, emoji) characters take two cells,
+the second one holds "" and is drawn along with the first, combining
+characters are kept in the cell of the character they combine with.
+"""
+
+from __future__ import annotations
+
+from unicodedata import combining, east_asian_width
+
+
+# Cell attribute is packed into an int:
+#   bits 0-3: foreground color 0-7, or FG_DEFAULT
+#   bit 4:    bold (used for intense foreground colors)
+#   bits 5-8: background color 0-7, or BG_DEFAULT
+#   bit 9:    intense background
+FG_DEFAULT = 9
+BG_DEFAULT = 9
+ATTR_BOLD = 0x10
+ATTR_BG_SHIFT = 5
+ATTR_BG_INTENSE = 0x200
+ATTR_DEFAULT = FG_DEFAULT | BG_DEFAULT << ATTR_BG_SHIFT
+
+# Runs of unchanged cells up to this long are rewritten instead of moving the cursor over them
+MAX_GAP = 4
+
+# C0 control characters would move the terminal cursor, show them as blanks
+_CTL_TABLE = {i: " " for i in range(32)}
+_CTL_TABLE[127] = " "
+
+
+def single_width(text: str) -> bool:
+    """Each character of text takes one terminal column (wide CJK/emoji take two, combining none)."""
+    return text.isascii() or all(east_asian_width(c) not in "WF" and not combining(c) for c in text)
+
+
+def _wide(c: str | None) -> bool:
+    return bool(c) and east_asian_width(c[0]) in "WF"
+
+
+def _cells(text: str) -> list[str]:
+    """Split text into cells, see module docstring."""
+    cells: list[str] = []
+    for c in text:
+        if combining(c) and cells:
+            cells[-2 if cells[-1] == "" else -1] += c
+        elif east_asian_width(c) in "WF":
+            cells += (c, "")
+        else:
+            cells.append(c)
+    return cells
+
+
+def make_attr(fg: int, bg: int, bold: bool = False, intense_bg: bool = False) -> int:
+    """Pack colors into a cell attribute."""
+    attr = fg | bg << ATTR_BG_SHIFT
+    if bold:
+        attr |= ATTR_BOLD
+    if intense_bg:
+        attr |= ATTR_BG_INTENSE
+    return attr
+
+
+def _fg_param(attr: int) -> str:
+    return str(30 + (attr & 0xF))
+
+
+def _bg_param(attr: int) -> str:
+    return str((100 if attr & ATTR_BG_INTENSE else 40) + (attr >> ATTR_BG_SHIFT & 0xF))
+
+
+def _sgr_abs(attr: int) -> bytes:
+    if attr == ATTR_DEFAULT:
+        return b"\x1b[0m"
+    params = ["0"]
+    if attr & ATTR_BOLD:
+        params.append("1")
+    if attr & 0xF != FG_DEFAULT:
+        params.append(_fg_param(attr))
+    if attr >> ATTR_BG_SHIFT & 0xF != BG_DEFAULT:
+        params.append(_bg_param(attr))
+    return f"\x1b[{';'.join(params)}m".encode()
+
+
+# Absolute SGR sequences (starting from reset) for every valid attribute
+SGR_ABS: dict[int, bytes] = {
+    make_attr(fg, bg, bold, intense_bg): b""
+    for fg in (*range(8), FG_DEFAULT)
+    for bg in (*range(8), BG_DEFAULT)
+    for bold in (False, True)
+    for intense_bg in ((False, True) if bg != BG_DEFAULT else (False,))
+}
+for _attr in SGR_ABS:
+    SGR_ABS[_attr] = _sgr_abs(_attr)
+
+# Cache of (from, to) -> minimal SGR transition
+_sgr_trans: dict[tuple[int, int], bytes] = {}
+
+
+def sgr(attr: int, cur: int | None = None) -> bytes:
+    """SGR sequence changing terminal attribute from cur (None if unknown) to attr.
+
+    Only the changed components are set, unless starting over from reset is shorter.
+    """
+    if cur is None:
+        return SGR_ABS.get(attr) or _sgr_abs(attr)
+    if attr == cur:
+        return b""
+    seq = _sgr_trans.get((cur, attr))
+    if seq is None:
+        params = []
+        if (attr ^ cur) & ATTR_BOLD:
+            params.append("1" if attr & ATTR_BOLD else "22")
+        if (attr ^ cur) & 0xF:
+            params.append(_fg_param(attr))
+        if (attr ^ cur) & (0xF << ATTR_BG_SHIFT | ATTR_BG_INTENSE):
+            params.append(_bg_param(attr))
+        seq = f"\x1b[{';'.join(params)}m".encode()
+        seq_abs = sgr(attr)
+        if len(seq_abs) <= len(seq):
+            seq = seq_abs
+        _sgr_trans[cur, attr] = seq
+    return seq
+
+
+# Cursor movement encodings, cached
+_cup_cache: dict[tuple[int, int], bytes] = {}
+_rel_cache: dict[tuple[int, int], bytes] = {}
+
+
+def cup(x: int, y: int) -> bytes:
+    """Absolute cursor position (CUP) sequence, with default parameters omitted."""
+    seq = _cup_cache.get((x, y))
+    if seq is None:
+        if x:
+            seq = f"\x1b[{y + 1};{x + 1}H".encode()
+        elif y:
+            seq = f"\x1b[{y + 1}H".encode()
+        else:
+            seq = b"\x1b[H"
+        _cup_cache[x, y] = seq
+    return seq
+
+
+def _rel(n: int, axis: int, lf: bool) -> bytes:
+    """Shortest relative move by n cells, horizontally (axis 0) or vertically (axis 1)."""
+    seq = _rel_cache.get((n, axis))
+    if seq is None:
+        if not n:
+            seq = b""
+        else:
+            final = "CDBA"[axis * 2 + (n < 0)]
+            seq = b"\x1b[" + (str(abs(n)).encode() if abs(n) > 1 else b"") + final.encode()
+            # Backspace moves left, LF moves down (only when output isn't post-processed)
+            single = b"\b" if n < 0 and not axis else b"\n" if n > 0 and axis else b""
+            if single and abs(n) < len(seq):
+                seq = single * abs(n)
+        _rel_cache[n, axis] = seq
+    if not lf and b"\n" in seq:
+        return f"\x1b[{n if n > 1 else ''}B".encode()
+    return seq
+
+
+class BackBuffer:
+    """Grid of screen cells with diff-based rendering.
+
+    Cells which were never drawn are None, and are never emitted. Front cells
+    which are None are unknown (e.g. after a resize) and get overwritten.
+    """
+
+    def __init__(self, width: int, height: int) -> None:
+        # Pen attribute and virtual cursor, as set by attr_color()/goto()
+        self.attr = ATTR_DEFAULT
+        self.x = 0
+        self.y = 0
+        self.cursor_on = True
+        # Terminal state as of the last render, None is unknown
+        self.term_x: int | None = None
+        self.term_y: int | None = None
+        self.term_cursor_on: bool | None = True
+        self.term_attr: int | None = None
+        # Whether LF only moves down, i.e. terminal is in raw mode
+        self.raw_lf = False
+        # Whether terminal supports left/right margins (DECLRMM), so that
+        # rectangles narrower than the screen can be scrolled too
+        self.lrmm = False
+        self.resize(width, height)
+
+    def resize(self, width: int, height: int) -> None:
+        self.width = width
+        self.height = height
+        self.chars: list[list[str | None]] = [[None] * width for _ in range(height)]
+        self.attrs: list[list[int]] = [[ATTR_DEFAULT] * width for _ in range(height)]
+        self.front_chars: list[list[str | None]] = [[None] * width for _ in range(height)]
+        self.front_attrs: list[list[int]] = [[ATTR_DEFAULT] * width for _ in range(height)]
+        self.dirty: set[int] = set()
+        self.term_x = self.term_y = None
+
+    def write(self, s: str) -> None:
+        """Put text at the cursor with the pen attribute, advancing the cursor by its width."""
+        x, y = self.x, self.y
+        s = s.translate(_CTL_TABLE)
+        cells = s if single_width(s) else _cells(s)
+        self.x = x + len(cells)
+        if not 0 <= y < self.height:
+            return
+        if x < 0:
+            cells = cells[-x:]
+            x = 0
+        end = min(self.x, self.width)
+        if x >= end:
+            return
+        row = self.chars[y]
+        row[x:end] = cells[:end - x]
+        self.attrs[y][x:end] = [self.attr] * (end - x)
+        self._mend(row, x)
+        self._mend(row, end)
+        self.dirty.add(y)
+
+    def _mend(self, row: list[str | None], x: int) -> None:
+        """Blank what is left of a wide character split between cells x - 1 and x."""
+        if x >= self.width:
+            if _wide(row[-1]):
+                row[-1] = " "
+        elif row[x] == "":
+            if not x or not _wide(row[x - 1]):
+                row[x] = " "
+        elif x and row[x - 1] and not row[x - 1].isascii() and _wide(row[x - 1]):
+            row[x - 1] = " "
+
+    def fill(self, num: int) -> None:
+        """Blank num cells from the cursor, without moving it."""
+        x = self.x
+        self.write(" " * num)
+        self.x = x
+
+    def save(self, x: int, y: int, w: int, h: int) -> tuple:
+        """Snapshot cells of a rectangle, for restore()."""
+        x = max(x, 0)
+        x2 = min(x + w, self.width)
+        rows = range(max(y, 0), min(y + h, self.height))
+        return (x, rows.start, [self.chars[r][x:x2] for r in rows], [self.attrs[r][x:x2] for r in rows])
+
+    def restore(self, saved: tuple) -> None:
+        """Put back cells saved by save()."""
+        x, y, chars, attrs = saved
+        for i, (row_c, row_a) in enumerate(zip(chars, attrs)):
+            if None in row_c:
+                # Never drawn, but not to be left as is either
+                row_c = [" " if c is None else c for c in row_c]
+            row = self.chars[y + i]
+            row[x:x + len(row_c)] = row_c
+            self.attrs[y + i][x:x + len(row_a)] = row_a
+            self._mend(row, x)
+            self._mend(row, x + len(row_c))
+            self.dirty.add(y + i)
+
+    def clear(self, out: bytearray) -> None:
+        """Clear whole screen with the pen attribute.
+
+        As the terminal does it with a single escape, both back and front become blank.
+        """
+        self.render(out, place_cursor=False)
+        self._set_attr(out, self.attr)
+        out += b"\x1b[2J"
+        blank_c = [" "] * self.width
+        blank_a = [self.attr] * self.width
+        self.chars = [blank_c[:] for _ in range(self.height)]
+        self.attrs = [blank_a[:] for _ in range(self.height)]
+        self.front_chars = [blank_c[:] for _ in range(self.height)]
+        self.front_attrs = [blank_a[:] for _ in range(self.height)]
+        self.dirty.clear()
+
+    def scroll(self, out: bytearray, x: int, y: int, w: int, h: int, n: int) -> bool:
+        """Scroll rectangle up by n lines (down if n < 0) using terminal scroll region.
+
+        Returns False if the terminal can't scroll this rectangle, the caller should redraw it instead.
+        Exposed lines are left blank.
+        """
+        if x < 0 or y < 0 or x + w > self.width or y + h > self.height or not 0 < abs(n) < h:
+            return False
+        full_width = x == 0 and w == self.width
+        if not full_width and not self.lrmm:
+            return False
+        # Scroll is applied to what the terminal shows, bring it up to date first
+        self.render(out, place_cursor=False)
+        out += f"\x1b[{y + 1};{y + h}r".encode()
+        if not full_width:
+            out += f"\x1b[?69h\x1b[{x + 1};{x + w}s".encode()
+        out += f"\x1b[{abs(n)}{'S' if n > 0 else 'T'}".encode()
+        if not full_width:
+            out += b"\x1b[s\x1b[?69l"
+        out += b"\x1b[r"
+        # Setting scroll region homes the cursor
+        self.term_x = self.term_y = 0
+
+        # Terminal fills exposed lines with blanks in current background color
+        blank_c = [" " if self.term_attr is not None else None] * w
+        blank_a = [ATTR_DEFAULT if self.term_attr is None else self.term_attr] * w
+        for grid, blank in ((self.chars, blank_c), (self.attrs, blank_a),
+                            (self.front_chars, blank_c), (self.front_attrs, blank_a)):
+            rows = [row[x:x + w] for row in grid[y:y + h]]
+            if n > 0:
+                rows = rows[n:] + [blank] * n
+            else:
+                rows = [blank] * -n + rows[:n]
+            for i, part in enumerate(rows):
+                grid[y + i][x:x + w] = part
+        return True
+
+    def _set_attr(self, out: bytearray, attr: int) -> None:
+        if attr != self.term_attr:
+            out += sgr(attr, self.term_attr)
+            self.term_attr = attr
+
+    def _move(self, out: bytearray, x: int, y: int) -> None:
+        """Move terminal cursor using the cheapest of absolute or relative encodings."""
+        tx, ty = self.term_x, self.term_y
+        if tx == x and ty == y:
+            return
+        best = cup(x, y)
+        if tx is not None and ty is not None:
+            vert = _rel(y - ty, 1, self.raw_lf)
+            if len(vert) < len(best):
+                for seq in (vert + _rel(x - tx, 0, False), vert + b"\r" + _rel(x, 0, False)):
+                    if len(seq) < len(best):
+                        best = seq
+        out += best
+        self.term_x = x
+        self.term_y = y
+
+    def _runs(self, y: int) -> list[tuple[int, int]]:
+        """Spans [start, end) of cells that need to be emitted on row y."""
+        bc, ba = self.chars[y], self.attrs[y]
+        fc, fa = self.front_chars[y], self.front_attrs[y]
+        runs = []
+        start = end = -1
+        for x in range(self.width):
+            c = bc[x]
+            if c is None or (c == fc[x] and ba[x] == fa[x]):
+                continue
+            if start >= 0 and x - end <= MAX_GAP and None not in bc[end:x]:
+                end = x + 1
+                continue
+            if start >= 0:
+                runs.append((start, end))
+            # Wide character is drawn whole, from its first cell
+            start, end = (x - 1 if c == "" else x), x + 1
+        if start >= 0:
+            runs.append((start, end))
+        return [(start, end + 1 if end < self.width and bc[end] == "" else end) for start, end in runs]
+
+    def render(self, out: bytearray, place_cursor: bool = True) -> None:
+        """Append escapes bringing the terminal from front to back state to out."""
+        width = self.width
+        for y in sorted(self.dirty):
+            bc, ba = self.chars[y], self.attrs[y]
+            if bc == self.front_chars[y] and ba == self.front_attrs[y]:
+                continue
+            for start, end in self._runs(y):
+                self._move(out, start, y)
+                # Trailing blanks up to the row end are erased with a single escape
+                eol = end
+                if end == width:
+                    tail_a = ba[end - 1]
+                    while eol > start and bc[eol - 1] == " " and ba[eol - 1] == tail_a:
+                        eol -= 1
+                    if end - eol < 4:
+                        eol = end
+                x = start
+                tracked = True
+                while x < eol:
+                    a = ba[x]
+                    seg = x + 1
+                    while seg < eol and ba[seg] == a:
+                        seg += 1
+                    self._set_attr(out, a)
+                    text = "".join(bc[x:seg])
+                    out += text.encode()
+                    tracked = tracked and single_width(text)
+                    x = seg
+                if eol < end:
+                    self._set_attr(out, ba[eol])
+                    out += b"\x1b[K"
+                if tracked:
+                    self.term_x = x if x < width else None
+                else:
+                    # Where the terminal cursor ended up isn't known, next move is absolute
+                    self.term_x = self.term_y = None
+            self.front_chars[y] = bc[:]
+            self.front_attrs[y] = ba[:]
+        self.dirty.clear()
+
+        if not place_cursor:
+            return
+        # Position of a hidden cursor doesn't matter until it's shown
+        if self.cursor_on:
+            x = min(max(self.x, 0), width - 1)
+            y = min(max(self.y, 0), self.height - 1)
+            self._move(out, x, y)
+        if self.cursor_on != self.term_cursor_on:
+            out += b"\x1b[?25h" if self.cursor_on else b"\x1b[?25l"
+            self.term_cursor_on = self.cursor_on
@@ -0,0 +1,218 @@
+"""Backend module.
+
+A backend is where Screen output goes and where Widget input comes from.
+TtyBackend is the real terminal on stdin/stdout. HeadlessBackend runs widgets
+without a terminal: output is parsed by an in-memory VTerm, and input is
+scripted, so tests and benchmarks can assert on rendered cells and on bytes
+emitted per action.
+
+Set with Screen.set_backend(), or Context(backend=...).
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+    import select
+    import struct
+    import termios
+    import tty
+
+from .vterm import VTerm
+
+
+class TtyBackend:
+    """Terminal on stdin/stdout."""
+
+    def __init__(self) -> None:
+        self.org_termios = None
+        # Output isn't post-processed (LF doesn't do CR), set by init_tty()
+        self.raw_output = False
+        # Self-pipe (an event on Windows), so that another thread can interrupt read(), see wakeup()
+        if os.name == "nt":
+            self._wake = threading.Event()
+        else:
+            self._wake_r, self._wake_w = os.pipe()
+            os.set_blocking(self._wake_r, False)
+            os.set_blocking(self._wake_w, False)
+
+    def init_tty(self) -> None:
+        if os.name != "nt":
+            self.org_termios = termios.tcgetattr(0)
+            tty.setraw(0)
+            self.raw_output = True
+
+    def deinit_tty(self) -> None:
+        if os.name != "nt" and self.org_termios:
+            termios.tcsetattr(0, termios.TCSANOW, self.org_termios)
+            self.raw_output = False
+
+    def write(self, data: bytes) -> None:
+        # os.write(1, s)  # Doesn't print unicode bytes on Windows.
+        sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
+
+    def read(self, timeout: float | None = None) -> bytes:
+        """Read available input bytes, blocking until there are some, or until wakeup().
+
+        With timeout (in seconds), return b"" if nothing arrived in time. Also
+        returns b"" if woken up.
+        """
+        if os.name == "nt":
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while not msvcrt.kbhit():
+                if self._wake.is_set():
+                    self._wake.clear()
+                    return b""
+                if deadline is not None and time.monotonic() >= deadline:
+                    return b""
+                time.sleep(0.01)
+            return msvcrt.getch()
+        ready = select.select([0, self._wake_r], [], [], timeout)[0]
+        if self._wake_r in ready:
+            self._drain_wakeup()
+        if 0 not in ready:
+            return b""
+        return os.read(0, 32)
+
+    def wakeup(self) -> None:
+        """Make a blocked read() (or add_reader() callback) return. Can be called from any thread."""
+        if os.name == "nt":
+            self._wake.set()
+            return
+        try:
+            os.write(self._wake_w, b"\0")
+        except BlockingIOError:
+            # Pipe is full, a wakeup is pending anyway
+            pass
+
+    def _drain_wakeup(self) -> None:
+        try:
+            while os.read(self._wake_r, 512):
+                pass
+        except BlockingIOError:
+            pass
+
+    def size(self) -> tuple[int, int]:
+        if os.name == "nt":
+            return tuple(os.get_terminal_size())
+        # Output may be redirected, then ask the input terminal
+        for fd in (1, 0):
+            try:
+                rows, cols = struct.unpack("hh", fcntl.ioctl(fd, termios.TIOCGWINSZ, b"\0" * 8)[:4])
+            except OSError:
+                continue
+            return (cols, rows)
+        raise OSError("Not a terminal")
+
+    def add_reader(self, loop, callback) -> None:
+        """Have asyncio loop call callback() when input is available, until remove_reader()."""
+        if os.name != "nt":
+            loop.add_reader(0, callback)
+
+            def woken():
+                self._drain_wakeup()
+                callback()
+            loop.add_reader(self._wake_r, woken)
+            return
+        # Console input can't be waited on by asyncio loops on Windows, poll it
+        def check():
+            if msvcrt.kbhit() or self._wake.is_set():
+                self._wake.clear()
+                callback()
+            self._poll = loop.call_later(0.01, check)
+        self._poll = loop.call_soon(check)
+
+    def remove_reader(self, loop) -> None:
+        if os.name != "nt":
+            loop.remove_reader(0)
+            loop.remove_reader(self._wake_r)
+        else:
+            self._poll.cancel()
+
+
+class HeadlessBackend:
+    """In-memory terminal with scripted input.
+
+    Each feed() is delivered by one read(), the way separate keystrokes arrive
+    from a terminal. Replies to terminal queries (DECRQM, cursor position) are
+    queued as input after the write that asked for them.
+    """
+
+    def __init__(self, width: int = 80, height: int = 24, modes: tuple[int, ...] = ()) -> None:
+        """
+        Args:
+            width, height: Screen size.
+            modes: DEC private modes to report as supported, e.g. (MODE_SYNC_OUTPUT,).
+        """
+        self.vt = VTerm(width, height, modes)
+        self.input: deque[bytes] = deque()
+        self.raw_output = False
+        self._reader = None
+        # Output counters
+        self.writes = 0
+        self.bytes_written = 0
+        self.last_write = b""
+
+    def init_tty(self) -> None:
+        self.raw_output = True
+
+    def deinit_tty(self) -> None:
+        self.raw_output = False
+
+    def feed(self, *chunks: bytes) -> None:
+        """Queue input, each chunk is returned by a separate read()."""
+        self.input.extend(chunks)
+        if self._reader and self.input:
+            self._reader()
+
+    def write(self, data: bytes) -> None:
+        data = bytes(data)
+        self.writes += 1
+        self.bytes_written += len(data)
+        self.last_write = data
+        self.vt.write(data)
+        replies = self.vt.take_replies()
+        if replies:
+            self.feed(replies)
+
+    def read(self, timeout: float | None = None) -> bytes:
+        if self.input:
+            return self.input.popleft()
+        if timeout is None:
+            # Nothing would ever arrive, don't hang
+            raise EOFError("Scripted input exhausted")
+        return b""
+
+    def size(self) -> tuple[int, int]:
+        return (self.vt.width, self.vt.height)
+
+    def resize(self, width: int, height: int) -> None:
+        """Resize the virtual terminal. Nothing is signalled, call Screen._on_winch() as SIGWINCH would."""
+        self.vt.resize(width, height)
+
+    def wakeup(self) -> None:
+        # read() doesn't block, only a waiting aloop() needs waking up
+        reader = self._reader
+        if reader:
+            reader()
+
+    def add_reader(self, loop, callback) -> None:
+        self._reader = lambda: loop.call_soon_threadsafe(callback)
+        if self.input:
+            self._reader()
+
+    def remove_reader(self, _loop) -> None:
+        self._reader = None
+
+    def text(self) -> list[str]:
+        """Rendered screen contents as lines of text."""
+        return self.vt.text()
@@ -2,13 +2,13 @@
 
 from __future__ import annotations
 
-import os
-
-if os.name == "nt":
-    import msvcrt
+import asyncio
+import time
+from collections import deque
 
 from .screen import Screen
-from .defs import Keys
+from .decoder import MouseEvent, Paste, Report
+from .scheduler import Scheduler, Timer
 
 
 # Standard widget result actions (as return from .loop())
@@ -21,15 +21,35 @@ class Widget(Screen):
     """Widget class."""
 
     popup_class = None
+    # If set, screen contents under the widget are restored when its loop() ends (for popups)
+    save_under = False
+
+    # Widgets pending redraw, shared by all widgets: widget -> damaged rect
+    # (x, y, w, h) in screen coordinates, or None for the whole widget.
+    # Rendered once per handled input event, see update().
+    _damage: dict[Widget, tuple[int, int, int, int] | None] = {}
+    # Popups requested by event handlers while aloop() dispatches, see popup()
+    _popups: deque = deque()
+    _defer_popups = False
+    # Popups with save_under whose loops run, innermost last: [popup, rect, saved
+    # screen contents under it], kept up to date as widgets under it change
+    _open_popups: list[list] = []
+    # Future which aloop() awaits, completed when there is something to render
+    _waiter: asyncio.Future | None = None
+    # Timers, run by whichever loop is waiting for input, see call_later()
+    scheduler = Scheduler()
+    # Cap on frames rendered for changes made by timers (and by tasks under aloop())
+    max_fps = 30
+    _last_render = 0.0
+    # Input chunks kept in key_story, the most recent ones
+    key_story_len = 64
 
     def __init__(self):
         super().__init__()
-        self.multikeys: list[bytes] = [k for k in Keys.KEYMAP if isinstance(k, bytes) and len(k) > 1]
-
         self.signals = {}
         self.owner = None
 
-        self.key_story = b""
+        self.key_story: deque[bytes] = deque(maxlen=self.key_story_len)
         self.kbuf = b""
         self.top_line = 0
         self.cur_line = 0
@@ -49,7 +69,7 @@ class Widget(Screen):
         self.finish_dialog = False
 
     def reset(self) -> None:
-        self.key_story = b""
+        self.key_story: deque[bytes] = deque(maxlen=self.key_story_len)
         self.kbuf = b""
         self.top_line = 0
         self.cur_line = 0
@@ -99,103 +119,411 @@ class Widget(Screen):
         # raise NotImplementedError("Implement redraw()")
         pass
 
+    def redraw_rect(self, _rect: tuple[int, int, int, int]) -> None:
+        # Widgets which can redraw only part of themselves override this
+        self.redraw()
+
+    def invalidate(self, rect: tuple[int, int, int, int] | None = None) -> None:
+        """Schedule redraw of the whole widget, or of rect (x, y, w, h) in screen coordinates."""
+        waiter = Widget._waiter
+        if waiter is not None and not waiter.done():
+            # Changed from outside of input handling (e.g. by a coroutine), wake aloop()
+            waiter.set_result(None)
+        damage = Widget._damage
+        if rect is None or self not in damage:
+            damage[self] = rect
+            return
+        old = damage[self]
+        if old is None:
+            return
+        if not old[2] or not old[3]:
+            # Empty (e.g. only a pending scroll, see Editor.scroll_view())
+            damage[self] = rect
+        else:
+            x = min(old[0], rect[0])
+            y = min(old[1], rect[1])
+            x2 = max(old[0] + old[2], rect[0] + rect[2])
+            y2 = max(old[1] + old[3], rect[1] + rect[3])
+            damage[self] = (x, y, x2 - x, y2 - y)
+
+    @staticmethod
+    def render_damage() -> None:
+        """Redraw all damaged widgets, each at most once.
+
+        Widgets under open popups are drawn into what the popups saved,
+        rather than over them.
+        """
+        damage = list(Widget._damage.items())
+        Widget._damage.clear()
+        whole = {w for w, rect in damage if rect is None}
+        popups = Widget._open_popups
+        # Widgets to draw under popups from each level on
+        under: dict[int, list] = {}
+        for w, rect in damage:
+            # Skip widgets which get redrawn as part of their owner
+            owner = w.owner
+            while owner is not None and owner not in whole:
+                owner = owner.owner
+            if owner is not None:
+                continue
+            level = w.popup_level()
+            if level < len(popups):
+                under.setdefault(level, []).append((w, rect))
+            elif rect is None:
+                w.redraw()
+            else:
+                w.redraw_rect(rect)
+        for level in sorted(under):
+            # Take popups off the screen down to the level, then put them
+            # back over what is under them now
+            covered = []
+            for popup, rect, saved in reversed(popups[level:]):
+                covered.append(popup.save_region(*rect))
+                popup.restore_region(saved)
+            for w, rect in under[level]:
+                if rect is None:
+                    w.redraw()
+                else:
+                    w.redraw_rect(rect)
+            for entry in popups[level:]:
+                entry[2] = entry[0].save_region(*entry[1])
+                entry[0].restore_region(covered.pop())
+
+    def popup_level(self) -> int:
+        """Number of open popups this widget is under (not part of), see _open_popups."""
+        popups = Widget._open_popups
+        w = self
+        while w is not None:
+            for i, entry in enumerate(popups):
+                if entry[0] is w:
+                    return i + 1
+            w = w.owner
+        return 0
+
+    def scroll_rect(self, x: int, y: int, w: int, h: int, n: int) -> bool:
+        # Popups over the widget would be scrolled along
+        for _popup, (px, py, pw, ph), _saved in Widget._open_popups[self.popup_level():]:
+            if px < x + w and x < px + pw and py < y + h and y < py + ph:
+                return False
+        return super().scroll_rect(x, y, w, h, n)
+
+    def update(self) -> None:
+        """Render pending damage, then let this widget place the cursor."""
+        self.render_damage()
+        self.set_cursor()
+        Widget._last_render = time.monotonic()
+
+    def call_later(self, delay: float, callback, *args) -> Timer:
+        """Call callback(*args) after delay seconds, from the event loop."""
+        return Widget.scheduler.call_later(delay, callback, *args)
+
+    def call_every(self, interval: float, callback, *args) -> Timer:
+        """Call callback(*args) every interval seconds, from the event loop."""
+        return Widget.scheduler.call_every(interval, callback, *args)
+
+    def post(self, callback, *args) -> None:
+        """Call callback(*args) from the event loop, waking it up. Can be called from any thread."""
+        Widget.scheduler.post(callback, *args)
+        Screen.backend.wakeup()
+
+    @staticmethod
+    def idle_timeout() -> float | None:
+        """Seconds input can be waited for until timers, a deferred frame or resize are due, None if forever."""
+        timeout = Widget.scheduler.timeout()
+        if Widget._damage:
+            frame = max(Widget._last_render + 1 / Widget.max_fps - time.monotonic(), 0)
+            timeout = frame if timeout is None else min(timeout, frame)
+        if Screen._resized_at is not None:
+            resize = max(Screen._resized_at + Screen.resize_delay - time.monotonic(), 0)
+            timeout = resize if timeout is None else min(timeout, resize)
+        return timeout
+
+    def handle_resize(self) -> None:
+        """Relayout and redraw once resizes stopped coming for resize_delay, see set_screen_resize()."""
+        resized_at = Screen._resized_at
+        if resized_at is None or time.monotonic() - resized_at < Screen.resize_delay:
+            return
+        Screen._resized_at = None
+        # Terminal contents may be reflowed or lost, so everything gets repainted
+        width, height = self.screen_size(force_read=True)
+        if width and height:
+            self.backbuf().resize(width, height)
+        if Screen._resize_handler:
+            Screen._resize_handler()
+            # Open popups go over the redrawn screen again
+            for entry in Widget._open_popups:
+                entry[2] = entry[0].save_region(*entry[1])
+                entry[0].redraw()
+        else:
+            self.redraw()
+        self.update()
+
+    def handle_timers(self) -> None:
+        """Handle resize, run posted calls and due timers, and render changes unless a frame was rendered too recently."""
+        with self.frame():
+            self.handle_resize()
+            Widget.scheduler.run_due()
+            if Widget._damage and time.monotonic() - Widget._last_render >= 1 / Widget.max_fps:
+                self.update()
+
 
     def handle_mouse(self, _col: int, _row: int) -> bool:
         # raise NotImplementedError("Implement handle_mouse()")
         return False
 
+    def handle_mouse_event(self, _ev: MouseEvent) -> bool | int | None:
+        # Mouse events other than left button press (which goes to handle_mouse()):
+        # release, drag, wheel, other buttons
+        return None
+
     def handle_key(self, _key) -> bool | int | None:
         # raise NotImplementedError("Implement handle_key()")
         return False
 
+    def handle_paste(self, _text: str) -> bool | int | None:
+        # Widgets which take text input override this
+        return None
+
     def get_choices(self, _substr: str, _only_prefix: bool=False):
         # raise NotImplementedError("Implement get_choices()")
         return []
 
 
-    def get_chrs(self) -> bytes:
+    def get_chrs(self, timeout: float | None = None) -> bytes:
+        """Read input bytes, blocking unless timeout (in seconds) is given."""
         if self.kbuf:
-            # key = self.kbuf[0:1]
-            # self.kbuf = self.kbuf[1:]
             key = self.kbuf
             self.kbuf = b""
-        elif os.name == "nt":
-            key = msvcrt.getch()
-        else:
-            key = os.read(0, 32)
-        return key
-
-    def maybe_multikey(self, key) -> tuple[int, bool]:
-        """Determine if can map, or need to read another byte to map a multikey sequence.
+            return key
+        # Whatever was drawn so far must be visible before we block for input
+        self.flush()
+        return Screen.backend.read(timeout)
 
-        Args:
-            key: One or more bytes of keys input.
+    def get_input(self) -> bytes | int | list[int] | str | None:
+        """Wait for the next input event.
 
-        Returns:
-            can_map, need_more: count of key bytes that can be mapped, and whether more bytes are needed.
+        Returns None when timers, rendering of changes or a resize are due
+        (see idle_timeout()), then loops call handle_timers() before waiting
+        again.
         """
-        if key.startswith(Keys.MOUSE_PREFIX):
-            need_len = 6
-            return need_len if len(key) >= need_len else 0, len(key) < need_len
-        if Keys.MOUSE_PREFIX.startswith(key) and len(key) < len(Keys.MOUSE_PREFIX):
-            return 0, True
-
-        # return any(multikey.startswith(key) and len(key) < len(multikey) for multikey in self.multikeys)
-        for multikey in Keys.KEYMAP:
-            if key == multikey:
-                return len(multikey), False  # No more bytes needed, can map
-            if multikey.startswith(key) and len(key) < len(multikey):
-                return 0, True  # More bytes needed to map
-        return 0, False
-
-    def get_input(self) -> bytes | int | list[int] | None:
-        key = self.get_chrs()
-        # length_multi = 0
+        if Screen._events:
+            return Screen._events.popleft()
+        decoder = Screen.decoder
         while True:
-            can_map, need_more = self.maybe_multikey(key)
-            if not need_more:
+            key = decoder.get()
+            if key is not None:
                 break
-            # length_multi = len(key)
-            key = key + self.get_chrs()
+            if decoder.pending:
+                # Incomplete sequence, or a lone ESC if nothing follows it soon
+                data = self.get_chrs(decoder.esc_timeout)
+                if not data:
+                    key = decoder.get(final=True)
+                    break
+            else:
+                data = self.get_chrs(self.idle_timeout())
+                if not data:
+                    # Time to run timers (see handle_timers())
+                    return None
+            self.key_story.append(data)
+            decoder.feed(data)
 
-        self.key_story = self.key_story + key
+        if isinstance(key, Report):
+            self.handle_report(key)
+            return None
+        return key
 
-        if can_map:
-            if key.startswith(Keys.MOUSE_PREFIX) and len(key) == Keys.MOUSE_LEN:
-                # Decode mouse input (X10 compatibility mode SET_X10_MOUSE, Normal tracking mode SET_VT200_MOUSE, MOUSE_VT200_BUTTON1=):
-                if key[3] not in [Keys.MOUSE_X10_BUTTON1, Keys.MOUSE_VT200_BUTTON1]:
+    def poll_input(self) -> bytes | int | list[int] | str | None:
+        """Get input event if one already arrived, otherwise return None without blocking."""
+        if Screen._events:
+            return Screen._events.popleft()
+        decoder = Screen.decoder
+        while True:
+            key = decoder.get()
+            if key is None:
+                data = self.kbuf or Screen.backend.read(0)
+                self.kbuf = b""
+                if not data:
                     return None
-                row = key[5] - 33
-                col = key[4] - 33
-                return [col, row]
-            key = Keys.KEYMAP.get(key, key)
-        else:
-            # Put the remainder of the key into the buffer
-            key = key.decode()
-            self.kbuf = key[1:].encode()
-            key = key[0:1].encode()
+                self.key_story.append(data)
+                decoder.feed(data)
+            elif isinstance(key, Report):
+                self.handle_report(key)
+            else:
+                return key
+
+    def merge_mouse(self, ev: MouseEvent) -> MouseEvent:
+        """Merge following mouse events which already arrived into ev (drag floods, wheel spins)."""
+        while (nxt := self.poll_input()) is not None:
+            merged = ev.merge(nxt)
+            if merged is None:
+                Screen._events.appendleft(nxt)
+                break
+            ev = merged
+        return ev
+
+    def dispatch_input(self, inp) -> bool | int | None:
+        """Pass input event to the handler for its kind, without rendering."""
+        if isinstance(inp, MouseEvent):
+            if inp.action == MouseEvent.PRESS and inp.button == MouseEvent.BUTTON_LEFT:
+                return self.handle_mouse(inp[0], inp[1])
+            return self.handle_mouse_event(inp)
+        if isinstance(inp, list):
+            return self.handle_mouse(inp[0], inp[1])
+        if isinstance(inp, Paste):
+            return self.handle_paste(inp)
+        return self.handle_key(inp)
 
-        return key
+    def popup(self, popup: Widget, done=None) -> bool | int | None:
+        """Run popup's loop, and return done(result), or the result if done is None.
+
+        Event handlers return what this returns. Under aloop(), a popup can't
+        run from inside the handler, so it runs after the handler returns,
+        and this returns None.
+        """
+        if Widget._defer_popups:
+            Widget._popups.append((popup, done))
+            return None
+        res = popup.loop()
+        return done(res) if done else res
+
+    @staticmethod
+    def _call_deferring_popups(func, *args):
+        Widget._defer_popups = True
+        try:
+            return func(*args)
+        except BaseException:
+            Widget._popups.clear()
+            raise
+        finally:
+            Widget._defer_popups = False
+
+    async def arun_popups(self, res):
+        """Run popups deferred while handling an event which returned res, see popup()."""
+        while Widget._popups:
+            if res is not None and res is not True:
+                Widget._popups.clear()
+                break
+            popup, done = Widget._popups.popleft()
+            res = await popup.aloop()
+            if done:
+                res = self._call_deferring_popups(done, res)
+        return res
 
     def handle_input(self, inp):
-        if isinstance(inp, list):
-            res = self.handle_mouse(inp[0], inp[1])
-        else:
-            res = self.handle_key(inp)
+        # All output caused by one input event goes out as one frame
+        with self.frame():
+            res = self.dispatch_input(inp)
+            self.update()
         return res
 
+    def loop_start(self):
+        """Draw widget when its loop starts, return what to restore when it ends (see loop_end())."""
+        with self.frame():
+            # Pending damage first, as it may be under this widget (e.g. a popup)
+            self.render_damage()
+            saved = None
+            if self.save_under:
+                rect = (self.x, self.y, self.w, self.h)
+                saved = [self, rect, self.save_region(*rect)]
+                Widget._open_popups.append(saved)
+            self.redraw()
+        return saved
+
+    def loop_end(self, saved) -> None:
+        """Put back screen contents under the widget when its loop ends."""
+        if saved:
+            Widget._open_popups.remove(saved)
+            self.restore_region(saved[2])
 
     def loop(self) -> bool | int:
-        self.redraw()
+        saved = None
+        try:
+            saved = self.loop_start()
+            while True:
+                key = self.get_input()
+                if key is None:
+                    self.handle_timers()
+                    continue
+                # Apply this and all input which already arrived (e.g. key repeat),
+                # then render once, so the screen doesn't lag behind a backlog of frames
+                with self.frame():
+                    while True:
+                        if isinstance(key, MouseEvent):
+                            key = self.merge_mouse(key)
+                        res = self.dispatch_input(key)
+                        if res is not None and res is not True:
+                            break
+                        key = self.poll_input()
+                        if key is None:
+                            break
+                    Widget.scheduler.run_due()
+                    self.update()
+
+                if res is not None and res is not True:
+                #? if res is not None:
+                    return res
+        finally:
+            self.loop_end(saved)
+
+    async def aget_input(self) -> bytes | int | list[int] | str | None:
+        """Wait for input without blocking the asyncio loop.
+
+        Returns None if timers or rendering of changes made meanwhile (see
+        invalidate()) are due.
+        """
+        decoder = Screen.decoder
+        loop = asyncio.get_running_loop()
         while True:
-            key = self.get_input()
-            if key is None:
-                continue
-            res = self.handle_input(key)
-
-            if res is not None and res is not True:
-            #? if res is not None:
-                return res
+            key = self.poll_input()
+            if key is not None:
+                return key
+            timeout = self.idle_timeout()
+            if timeout == 0:
+                return None
+            esc_wait = decoder.pending and (timeout is None or decoder.esc_timeout <= timeout)
+            if esc_wait:
+                # With an incomplete sequence, wait for its rest only that long
+                timeout = decoder.esc_timeout
+            self.flush()
+            waiter = Widget._waiter = loop.create_future()
+            Screen.backend.add_reader(loop, lambda: waiter.done() or waiter.set_result(None))
+            try:
+                await asyncio.wait([waiter], timeout=timeout)
+            finally:
+                Screen.backend.remove_reader(loop)
+                Widget._waiter = None
+            if not waiter.done():
+                return decoder.get(final=True) if esc_wait else None
+
+    async def aloop(self) -> bool | int:
+        """Like loop(), but awaits input, so other asyncio tasks run meanwhile.
+
+        Tasks can change widgets and invalidate() them, changes are rendered
+        on the next frame (at most max_fps times a second).
+        """
+        saved = None
+        try:
+            saved = self.loop_start()
+            while True:
+                key = await self.aget_input()
+                if key is None:
+                    self.handle_timers()
+                    continue
+                with self.frame():
+                    while key is not None:
+                        if isinstance(key, MouseEvent):
+                            key = self.merge_mouse(key)
+                        res = await self.arun_popups(self._call_deferring_popups(self.dispatch_input, key))
+                        if res is not None and res is not True:
+                            break
+                        key = self.poll_input()
+                    Widget.scheduler.run_due()
+                    self.update()
+
+                if res is not None and res is not True:
+                    return res
+        finally:
+            self.loop_end(saved)
 
 
 class FocusableWidget(Widget):
@@ -234,5 +562,5 @@ class ItemSelWidget(ChoiceWidget):
 
     def move_sel(self, direction):
         self.choice = (self.choice + direction) % len(self.items)
-        self.redraw()
+        self.invalidate()
         self.signal("changed")
@@ -2,7 +2,7 @@
 
 from collections.abc import Mapping
 
-from .screen import Screen
+from .screen import MODE_LRMM, MODE_SYNC_OUTPUT, SYNC_END, Screen
 
 
 class Context:
@@ -23,20 +23,39 @@ class Context:
         # Instance initialization
         self.clear_screen = kwargs.get("clear_screen", True)
         self.use_mouse = kwargs.get("use_mouse", True)
+        self.use_paste = kwargs.get("use_paste", True)
+        # Detect optional terminal features (synchronized output, left/right margins)
+        self.query_terminal = kwargs.get("query_terminal", True)
+        # Time to wait for the rest of an escape sequence before taking ESC as a key
+        if "esc_timeout" in kwargs:
+            Screen.decoder.esc_timeout = kwargs["esc_timeout"]
+        # Alternative backend, e.g. zen_tui.backend.HeadlessBackend
+        backend = kwargs.get("backend")
+        if backend is not None:
+            Screen.set_backend(backend)
         self.screen = Screen()
 
     def __enter__(self):
         self.screen.init_tty()
+        if self.query_terminal:
+            self.screen.query_modes(MODE_SYNC_OUTPUT, MODE_LRMM)
         if self.use_mouse:
             self.screen.enable_mouse()
+        if self.use_paste:
+            self.screen.enable_paste()
         if self.clear_screen:
             self.screen.cls()
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if Screen.sync_output:
+            # In case a frame was cut short
+            self.screen.wr_ctl(SYNC_END)
         if self.use_mouse:
             self.screen.disable_mouse()
-        self.screen.goto(0, self.screen._screen_height or 50)
+        if self.use_paste:
+            self.screen.disable_paste()
+        self.screen.goto(0, Screen._size[1] if Screen._size else 50)
         self.screen.cursor(on=True)
         self.screen.deinit_tty()
         # This makes sure that entire screenful is scrolled up, and
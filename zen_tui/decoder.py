@@ -0,0 +1,239 @@
+"""Input decoder module.
+
+Turns the byte stream read from the terminal into key events, using a trie
+of Keys.KEYMAP sequences which is built once and shared. Decoding is
+incremental: bytes are fed as they are read, several keystrokes may arrive
+in one read, and a sequence may be split between reads. A lone ESC can't be
+told from the start of a sequence until no more bytes arrive for a while,
+see KeyDecoder.esc_timeout.
+"""
+
+from __future__ import annotations
+
+from .defs import Keys
+
+
+# Default time to wait for the rest of an escape sequence, in seconds
+ESC_TIMEOUT = 0.05
+
+# Trie node values for sequences which have a payload after the prefix
+_MOUSE = object()
+_REPORT = object()
+_PASTE = object()
+_MOUSE_SGR = object()
+
+
+class Report(bytes):
+    """Terminal report (reply to a query), passed to Screen.handle_report()."""
+
+
+class MouseEvent(list):
+    """Mouse event, a [col, row] screen position with the details as attributes.
+
+    For WHEEL, count is the number of notches, negative for up.
+    """
+    BUTTON_LEFT = 0
+    BUTTON_MIDDLE = 1
+    BUTTON_RIGHT = 2
+    BUTTON_NONE = 3
+
+    PRESS = 0
+    RELEASE = 1
+    # Motion with a button held (mode 1002), or without (mode 1003)
+    DRAG = 2
+    MOVE = 3
+    WHEEL = 4
+
+    def __init__(self, col: int, row: int, button: int, action: int,
+                 shift: bool = False, meta: bool = False, ctrl: bool = False, count: int = 1) -> None:
+        super().__init__((col, row))
+        self.button = button
+        self.action = action
+        self.shift = shift
+        self.meta = meta
+        self.ctrl = ctrl
+        self.count = count
+
+    @classmethod
+    def from_code(cls, code: int, col: int, row: int, release: bool = False) -> MouseEvent:
+        """Make event from xterm button code (modifier bits 4, 8, 16; motion 32; wheel 64)."""
+        button = code & 3
+        mods = {"shift": bool(code & 4), "meta": bool(code & 8), "ctrl": bool(code & 16)}
+        if code & 64:
+            # Horizontal wheel (button 2, 3) isn't told apart
+            return cls(col, row, cls.BUTTON_NONE, cls.WHEEL, count=-1 if button in (0, 2) else 1, **mods)
+        if code & 32:
+            action = cls.MOVE if button == cls.BUTTON_NONE else cls.DRAG
+        elif release or button == cls.BUTTON_NONE:
+            # Legacy encoding doesn't tell which button was released
+            action = cls.RELEASE
+        else:
+            action = cls.PRESS
+        return cls(col, row, button, action, **mods)
+
+    def merge(self, other) -> MouseEvent | None:
+        """Event which has the effect of this event followed by other, or None if there is none."""
+        if not isinstance(other, MouseEvent) or other.action != self.action or other.button != self.button \
+                or (other.shift, other.meta, other.ctrl) != (self.shift, self.meta, self.ctrl):
+            return None
+        if self.action in (self.DRAG, self.MOVE):
+            # Only where the pointer ended up matters
+            return other
+        if self.action == self.WHEEL and other[:] == self[:] and (other.count > 0) == (self.count > 0):
+            return MouseEvent(self[0], self[1], self.button, self.action,
+                              self.shift, self.meta, self.ctrl, self.count + other.count)
+        return None
+
+
+class Paste(str):
+    """Text pasted in bracketed paste mode, with line breaks as "\\n"."""
+
+
+def build_trie(keymap: dict[bytes, int]) -> dict:
+    """Build trie of key sequences: node is a dict byte -> child node, node[None] is the key."""
+    root: dict = {}
+    for seq, key in list(keymap.items()) + [
+        (Keys.MOUSE_PREFIX, _MOUSE), (Keys.MOUSE_SGR_PREFIX, _MOUSE_SGR),
+        (Keys.REPORT_PREFIX, _REPORT), (Keys.PASTE_BEGIN, _PASTE),
+    ]:
+        node = root
+        for b in seq:
+            node = node.setdefault(b, {})
+        node[None] = key
+    return root
+
+
+KEY_TRIE = build_trie(Keys.KEYMAP)
+
+
+def _utf8_len(lead: int) -> int:
+    if lead >= 0xF0:
+        return 4
+    if lead >= 0xE0:
+        return 3
+    if lead >= 0xC0:
+        return 2
+    return 1
+
+
+def _csi_end(buf: bytearray, i: int) -> int:
+    """Index after the CSI sequence starting at buf[i], or -1 if it's incomplete."""
+    for j in range(i + 2, len(buf)):
+        if 0x40 <= buf[j] <= 0x7E:
+            return j + 1
+    return -1
+
+
+class KeyDecoder:
+    """Incremental decoder of terminal input into key events.
+
+    Events are: int (a mapped key, Keys.KEY_*), bytes (an unmapped character),
+    MouseEvent, Paste (pasted text), or Report (terminal report).
+    """
+
+    def __init__(self, trie: dict | None = None, esc_timeout: float = ESC_TIMEOUT) -> None:
+        self.trie = KEY_TRIE if trie is None else trie
+        self.esc_timeout = esc_timeout
+        self.buf = bytearray()
+        self._pos = 0
+        # Where to continue looking for the end of a paste, so a long one isn't rescanned
+        self._scan = 0
+
+    @property
+    def pending(self) -> bool:
+        """There are buffered bytes not decoded yet (an incomplete sequence if get() returned None)."""
+        return self._pos < len(self.buf)
+
+    def feed(self, data: bytes) -> None:
+        if self._pos:
+            del self.buf[:self._pos]
+            self._scan = max(self._scan - self._pos, 0)
+            self._pos = 0
+        self.buf += data
+
+    def clear(self) -> None:
+        self.buf.clear()
+        self._pos = 0
+        self._scan = 0
+
+    def get(self, final: bool = False) -> bytes | int | list[int] | None:
+        """Decode next event, or return None if more bytes are needed.
+
+        With final, no more bytes are coming soon (ESC timeout expired), so an
+        incomplete sequence is decoded as what it is so far.
+        """
+        buf = self.buf
+        while self._pos < len(buf):
+            i = self._pos
+            node = self.trie
+            j = i
+            match = None
+            while j < len(buf):
+                node = node.get(buf[j])
+                if node is None:
+                    break
+                j += 1
+                if None in node:
+                    match = (j, node[None])
+            else:
+                if not final and (len(node) > 1 or None not in node):
+                    # Can be a longer sequence, wait for more
+                    return None
+
+            if match and match[1] is _MOUSE:
+                end = match[0] + 3
+                if end > len(buf):
+                    if not final:
+                        return None
+                    self._pos = len(buf)
+                    continue
+                self._pos = end
+                # Legacy encoding, values offset by 32, coordinates 1-based
+                return MouseEvent.from_code(buf[i + 3] - 32, buf[i + 4] - 33, buf[i + 5] - 33)
+            if match and match[1] is _MOUSE_SGR:
+                end = _csi_end(buf, i)
+                if end < 0:
+                    if not final:
+                        return None
+                    self._pos = len(buf)
+                    continue
+                self._pos = end
+                params = buf[match[0]:end - 1].split(b";")
+                if len(params) != 3 or not all(p.isdigit() for p in params):
+                    continue
+                code, col, row = (int(p) for p in params)
+                return MouseEvent.from_code(code, col - 1, row - 1, release=buf[end - 1] == ord("m"))
+            if match and match[1] is _PASTE:
+                end = buf.find(Keys.PASTE_END, max(match[0], self._scan))
+                if end < 0:
+                    # The rest is still coming, however long it takes
+                    self._scan = max(len(buf) - len(Keys.PASTE_END) + 1, 0)
+                    return None
+                self._scan = 0
+                self._pos = end + len(Keys.PASTE_END)
+                text = buf[match[0]:end].decode("utf-8", "replace")
+                return Paste(text.replace("\r\n", "\n").replace("\r", "\n"))
+            if buf[i:i + 2] == b"\x1b[" and (match is None or match[0] == i + 1 or match[1] is _REPORT):
+                # CSI sequence which isn't in the keymap
+                end = _csi_end(buf, i)
+                if end < 0:
+                    if not final:
+                        return None
+                elif match and match[1] is _REPORT or buf[end - 1] == ord("R"):
+                    # Private mode or device attributes report, or cursor position report
+                    self._pos = end
+                    return Report(buf[i:end])
+                else:
+                    # Unknown sequence (e.g. a modified key), drop it whole
+                    self._pos = end
+                    continue
+            if match and match[1] not in (_MOUSE, _MOUSE_SGR, _REPORT, _PASTE):
+                self._pos = match[0]
+                return match[1]
+            # Unmapped character
+            end = i + _utf8_len(buf[i])
+            if end > len(buf) and not final:
+                return None
+            self._pos = min(end, len(buf))
+            return bytes(buf[i:self._pos])
+        return None
@@ -48,6 +48,8 @@ class Keys:
     KEY_DELETE = 12
     KEY_TAB = 13
     KEY_SHIFT_TAB = 14
+    KEY_UNDO = 15
+    KEY_REDO = 16
     KEY_ESC = 20
     KEY_F1 = 30
     KEY_F2 = 31
@@ -61,9 +63,16 @@ class Keys:
     KEY_F10 = 39
 
     MOUSE_PREFIX = b"\x1b[M"
+    # SGR extended mouse reporting (mode 1006): ESC [ < button ; col ; row M (press) or m (release)
+    MOUSE_SGR_PREFIX = b"\x1b[<"
     MOUSE_LEN = 6
     MOUSE_X10_BUTTON1 = 32
     MOUSE_VT200_BUTTON1 = 1
+    # Terminal reports (replies to DEC private queries) start with this
+    REPORT_PREFIX = b"\x1b[?"
+    # Bracketed paste: pasted text comes between these
+    PASTE_BEGIN = b"\x1b[200~"
+    PASTE_END = b"\x1b[201~"
 
     if os.name == "nt":
         KEYMAP = {
@@ -77,6 +86,8 @@ class Keys:
             b"\x00I": KEY_PGUP,
             b"\x00Q": KEY_PGDN,
             b"\x03": KEY_QUIT,
+            b"\x1a": KEY_UNDO,
+            b"\x19": KEY_REDO,
             b"\r": KEY_ENTER,
             b"\t": KEY_TAB,
             b"\x1b[Z": KEY_SHIFT_TAB,
@@ -113,6 +124,8 @@ class Keys:
             b"\x1b[5~": KEY_PGUP,
             b"\x1b[6~": KEY_PGDN,
             b"\x03": KEY_QUIT,
+            b"\x1a": KEY_UNDO,
+            b"\x19": KEY_REDO,
             b"\r": KEY_ENTER,
             b"\n": KEY_ENTER,
             b"\t": KEY_TAB,
@@ -149,6 +162,8 @@ class Keys:
             b"\x1b[5~": KEY_PGUP,
             b"\x1b[6~": KEY_PGDN,
             b"\x03": KEY_QUIT,
+            b"\x1a": KEY_UNDO,
+            b"\x19": KEY_REDO,
             b"\r": KEY_ENTER,
             b"\t": KEY_TAB,
             b"\x1b[Z": KEY_SHIFT_TAB,
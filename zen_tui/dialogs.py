@@ -47,7 +47,7 @@ class DMultiEntry(Dialog):
         res = self.loop()
         if res == ACTION_CANCEL:
             return res
-        return self.widget.content
+        return self.widget.get()
 
 
 class DConfirmation(Dialog):
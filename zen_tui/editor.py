@@ -9,11 +9,24 @@ from __future__ import annotations
 import sys
 
 from .basewidget import Widget
+from .decoder import MouseEvent
 from .defs import Keys
+from .textbuf import MappedLines, PieceTable
+from .undo import UndoJournal
 
 
 class Editor(Widget):
     """Editor Widget class."""
+
+    # Lines scrolled per mouse wheel notch
+    wheel_lines = 3
+    # Pasted text is cut at the first line break, and replaces the initial text (see just_started)
+    single_line = False
+    # Sequence type lines are kept in, see zen_tui.textbuf
+    buffer_class = PieceTable
+    # Undo history limit, in characters of changed text (see zen_tui.undo)
+    undo_limit = 1 << 20
+
     def __init__(self, x=0, y=0, width=80, height=24):
         Widget.__init__(self)
         self.top_line = 0
@@ -25,8 +38,10 @@ class Editor(Widget):
         self.height = height
         self.width = width
         self.margin = 0
-        self.content: list[str] = []
-        self.total_lines = 0
+        self.content = self.buffer_class()
+        self.history = UndoJournal(self.undo_limit)
+        # Lines the view moved by since last render, not yet scrolled on the terminal
+        self.scroll_pending = 0
 
     def set_cursor(self):
         self.goto(self.col + self.x, self.row + self.y)
@@ -49,27 +64,110 @@ class Editor(Widget):
             self.col = val - self.margin
             return False
 
+    @property
+    def total_lines(self) -> int:
+        return len(self.content)
+
     def set_lines(self, lines: list[str]) -> None:
-        self.content = lines
-        self.total_lines = len(lines)
+        if self.buffer_class is list and isinstance(lines, list):
+            # Kept as is, so the caller can change lines and redraw
+            self.content = lines
+        else:
+            self.content = self.buffer_class(lines)
+        self.history = UndoJournal(self.undo_limit)
+
+    def load_file(self, path: str) -> None:
+        """Show lines of a file, reading only those which get shown.
+
+        The file is indexed by a timer, in slices between input events, so the
+        first screen is shown right away, and more lines become available.
+        """
+        lines = MappedLines(path)
+        if not issubclass(self.buffer_class, PieceTable):
+            # Lines can be added as they get indexed only to a piece table
+            while not lines.complete:
+                lines.index_more()
+        self.set_lines(lines)
+        if not lines.complete:
+            self._indexer = self.call_every(0.001, self.index_file, lines, self.content)
+
+    def index_file(self, lines: MappedLines, content: PieceTable) -> None:
+        if self.content is not content:
+            # Other lines were set meanwhile
+            self._indexer.cancel()
+            return
+        total = len(content)
+        known = len(lines)
+        lines.index_more()
+        content.grow(len(lines) - known)
+        if lines.complete:
+            self._indexer.cancel()
+        for i in range(total, min(len(content), self.top_line + self.height)):
+            self.invalidate_line(i)
 
     def redraw(self) -> None:
+        self.scroll_pending = 0
+        self.redraw_rows(0, self.height)
+
+    def redraw_rect(self, rect: tuple[int, int, int, int]) -> None:
+        n = self.scroll_pending
+        if n:
+            self.scroll_pending = 0
+            if not self.scroll_rect(self.x, self.y, self.width, self.height, n):
+                self.redraw()
+                return
+            if n > 0:
+                self.redraw_rows(self.height - n, self.height)
+            else:
+                self.redraw_rows(0, -n)
+        _x, y, _w, h = rect
+        start, end = max(y - self.y, 0), min(y + h - self.y, self.height)
+        if start < end:
+            self.redraw_rows(start, end)
+
+    def redraw_rows(self, start: int, end: int) -> None:
+        """Redraw window rows [start, end)."""
         self.cursor(on=False)
-        i = self.top_line
-        for c in range(self.height):
+        for c in range(start, end):
             self.goto(self.x, self.y + c)
+            i = self.top_line + c
             if i >= self.total_lines:
                 self.show_line("", -1)
             else:
                 self.show_line(self.content[i], i)
-                i += 1
         self.set_cursor()
 
     def update_line(self):
-        self.cursor(on=False)
-        self.goto(self.x, self.row + self.y)
-        self.show_line(self.content[self.cur_line], self.cur_line)
-        self.set_cursor()
+        self.invalidate((self.x, self.y + self.row, self.width, 1))
+
+    def invalidate_line(self, i: int) -> None:
+        """Schedule redraw of content line i, if it is visible."""
+        if self.top_line <= i < self.top_line + self.height:
+            self.invalidate((self.x, self.y + i - self.top_line, self.width, 1))
+
+    def scroll_view(self, n: int) -> None:
+        """Show that view moved by n lines (top_line already changed).
+
+        The terminal scrolls the window when damage is rendered, so only exposed
+        lines get drawn. Moves between renders add up to one scroll.
+        """
+        damage = Widget._damage
+        rect = damage.get(self, ())
+        if not n or rect is None:
+            # Nothing moved, or the whole widget gets redrawn anyway
+            return
+        if rect and rect[2] and rect[3]:
+            # Pending rows move with the content
+            top = rect[1] - n
+            if top < self.y or top + rect[3] > self.y + self.height:
+                # A changed row leaves the view, and may come back before
+                # rendering with the net scroll not accounting for it
+                self.invalidate()
+                return
+            damage[self] = (rect[0], top, rect[2], rect[3])
+        else:
+            damage[self] = (self.x, self.y, self.width, 0)
+        self.scroll_pending += n
 
     def show_line(self, line: str, _i: int):
         line = line[self.margin:]
@@ -92,8 +190,11 @@ class Editor(Widget):
             if self.cur_line + 1 != self.total_lines:
                 self.cur_line += 1
                 redraw = self.adjust_cursor_eol()
-                if self.next_line() or redraw:
-                    self.redraw()
+                if redraw:
+                    self.next_line()
+                    self.invalidate()
+                elif self.next_line():
+                    self.scroll_view(1)
                 else:
                     self.set_cursor()
         elif key == Keys.KEY_UP:
@@ -103,11 +204,14 @@ class Editor(Widget):
                 if self.row == 0:
                     if self.top_line > 0:
                         self.top_line -= 1
-                        self.redraw()
+                        if redraw:
+                            self.invalidate()
+                        else:
+                            self.scroll_view(-1)
                 else:
                     self.row -= 1
                     if redraw:
-                        self.redraw()
+                        self.invalidate()
                     else:
                         self.set_cursor()
         elif key == Keys.KEY_LEFT:
@@ -116,27 +220,28 @@ class Editor(Widget):
                 self.set_cursor()
             elif self.margin > 0:
                 self.margin -= 1
-                self.redraw()
+                self.invalidate()
         elif key == Keys.KEY_RIGHT:
             self.col += 1
             if self.adjust_cursor_eol():
-                self.redraw()
+                self.invalidate()
             else:
                 self.set_cursor()
         elif key == Keys.KEY_HOME:
             self.col = 0
             if self.margin > 0:
                 self.margin = 0
-                self.redraw()
+                self.invalidate()
             else:
                 self.set_cursor()
         elif key == Keys.KEY_END:
             self.col = len(self.content[self.cur_line])
             if self.adjust_cursor_eol():
-                self.redraw()
+                self.invalidate()
             else:
                 self.set_cursor()
         elif key == Keys.KEY_PGUP:
+            old_top = self.top_line
             self.cur_line -= self.height
             self.top_line -= self.height
             if self.top_line < 0:
@@ -146,9 +251,12 @@ class Editor(Widget):
             elif self.cur_line < 0:
                 self.cur_line = 0
                 self.row = 0
-            self.adjust_cursor_eol()
-            self.redraw()
+            if self.adjust_cursor_eol():
+                self.invalidate()
+            else:
+                self.scroll_view(self.top_line - old_top)
         elif key == Keys.KEY_PGDN:
+            old_top = self.top_line
             self.cur_line += self.height
             self.top_line += self.height
             if self.cur_line >= self.total_lines:
@@ -159,8 +267,10 @@ class Editor(Widget):
                 else:
                     self.top_line = 0
                     self.row = self.cur_line
-            self.adjust_cursor_eol()
-            self.redraw()
+            if self.adjust_cursor_eol():
+                self.invalidate()
+            else:
+                self.scroll_view(self.top_line - old_top)
         else:
             return False
         return True
@@ -176,29 +286,57 @@ class Editor(Widget):
                 self.cur_line = cur_line
                 self.adjust_cursor_eol()
                 self.set_cursor()
+                self.history.seal()
                 return True
         return False
 
+    def scroll_lines(self, n: int) -> None:
+        """Scroll view by n lines (up if n < 0), moving cursor only as needed to keep it in view."""
+        top = max(min(self.top_line + n, self.total_lines - self.height), 0)
+        n = top - self.top_line
+        if not n:
+            return
+        self.top_line = top
+        self.cur_line = min(top + max(min(self.row - n, self.height - 1), 0), self.total_lines - 1)
+        self.row = self.cur_line - top
+        if self.adjust_cursor_eol():
+            self.invalidate()
+        self.scroll_view(n)
+
+    def handle_mouse_event(self, ev: MouseEvent) -> bool | int | None:
+        if ev.action == MouseEvent.WHEEL:
+            self.scroll_lines(ev.count * self.wheel_lines)
+        return None
+
     def handle_key(self, key) -> bool | int | None:
         if key == Keys.KEY_QUIT:
             return key
         if self.handle_cursor_keys(key):
+            self.history.seal()
             return None
         return self.handle_edit_key(key)
 
     def handle_edit_key(self, key) -> bool | None:
         line = self.content[self.cur_line]
-        if key == Keys.KEY_ENTER:
+        pos = self.col + self.margin
+        if key == Keys.KEY_UNDO:
+            for edit in reversed(self.history.undo()):
+                self.replace_text(edit.line, edit.col, edit.inserted, edit.removed)
+        elif key == Keys.KEY_REDO:
+            for edit in self.history.redo():
+                self.replace_text(edit.line, edit.col, edit.removed, edit.inserted)
+        elif key == Keys.KEY_ENTER:
+            self.history.record(self.cur_line, pos, "", "\n")
             self.content[self.cur_line] = line[:self.col + self.margin]
             self.cur_line += 1
             self.content[self.cur_line:self.cur_line] = [line[self.col + self.margin:]]
-            self.total_lines += 1
             self.col = 0
             self.margin = 0
             self.next_line()
-            self.redraw()
+            self.invalidate()
         elif key == Keys.KEY_BACKSPACE:
             if self.col + self.margin:
+                self.history.record(self.cur_line, pos - 1, line[pos - 1], "")
                 if self.col:
                     self.col -= 1
                 else:
@@ -207,10 +345,13 @@ class Editor(Widget):
                 self.content[self.cur_line] = line
                 self.update_line()
         elif key == Keys.KEY_DELETE:
+            if pos < len(line):
+                self.history.record(self.cur_line, pos, line[pos], "")
             line = line[:self.col + self.margin] + line[self.col + self.margin + 1:]
             self.content[self.cur_line] = line
             self.update_line()
         else:
+            self.history.record(self.cur_line, pos, "", str(key, "utf-8"))
             line = line[:self.col + self.margin] + str(key, "utf-8") + line[self.col + self.margin:]
             self.content[self.cur_line] = line
             self.col += 1
@@ -218,6 +359,79 @@ class Editor(Widget):
             self.update_line()
         return None
 
+    def insert_text(self, text: str) -> None:
+        """Insert text at cursor as one edit, text may have several lines separated by "\\n"."""
+        lines = text.split("\n")
+        pos = self.col + self.margin
+        line = self.content[self.cur_line]
+        old_margin = self.margin
+        # Pasted text is undone on its own
+        self.history.seal()
+        self.history.record(self.cur_line, pos, "", text)
+        self.history.seal()
+        if len(lines) == 1:
+            self.content[self.cur_line] = line[:pos] + text + line[pos:]
+            col = pos + len(text)
+        else:
+            col = len(lines[-1])
+            lines[0] = line[:pos] + lines[0]
+            lines[-1] = lines[-1] + line[pos:]
+            self.content[self.cur_line:self.cur_line + 1] = lines
+            self.cur_line += len(lines) - 1
+            self.row += len(lines) - 1
+            if self.row >= self.height:
+                self.top_line += self.row - self.height + 1
+                self.row = self.height - 1
+        self.col = col
+        self.margin = 0
+        self.adjust_cursor_eol()
+        if len(lines) == 1 and self.margin == old_margin:
+            self.update_line()
+        else:
+            self.invalidate()
+
+    def replace_text(self, line: int, col: int, old: str, new: str) -> None:
+        """Replace text old at line, col with new, and put cursor after it, redrawing only changed lines."""
+        old_lines = old.split("\n")
+        new_lines = new.split("\n")
+        end = line + len(old_lines) - 1
+        end_col = (col if len(old_lines) == 1 else 0) + len(old_lines[-1])
+        cursor_col = (col if len(new_lines) == 1 else 0) + len(new_lines[-1])
+        new_lines[0] = self.content[line][:col] + new_lines[0]
+        new_lines[-1] += self.content[end][end_col:]
+        self.content[line:end + 1] = new_lines
+        self.cur_line = line + len(new_lines) - 1
+        old_top, old_margin = self.top_line, self.margin
+        if not self.top_line <= self.cur_line < self.top_line + self.height:
+            self.top_line = max(self.cur_line - self.height // 2, 0)
+        self.row = self.cur_line - self.top_line
+        self.col = cursor_col
+        self.margin = 0
+        self.adjust_cursor_eol()
+        if (self.top_line, self.margin) != (old_top, old_margin):
+            self.invalidate()
+            return
+        start = max(line - self.top_line, 0)
+        if len(old_lines) == len(new_lines):
+            stop = min(self.cur_line - self.top_line + 1, self.height)
+        else:
+            # Lines below moved
+            stop = self.height
+        if start < stop:
+            self.invalidate((self.x, self.y + start, self.width, stop - start))
+        self.set_cursor()
+
+    def handle_paste(self, text: str) -> bool | int | None:
+        if self.single_line:
+            text = text.split("\n", 1)[0]
+            if self.just_started:
+                # Overwrite initial string with pasted content
+                self.set_lines([""])
+                self.col = 0
+                self.just_started = False
+        self.insert_text(text)
+        return None
+
     def deinit_tty(self):
         # Don't leave cursor in the middle of screen
         self.goto(0, self.height)
@@ -225,11 +439,6 @@ class Editor(Widget):
 
 
 if __name__ == "__main__":
-    with open(sys.argv[1], encoding="utf-8") as f:
-        content = f.read().splitlines()
-        #content = f.readlines()
-
-
 #os.write(1, b"\x1b[18t")
 #key = os.read(0, 32)
 #print(repr(key))
@@ -240,6 +449,6 @@ if __name__ == "__main__":
     e = Editor()
     e.init_tty()
     e.enable_mouse()
-    e.set_lines(content)
+    e.load_file(sys.argv[1])
     e.loop()
     e.deinit_tty()
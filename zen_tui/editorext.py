@@ -11,13 +11,18 @@ from typing import Iterable
 # import os
 
 from .editor import Editor
-from .defs import Keys
+from .defs import Color, Keys
+from .highlight import Highlighter, Tokenizer
+from .search import Search
+from .undo import Edit
 
 
 # Edit single line, quit on Enter/Esc
 class LineEditor(Editor):
     """LineEditor Widget class."""
 
+    single_line = True
+
     def handle_cursor_keys(self, key):
         if super().handle_cursor_keys(key):
             self.just_started = False
@@ -27,7 +32,7 @@ class LineEditor(Editor):
     def handle_key(self, key) -> bool | int | None:
         if key in (Keys.KEY_ENTER, Keys.KEY_ESC):
             return key
-        if self.just_started:
+        if self.just_started and key not in (Keys.KEY_UNDO, Keys.KEY_REDO):
             # Overwrite initial string with new content
             self.set_lines([""])
             self.col = 0
@@ -56,6 +61,10 @@ class Viewer(Editor):
             return True
         return None
 
+    def handle_paste(self, _text: str) -> bool | int | None:
+        # Read-only
+        return None
+
 
 # Viewer with colored lines, (whole line same color)
 class LineColorViewer(Viewer):
@@ -89,8 +98,62 @@ class CharColorViewer(Viewer):
     """
 
     def_c: int = 0
+    # Syntax highlighting of str lines, see set_tokenizer()
+    tokenizer: Tokenizer | None = None
+    highlighter: Highlighter | None = None
+    # Lines lexed per slice, between input events, to get to the ones shown
+    lex_chunk = 5000
+    _lex_job = None
+
+    def set_lines(self, lines) -> None:
+        super().set_lines(lines)
+        self._start_highlighting()
+
+    def set_tokenizer(self, tokenizer: Tokenizer | None) -> None:
+        """Highlight str lines with tokenizer (see zen_tui.highlight), None to stop.
+
+        Only the lines shown are lexed. When the view jumps more than
+        lex_chunk lines past those lexed, lines are shown plain until they
+        are lexed up to, in slices between input events.
+        """
+        self.tokenizer = tokenizer
+        self._start_highlighting()
+        self.invalidate()
+
+    def _start_highlighting(self) -> None:
+        if self._lex_job:
+            self._lex_job.cancel()
+            self._lex_job = None
+        self.highlighter = Highlighter(self.tokenizer, self.content) if self.tokenizer else None
+
+    def update_lines(self, start: int, stop: int, lines: list) -> None:
+        """Replace lines [start, stop) with lines, redrawing only what changed on the screen."""
+        self.content[start:stop] = lines
+        bottom = self.top_line + self.height
+        end = start + len(lines)
+        if self.highlighter:
+            # Lines after the change may be highlighted differently only on the screen
+            end = self.highlighter.lines_changed(start, stop - start, len(lines), bottom)
+        if len(lines) != stop - start:
+            # Lines below moved
+            end = bottom
+        for i in range(max(start, self.top_line), min(end, bottom)):
+            self.invalidate_line(i)
+
+    def _lex_step(self, highlighter: Highlighter) -> None:
+        self._lex_job = None
+        if self.highlighter is not highlighter:
+            return
+        highlighter.lex_more(self.lex_chunk)
+        if highlighter.lexed < min(self.top_line + self.height, self.total_lines):
+            self._lex_job = self.call_later(0, self._lex_step, highlighter)
+        else:
+            self.invalidate()
 
-    def show_line(self, line: Iterable[tuple[bytes|str, int] | str], _i: int):
+    def show_line(self, line: Iterable[tuple[bytes|str, int] | str], i: int):
+        if self.highlighter and isinstance(line, str) and i >= 0:
+            self._show_highlighted(line, i)
+            return
         # TODO: handle self.margin, self.width
         length = 0
         for span in line:
@@ -108,11 +171,47 @@ class CharColorViewer(Viewer):
     def set_def_color(self, default_color):
         self.def_c = default_color
 
+    def _show_highlighted(self, line: str, i: int) -> None:
+        spans = self.highlighter.spans(i, self.lex_chunk)
+        if spans is None:
+            # Too far from lexed lines to get to right away
+            if not self._lex_job:
+                self._lex_job = self.call_later(0, self._lex_step, self.highlighter)
+            spans = (len(line), self.def_c)
+        left = self.margin
+        right = left + self.width
+        pos = left
+        for k in range(0, len(spans), 2):
+            end = min(spans[k], right)
+            if end > pos:
+                self.attr_color(spans[k + 1])
+                self.wr(line[pos:end])
+                pos = end
+        if pos < min(len(line), right):
+            # Not covered by spans
+            self.attr_color(self.def_c)
+            self.wr(line[pos:right])
+            pos = min(len(line), right)
+        self.attr_color(self.def_c)
+        self.clear_num_pos(self.width - max(pos - left, 0))
+        self.attr_reset()
+
 
 class EditorExt(Editor):
     """EditorExt Widget class."""
 
     screen_width = 80
+    # Colors of search matches
+    match_fg = Color.C_BLACK
+    match_bg = Color.C_YELLOW
+    # Lines searched per slice, between input events
+    search_chunk = 5000
+    # Pattern last searched for (highlighted), and search or replace in progress
+    search: Search | None = None
+    _search_job = None
+    # Result of the last search, (line, start, end) or None, and number of replaced matches
+    found: tuple[int, int, int] | None = None
+    replaced = 0
 
     def __init__(self, left=0, top=0, width=80, height=24):
         super().__init__(left, top, width, height)
@@ -136,7 +235,7 @@ class EditorExt(Editor):
             if col is not None:
                 self.col = col
                 if self.adjust_cursor_eol():
-                    self.redraw()
+                    self.invalidate()
             self.set_cursor()
             return False
 
@@ -155,9 +254,133 @@ class EditorExt(Editor):
         if col is not None:
             self.col = col
             self.adjust_cursor_eol()
-        self.redraw()
+        self.invalidate()
         return True
 
+    def show_line(self, line, i):
+        if self.search is None or not isinstance(line, str):
+            super().show_line(line, i)
+            return
+        margin = self.margin
+        text = line[margin:margin + self.width]
+        buf = self.backbuf()
+        attr = buf.attr
+        pos = 0
+        for start, end in self.search.spans(line):
+            start = min(max(start - margin, pos), len(text))
+            end = min(max(end - margin, start), len(text))
+            if start == end:
+                continue
+            self.wr(text[pos:start])
+            self.attr_color(self.match_fg, self.match_bg)
+            self.wr(text[start:end])
+            buf.attr = attr
+            pos = end
+        self.wr(text[pos:])
+        self.clear_num_pos(self.width - len(text))
+
+    def stop_search(self) -> None:
+        """Stop search or replace in progress."""
+        if self._search_job:
+            self._search_job.cancel()
+            self._search_job = None
+
+    def find(self, pattern: str, regex: bool = False, ignore_case: bool = False, line=None, col=None) -> None:
+        """Search for pattern from line, col (the cursor by default) on, and move cursor to the first match.
+
+        Matches on the screen are highlighted. Lines are searched in slices of
+        search_chunk between input events, so the match may be found later,
+        then the "search_done" signal is sent, with the match in self.found.
+        For incremental search, call it again as the pattern changes, from
+        where the search started. Empty pattern ends highlighting.
+        """
+        self.stop_search()
+        if self.search or pattern:
+            self.invalidate()
+        self.search = Search(pattern, regex, ignore_case) if pattern else None
+        self.found = None
+        if self.search:
+            if line is None:
+                line, col = self.cur_line, self.col + self.margin
+            # Until back at the start line, searched from its beginning
+            self._find_step(self.content, line, col or 0, self.total_lines + 1)
+
+    def find_next(self) -> None:
+        """Search for the same pattern again, after the cursor."""
+        if self.search:
+            self.stop_search()
+            self.found = None
+            self._find_step(self.content, self.cur_line, self.col + self.margin + 1, self.total_lines + 1)
+
+    def _find_step(self, content, line: int, col: int, left: int) -> None:
+        self._search_job = None
+        if self.content is not content:
+            return
+        count = min(left, self.search_chunk)
+        found = self.search.scan(content, line, col, count)
+        if found is None and left > count:
+            self._search_job = self.call_later(0, self._find_step, content, (line + count) % len(content), 0, left - count)
+            return
+        self.found = found
+        if found:
+            if self.margin:
+                self.margin = 0
+                self.invalidate()
+            self.goto_line(found[0], found[1], center=True)
+        self.signal("search_done")
+
+    def replace_all(self, pattern: str, repl: str, regex: bool = False, ignore_case: bool = False) -> None:
+        """Replace all matches of pattern with repl (which can refer to regex groups).
+
+        Lines are searched in slices of search_chunk between input events
+        (again, if they are edited meanwhile). Replacements are applied once
+        all lines are searched, in one pass and one undo step, and drawn with
+        one redraw. Then the "search_done" signal
+        is sent, with their number in self.replaced.
+        """
+        self.stop_search()
+        self.replaced = 0
+        if not pattern:
+            self.signal("search_done")
+            return
+        search = Search(pattern, regex, ignore_case)
+        self._replace_step(self.content, self.history.version, search, repl, 0, [])
+
+    def _replace_step(self, content, version: int, search: Search, repl: str, line: int, runs: list) -> None:
+        # Changes are collected as runs of adjacent lines: (first line, old lines, new lines, matches per line)
+        self._search_job = None
+        if self.content is not content:
+            return
+        end = min(line + self.search_chunk, len(content))
+        for i in range(line, end):
+            old = content[i]
+            new, count = search.replace(old, repl)
+            if count:
+                if not runs or runs[-1][0] + len(runs[-1][1]) != i:
+                    runs.append((i, [], [], []))
+                run = runs[-1]
+                run[1].append(old)
+                run[2].append(new)
+                run[3].append(count)
+        if end < len(content):
+            self._search_job = self.call_later(0, self._replace_step, content, version, search, repl, end, runs)
+            return
+        if self.history.version != version:
+            # Lines were edited meanwhile, and may have moved, so they are searched again
+            self._search_job = self.call_later(0, self._replace_step, content, self.history.version, search, repl, 0, [])
+            return
+        edits = []
+        for start, olds, news, counts in runs:
+            # Each run becomes one piece of the buffer, and one record of the undo step
+            content[start:start + len(news)] = news
+            edits.append(Edit(start, 0, "\n".join(olds), "\n".join(news)))
+            self.replaced += sum(counts)
+        if edits:
+            self.history.record_group(edits)
+            self.adjust_cursor_eol()
+            self.invalidate()
+        self.signal("search_done")
+
     def show_status(self, msg):
         self.cursor(on=False)
         self.goto(0, self.status_y)
@@ -182,11 +405,6 @@ class EditorExt(Editor):
 
 
 def main():
-    with open(sys.argv[1], encoding="utf-8") as f:
-        content = f.read().splitlines()
-        #content = f.readlines()
-
-
     #os.write(1, b"\x1b[18t")
     #key = os.read(0, 32)
     #print(repr(key))
@@ -209,7 +427,7 @@ def main():
 
     # e.cls()
     e.draw_box(0, 0, 62, 27)
-    e.set_lines(content)
+    e.load_file(sys.argv[1])
     e.loop()
     e.deinit_tty()
 
@@ -0,0 +1,182 @@
+"""Syntax highlighting module.
+
+A Tokenizer splits a line into colored spans, starting in the lexer state
+the previous line ended in (e.g. inside a multi-line comment), and returns
+the state the line ends in. Highlighter lexes lines of a sequence with it on
+demand, as they are shown (see CharColorViewer.set_tokenizer()), keeping
+the state at the start of every lexed line, and spans of recently shown
+lines. Spans are kept as arrays of (end offset, color) pairs. After lines
+change, only lines from the change until the state is the same as before
+are lexed again.
+"""
+
+from __future__ import annotations
+
+import re
+from array import array
+from collections import OrderedDict
+from typing import Hashable, Iterable, Sequence
+
+from .textbuf import PieceTable
+
+# State of lines after a change, before they are lexed again
+_UNKNOWN = object()
+
+
+class Tokenizer:
+    """Base tokenizer: the whole line in one color."""
+
+    initial_state: Hashable = None
+
+    def __init__(self, color: int = 0) -> None:
+        self.color = color
+
+    def tokenize(self, line: str, state: Hashable) -> tuple[Iterable[tuple[int, int]], Hashable]:
+        """Split line into spans, return (end offset, color) per span, and the state at its end."""
+        return [(len(line), self.color)], state
+
+
+class RegexTokenizer(Tokenizer):
+    """Tokenizer with regex rules per state.
+
+    rules: state -> (color, [(regex, color, next state or None), ...]).
+    Text which no rule of the state matches gets the state's color. The
+    first rule matching earliest wins.
+    """
+
+    def __init__(self, rules: dict, initial_state: Hashable = "root") -> None:
+        super().__init__()
+        self.initial_state = initial_state
+        # state -> (color, combined regex, (color, next state) per rule)
+        self.rules = {}
+        for state, (color, state_rules) in rules.items():
+            regex = re.compile("|".join(f"(?P<r{i}>{rule[0]})" for i, rule in enumerate(state_rules)))
+            self.rules[state] = (color, regex, [(c, nxt) for _, c, nxt in state_rules])
+
+    def tokenize(self, line: str, state: Hashable) -> tuple[list[tuple[int, int]], Hashable]:
+        spans = []
+        pos = 0
+        end = len(line)
+        while pos < end:
+            color, regex, actions = self.rules[state]
+            m = regex.search(line, pos)
+            if not m:
+                break
+            start = m.start()
+            if start > pos:
+                spans.append((start, color))
+            rule_color, next_state = actions[int(m.lastgroup[1:])]
+            if m.end() > start:
+                spans.append((m.end(), rule_color))
+                pos = m.end()
+            elif next_state is None:
+                # Empty match which doesn't change state, don't get stuck on it
+                spans.append((start + 1, color))
+                pos = start + 1
+            if next_state is not None:
+                state = next_state
+        if pos < end:
+            spans.append((end, self.rules[state][0]))
+        return spans, state
+
+
+def pack_spans(spans: Iterable[tuple[int, int]]) -> array:
+    """Spans as an array of (end offset, color) pairs, adjacent spans of the same color joined."""
+    res = array("I")
+    for end, color in spans:
+        if res and res[-1] == color:
+            res[-2] = end
+        else:
+            res.append(end)
+            res.append(color)
+    return res
+
+
+class Highlighter:
+    """Spans of lines of a sequence, lexed on demand with a tokenizer.
+
+    Lines must be changed through lines_changed(), to lex them again.
+    """
+
+    # Lines with spans kept, the most recently shown
+    cached_lines = 256
+
+    def __init__(self, tokenizer: Tokenizer, lines: Sequence[str]) -> None:
+        self.tokenizer = tokenizer
+        self.lines = lines
+        # State at the start of each line, up to the last lexed one
+        self._states = PieceTable([tokenizer.initial_state])
+        self._spans: OrderedDict[int, array] = OrderedDict()
+
+    @property
+    def lexed(self) -> int:
+        """Number of lines (from the first) with known state at their start."""
+        return len(self._states)
+
+    def lex_more(self, count: int) -> None:
+        """Get states of the next count lines."""
+        states = self._states
+        i = len(states) - 1
+        state = states[i]
+        lines = self.lines
+        tokenize = self.tokenizer.tokenize
+        new = []
+        for j in range(i, min(i + count, len(lines))):
+            state = tokenize(lines[j], state)[1]
+            new.append(state)
+        states[i + 1:] = new
+
+    def spans(self, i: int, max_lex: int | None = None) -> array | None:
+        """Spans of line i. If getting its state takes lexing more than max_lex lines, return None."""
+        cache = self._spans
+        spans = cache.get(i)
+        if spans is not None:
+            cache.move_to_end(i)
+            return spans
+        states = self._states
+        missing = i - (len(states) - 1)
+        if missing > 0:
+            if max_lex is not None and missing > max_lex:
+                return None
+            self.lex_more(missing)
+        pairs, state = self.tokenizer.tokenize(self.lines[i], states[i])
+        if i + 1 == len(states):
+            states.append(state)
+        spans = cache[i] = pack_spans(pairs)
+        if len(cache) > self.cached_lines:
+            cache.popitem(last=False)
+        return spans
+
+    def lines_changed(self, start: int, old_count: int, new_count: int, limit: int | None = None) -> int:
+        """Lines [start, start + old_count) were replaced with new_count lines.
+
+        Lines are lexed again from start until they end in the same state as
+        before, or up to line limit (states after it are got again when
+        needed). Returns the line up to which highlighting may have changed.
+        """
+        for i in [i for i in self._spans if i >= start]:
+            del self._spans[i]
+        states = self._states
+        old_end = start + old_count
+        if old_end >= len(states):
+            # Nothing known after the change
+            del states[start + 1:]
+            return start + new_count
+        # States of new lines are unknown, the one of the line after them is
+        # as before, to compare with
+        states[start + 1:old_end + 1] = [_UNKNOWN] * (new_count - 1) + [states[old_end]] if new_count else []
+        lines = self.lines
+        tokenize = self.tokenizer.tokenize
+        i = start
+        while i < len(lines):
+            if i + 1 >= len(states):
+                return i + 1
+            state = tokenize(lines[i], states[i])[1]
+            if i >= start + new_count - 1 and state == states[i + 1]:
+                return i + 1
+            states[i + 1] = state
+            i += 1
+            if limit is not None and i >= limit:
+                del states[i + 1:]
+                return len(lines)
+        return len(lines)
@@ -17,8 +17,12 @@ class WMenuBar(ItemSelWidget):
         self.pulled_down = False
         self.focus = False
         self.permanent = False
+        # Screen contents under a non-permanent menu bar
+        self.saved = None
 
     def redraw(self) -> None:
+        if not self.permanent and self.saved is None:
+            self.saved = self.save_region(self.x, self.y, self.w, self.h)
         if self.focus:
             self.cursor(on=False)
         self.goto(self.x, self.y)
@@ -35,9 +39,11 @@ class WMenuBar(ItemSelWidget):
     def close(self):
         """Close Menu."""
         self.focus = False
-        self.screen_redraw(True)
         if self.permanent:
-            self.redraw()
+            self.invalidate()
+        elif self.saved:
+            self.restore_region(self.saved)
+            self.saved = None
 
     def get_item_x(self, item_no: int) -> int:
         """Get Item X position."""
@@ -51,53 +57,57 @@ class WMenuBar(ItemSelWidget):
         return x
 
     def handle_key(self, key) -> bool | int | None:
-        # We need while to auto pull down submenus on left/right keys
-        while True:
-            res = None
-            action = False
-            sel = self.items[self.choice][1]
-            if key == Keys.KEY_ESC:
-                self.close()
-                return ACTION_CANCEL
-            elif key == Keys.KEY_LEFT:
-                if self.pulled_down:
-                    self.screen_redraw()
-                self.move_sel(-1)
-            elif key == Keys.KEY_RIGHT:
-                if self.pulled_down:
-                    self.screen_redraw()
-                self.move_sel(1)
-            elif key == Keys.KEY_ENTER:
-                self.pulled_down = True
-                action = True
-            elif key == Keys.KEY_DOWN and isinstance(sel, Widget):
-                self.pulled_down = True
-            else:
-                return None
-
-            sel = self.items[self.choice][1]
-            if isinstance(sel, Widget) and self.pulled_down:
-                sel.set_xy(self.get_item_x(self.choice), self.y + 1)
-                res = sel.loop()
-                if res == ACTION_PREV:
-                    key = Keys.KEY_LEFT
-                    continue
-                if res == ACTION_NEXT:
-                    key = Keys.KEY_RIGHT
-                    continue
-                if res == ACTION_CANCEL:
-                    self.pulled_down = False
-                    self.screen_redraw()
-                    self.redraw()
+        action = False
+        sel = self.items[self.choice][1]
+        if key == Keys.KEY_ESC:
+            self.close()
+            return ACTION_CANCEL
+        elif key == Keys.KEY_LEFT:
+            self.move_sel(-1)
+        elif key == Keys.KEY_RIGHT:
+            self.move_sel(1)
+        elif key == Keys.KEY_ENTER:
+            self.pulled_down = True
+            action = True
+        elif key == Keys.KEY_DOWN and isinstance(sel, Widget):
+            self.pulled_down = True
+        else:
+            return None
+
+        sel = self.items[self.choice][1]
+        if isinstance(sel, Widget) and self.pulled_down:
+            sel.set_xy(self.get_item_x(self.choice), self.y + 1)
+            if Widget._defer_popups:
+                return self.popup(sel, self.pulldown_done)
+            # Run synchronously, pulldowns are switched in a loop rather than
+            # by recursion, so holding Left/Right doesn't nest them
+            res = self.popup(sel)
+            while res in (ACTION_PREV, ACTION_NEXT):
+                self.move_sel(-1 if res == ACTION_PREV else 1)
+                sel = self.items[self.choice][1]
+                if not isinstance(sel, Widget):
                     return None
+                sel.set_xy(self.get_item_x(self.choice), self.y + 1)
+                res = self.popup(sel)
+            return self.pulldown_done(res)
+        elif action:
+            self.close()
+            return sel
+        return None
 
-                self.close()
-                return res
-            elif action:
-                self.close()
-                return sel
+    def pulldown_done(self, res) -> bool | int | None:
+        # Left/right in a pulldown auto pull down the neighbouring one
+        if res == ACTION_PREV:
+            return self.handle_key(Keys.KEY_LEFT)
+        if res == ACTION_NEXT:
+            return self.handle_key(Keys.KEY_RIGHT)
+        if res == ACTION_CANCEL:
+            self.pulled_down = False
+            self.invalidate()
+            return None
 
-            # continue
+        self.close()
+        return res
 
     def handle_mouse(self, x, y):
         # Works in absolute coordinates
@@ -116,13 +126,15 @@ class WMenuBar(ItemSelWidget):
         if not found:
             return
         self.choice = i
-        self.redraw()
+        self.invalidate()
         return self.handle_key(Keys.KEY_ENTER)
 
 
 class WMenuBox(ItemSelWidget):
     """WMenuBox Widget class."""
 
+    save_under = True
+
     def __init__(self, items):
         super().__init__(items)
         self.x = self.y = 0
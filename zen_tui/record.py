@@ -0,0 +1,128 @@
+"""Input record/replay module.
+
+RecordingBackend wraps a backend and saves the input read from it, with
+timestamps, to a file. ReplayBackend is a headless backend which delivers a
+recorded session as input, at full speed or paced as it was recorded, and
+measures how long it takes from delivering input to writing the output it
+caused. Together they give reproducible bug repros and latency benchmarks:
+
+    backend = RecordingBackend(TtyBackend(), "session.rec")
+    with Context(backend=backend):
+        app()
+    backend.close()
+
+    backend = ReplayBackend.load("session.rec", realtime=True)
+    with Context(backend=backend):
+        try:
+            app()
+        except EOFError:
+            pass
+    print(backend.latencies)
+
+File format is JSON lines: a header {"size": [width, height]}, then
+{"t": seconds since start, "data": input chunk as latin-1 string} per read.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+
+from .backend import HeadlessBackend
+
+
+class RecordingBackend:
+    """Backend wrapper which records input read from the wrapped backend."""
+
+    def __init__(self, backend, path: str) -> None:
+        self.backend = backend
+        self.file = open(path, "w", encoding="utf-8")
+        self.start = time.monotonic()
+        self._record({"size": list(backend.size())})
+
+    def __getattr__(self, name):
+        # Everything but read() goes to the wrapped backend as is
+        return getattr(self.backend, name)
+
+    def _record(self, obj: dict) -> None:
+        self.file.write(json.dumps(obj) + "\n")
+        self.file.flush()
+
+    def read(self, timeout: float | None = None) -> bytes:
+        data = self.backend.read(timeout)
+        if data:
+            self._record({"t": round(time.monotonic() - self.start, 6), "data": data.decode("latin-1")})
+        return data
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class ReplayBackend(HeadlessBackend):
+    """Headless backend with recorded input.
+
+    Chunks are delivered with the recorded gaps between them, and read()
+    waits for them as for keys. Without realtime, the waits are skipped
+    instead of slept (as if the clock jumped), so input is processed as fast
+    as possible, but what arrived together (e.g. key repeat) still does.
+    Like with HeadlessBackend, read() raises EOFError when the recording is
+    over.
+    """
+
+    def __init__(self, events: list[tuple[float, bytes]], width: int = 80, height: int = 24,
+                 realtime: bool = False, modes: tuple[int, ...] = ()) -> None:
+        super().__init__(width, height, modes)
+        self.events = list(events)
+        self.realtime = realtime
+        self._next = 0
+        # Monotonic time corresponding to recorded time 0
+        self._offset: float | None = None
+        # Seconds from delivering input to the first write after it, per input chunk which caused output
+        self.latencies: list[float] = []
+        self._delivered: float | None = None
+
+    @classmethod
+    def load(cls, path: str, realtime: bool = False, modes: tuple[int, ...] = ()) -> ReplayBackend:
+        """Make backend replaying a file saved by RecordingBackend, with the recorded screen size."""
+        width, height = 80, 24
+        events = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                obj = json.loads(line)
+                if "size" in obj:
+                    width, height = obj["size"]
+                else:
+                    events.append((obj["t"], obj["data"].encode("latin-1")))
+        return cls(events, width, height, realtime, modes)
+
+    def read(self, timeout: float | None = None) -> bytes:
+        if self.input or self._next >= len(self.events):
+            # Replies to queries, anything fed besides the recording, or the end of it
+            return super().read(timeout)
+        now = time.monotonic()
+        t, data = self.events[self._next]
+        if self._offset is None:
+            # First chunk is due right away
+            self._offset = now - t
+        wait = self._offset + t - now
+        if wait > 0:
+            if timeout is not None and timeout < wait:
+                if self.realtime:
+                    time.sleep(timeout)
+                else:
+                    self._offset -= timeout
+                return b""
+            if self.realtime:
+                time.sleep(wait)
+            else:
+                self._offset -= wait
+        self._next += 1
+        if self._delivered is None:
+            self._delivered = time.monotonic()
+        return data
+
+    def write(self, data: bytes) -> None:
+        super().write(data)
+        if self._delivered is not None:
+            self.latencies.append(time.monotonic() - self._delivered)
+            self._delivered = None
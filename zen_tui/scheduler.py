@@ -0,0 +1,103 @@
+"""Scheduler module.
+
+Timers run by the widget event loop: Widget.loop() waits for input only until
+the next timer is due, so one-shot and repeating calls happen while waiting
+for keys, without threads. Timer callbacks are expected to change widgets and
+invalidate() them, the loop then renders the changes (at most
+Widget.max_fps times a second).
+
+Other threads must not touch widgets, as output isn't synchronized. They
+post() calls instead, which the loop runs in batches, rendering once per
+batch.
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import time
+from collections import deque
+from typing import Callable
+
+
+class Timer:
+    """Scheduled call, as returned by Scheduler.call_later()/call_every()."""
+
+    __slots__ = ("when", "interval", "callback", "args", "cancelled")
+
+    def __init__(self, when: float, interval: float | None, callback: Callable, args: tuple) -> None:
+        self.when = when
+        # Repeat period for call_every(), None for one-shot timers
+        self.interval = interval
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+
+class Scheduler:
+    """Heap of timers, run when due by run_due()."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self.clock = clock
+        self._heap: list[tuple[float, int, Timer]] = []
+        # Tie-breaker, so timers due at the same time run in the order they were added
+        self._seq = itertools.count()
+        # Calls posted by other threads, (callback, args)
+        self._posted: deque[tuple[Callable, tuple]] = deque()
+
+    def _push(self, timer: Timer) -> Timer:
+        heapq.heappush(self._heap, (timer.when, next(self._seq), timer))
+        return timer
+
+    def call_later(self, delay: float, callback: Callable, *args) -> Timer:
+        """Call callback(*args) once, after delay seconds."""
+        return self._push(Timer(self.clock() + delay, None, callback, args))
+
+    def call_every(self, interval: float, callback: Callable, *args) -> Timer:
+        """Call callback(*args) every interval seconds, first time after one interval."""
+        if interval <= 0:
+            raise ValueError("Timer interval must be positive")
+        return self._push(Timer(self.clock() + interval, interval, callback, args))
+
+    def post(self, callback: Callable, *args) -> None:
+        """Call callback(*args) as soon as possible. Thread-safe, unlike the other methods."""
+        self._posted.append((callback, args))
+
+    def timeout(self) -> float | None:
+        """Seconds until the next timer is due (0 if overdue), or None if there are no timers."""
+        if self._posted:
+            return 0
+        heap = self._heap
+        while heap and heap[0][2].cancelled:
+            heapq.heappop(heap)
+        if not heap:
+            return None
+        return max(heap[0][0] - self.clock(), 0)
+
+    def run_due(self) -> int:
+        """Run posted calls and timers which are due, return how many ran."""
+        posted = self._posted
+        # Calls posted meanwhile are left for the next batch
+        count = len(posted)
+        for _ in range(count):
+            callback, args = posted.popleft()
+            callback(*args)
+        heap = self._heap
+        now = self.clock()
+        # Timers rescheduled while running are due later than now, so this ends
+        while heap and heap[0][0] <= now:
+            _when, _seq, timer = heapq.heappop(heap)
+            if timer.cancelled:
+                continue
+            if timer.interval is not None:
+                timer.when += timer.interval
+                if timer.when <= now:
+                    # Ticks missed while busy are skipped, not run in a burst
+                    timer.when = now + timer.interval
+                self._push(timer)
+            timer.callback(*timer.args)
+            count += 1
+        return count
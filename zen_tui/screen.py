@@ -2,37 +2,174 @@
 
 from __future__ import annotations
 
-import os
 import re
 import signal
-import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from .backbuf import ATTR_BG_INTENSE, ATTR_BG_SHIFT, ATTR_DEFAULT, BackBuffer, make_attr
+from .backend import TtyBackend
+from .decoder import KeyDecoder, Report
+
+
+# Synchronized output (DEC private mode 2026): terminal holds off repainting
+# until the end sequence, so a frame appears at once instead of tearing
+MODE_SYNC_OUTPUT = 2026
+SYNC_BEGIN = b"\x1b[?2026h"
+SYNC_END = b"\x1b[?2026l"
+# Left/right margins mode, needed to scroll rectangles narrower than the screen
+MODE_LRMM = 69
+
+# Cell attributes for attr_color() arguments. Colors >= 8 are intense.
+_MAX_COLOR = 8
+_BG_MASK = 0xF << ATTR_BG_SHIFT | ATTR_BG_INTENSE
+_FG_ATTRS = [make_attr(fg & 7, 0, fg >= _MAX_COLOR) for fg in range(16)]
+_COLOR_ATTRS = {
+    (fg, bg): make_attr(fg & 7, bg & 7, fg >= _MAX_COLOR, bg == _MAX_COLOR)
+    for fg in range(16)
+    for bg in range(_MAX_COLOR + 1)
+}
+
+class FrameStats:
+    """Output counters for the last completed frame, and running totals."""
+    def __init__(self) -> None:
+        self.frames = 0
+        self.bytes = 0
+        self.syscalls = 0
+        self.total_bytes = 0
+        self.total_syscalls = 0
+        self._start_bytes = 0
+        self._start_syscalls = 0
+
+    def begin(self) -> None:
+        self._start_bytes = self.total_bytes
+        self._start_syscalls = self.total_syscalls
 
-if os.name == "nt":
-    import msvcrt
-else:
-    import fcntl
-    import select
-    import struct
-    import termios
-    import tty
+    def end(self) -> None:
+        self.frames += 1
+        self.bytes = self.total_bytes - self._start_bytes
+        self.syscalls = self.total_syscalls - self._start_syscalls
 
 
 class Screen:
-    """Represents screen on ANSI terminal with stdin and stdout.
+    """Represents screen on ANSI terminal with stdin and stdout (or another backend).
 
     It is a base class for Widget, therefore all Widgets inherit the Screen functionality.
+
+    Output is shared by all Screen instances (they all draw to the same terminal).
+    Drawing goes into a back buffer of screen cells, and only the cells which changed
+    are sent to the terminal when output is flushed.
+    Outside of a frame every drawing call is flushed immediately; inside `with screen.frame():`
+    output is accumulated and written with a single syscall when the outermost frame ends.
     """
-    def __init__(self) -> None:
-        self._screen_width = 0
-        self._screen_height = 0
+
+    # Shared output state, always accessed as Screen.<attr>
+    backend = TtyBackend()
+    _obuf = bytearray()
+    _frame_depth = 0
+    _buf: BackBuffer | None = None
+    stats = FrameStats()
+    # DEC private mode -> DECRPM value, as reported by terminal (see query_modes())
+    modes: dict[int, int] = {}
+    # Wrap frames in synchronized output sequences, enabled when terminal reports support
+    sync_output = False
+    # Smaller frames can't visibly tear, don't spend bytes on them
+    sync_min_bytes = 256
+    # Terminal size, read once and cached until the terminal is resized (see screen_size())
+    _size: tuple[int, int] | None = None
+    _org_winch = None
+    # Time of the last resize not handled yet, and what handles it, see set_screen_resize()
+    _resized_at: float | None = None
+    _resize_handler = None
+    # Resizes which follow each other within this many seconds are handled once
+    resize_delay = 0.05
+
+    # Shared input state: decoder of the terminal input, and events decoded
+    # ahead (e.g. while waiting for a report), delivered before new input
+    decoder = KeyDecoder()
+    _events: deque = deque()
+    # Replies to queries, see handle_report(): cursor position (x, y), and
+    # device attributes (DA1 parameters, the first one is the terminal class)
+    cursor_report: tuple[int, int] | None = None
+    device_attrs: tuple[int, ...] | None = None
+
+    @staticmethod
+    def set_backend(backend) -> None:
+        """Switch all screens to another backend (see zen_tui.backend), resetting output and input state."""
+        Screen.backend = backend
+        Screen._buf = None
+        Screen._obuf.clear()
+        Screen._size = None
+        Screen._resized_at = None
+        Screen.modes = {}
+        Screen.sync_output = False
+        Screen.decoder.clear()
+        Screen._events.clear()
+
+    def backbuf(self) -> BackBuffer:
+        """Get the shared back buffer, creating it on first use."""
+        if Screen._buf is None:
+            try:
+                width, height = self.screen_size(force_read=False)
+            except OSError:
+                # Not a terminal
+                width = height = 0
+            if not width or not height:
+                width, height = 80, 24
+            Screen._buf = BackBuffer(width, height)
+        return Screen._buf
+
+    def _drawn(self) -> None:
+        if not Screen._frame_depth:
+            self.flush()
 
     def wr(self, s: bytes | str) -> None:
         """Write string to screen."""
-        if isinstance(s, str):
-            s = bytes(s, "utf-8")
-        # os.write(1, s)  # Doesn't print unicode bytes on Windows.
-        sys.stdout.buffer.write(s)
-        sys.stdout.buffer.flush()
+        if isinstance(s, bytes):
+            s = s.decode("utf-8", "replace")
+        self.backbuf().write(s)
+        self._drawn()
+
+    def wr_ctl(self, s: bytes) -> None:
+        """Write control sequence which doesn't change screen cells."""
+        if Screen._buf:
+            # Keep it ordered after what was drawn before
+            Screen._buf.render(Screen._obuf)
+        Screen._obuf += s
+        self._drawn()
+
+    def flush(self) -> None:
+        """Render back buffer changes and write out accumulated output, if any."""
+        if Screen._buf:
+            Screen._buf.render(Screen._obuf)
+        if not Screen._obuf:
+            return
+        if Screen.sync_output and len(Screen._obuf) >= Screen.sync_min_bytes:
+            Screen._obuf[0:0] = SYNC_BEGIN
+            Screen._obuf += SYNC_END
+        Screen.backend.write(Screen._obuf)
+        Screen.stats.total_bytes += len(Screen._obuf)
+        Screen.stats.total_syscalls += 1
+        Screen._obuf.clear()
+
+    @contextmanager
+    def frame(self):
+        """Batch all output inside the block into one write.
+
+        Frames nest, only the outermost one flushes.
+        """
+        if not Screen._frame_depth:
+            Screen.stats.begin()
+        Screen._frame_depth += 1
+        try:
+            yield self
+        finally:
+            Screen._frame_depth -= 1
+            if not Screen._frame_depth:
+                self.flush()
+                Screen.stats.end()
 
     def wr_fixedw(self, s, width: int) -> None:
         """Write string in a fixed-width field."""
@@ -43,49 +180,67 @@ class Screen:
         # self.clear_num_pos(width - len(s))
 
     def cls(self) -> None:
-        self.wr(b"\x1b[2J")
+        self.backbuf().clear(Screen._obuf)
+        self._drawn()
 
     def goto(self, x: int, y: int) -> None:
-        # TODO: When Python is 3.5, update this to use bytes
-        self.wr(f"\x1b[{y + 1};{x + 1}H")
+        buf = self.backbuf()
+        buf.x = x
+        buf.y = y
+        self._drawn()
 
     def clear_to_eol(self) -> None:
-        self.wr(b"\x1b[0K")
+        buf = self.backbuf()
+        buf.fill(buf.width - buf.x)
+        self._drawn()
 
     # Clear specified number of positions
     def clear_num_pos(self, num: int) -> None:
         if num > 0:
-            self.wr(f"\x1b[{num}X")
+            self.backbuf().fill(num)
+            self._drawn()
+
+    def save_region(self, x: int, y: int, w: int, h: int) -> tuple:
+        """Snapshot screen contents of a rectangle, to be put back by restore_region()."""
+        return self.backbuf().save(x, y, w, h)
+
+    def restore_region(self, saved: tuple) -> None:
+        """Put back screen contents saved by save_region()."""
+        self.backbuf().restore(saved)
+        self._drawn()
+
+    def scroll_rect(self, x: int, y: int, w: int, h: int, n: int) -> bool:
+        """Scroll screen rectangle up by n lines (down if n < 0) using the terminal.
+
+        Returns False if the terminal can't do it for this rectangle, then nothing
+        is changed and the caller should redraw the rectangle. Otherwise exposed
+        lines are blank, and only they need to be drawn.
+        """
+        if not self.backbuf().scroll(Screen._obuf, x, y, w, h, n):
+            return False
+        self._drawn()
+        return True
 
     def attr_color(self, fg: int, bg: int = -1) -> None:
-        max_color = 8
-        fg_color_base = 30
-        bg_color_base = 40
+        buf = self.backbuf()
         if bg == -1:
             bg = fg >> 4
             fg &= 0xF
         if bg is None:
-            if fg > max_color:
-                self.wr(f"\x1b[{fg_color_base + fg - max_color};1m")
-            else:
-                self.wr(f"\x1b[{fg_color_base + fg}m")
+            # Keep background
+            buf.attr = _FG_ATTRS[fg] | buf.attr & _BG_MASK
         else:
-            if bg > max_color:
-                raise ValueError(f"Expected bg <= {max_color}")
-            if fg > max_color:
-                self.wr(f"\x1b[{fg_color_base + fg - max_color};{bg_color_base + bg};1m")
-            else:
-                self.wr(f"\x1b[0;{fg_color_base + fg};{bg_color_base + bg}m")
-
+            attr = _COLOR_ATTRS.get((fg, bg))
+            if attr is None:
+                raise ValueError(f"Expected bg <= {_MAX_COLOR}")
+            buf.attr = attr
 
     def attr_reset(self) -> None:
-        self.wr(b"\x1b[0m")
+        self.backbuf().attr = ATTR_DEFAULT
 
     def cursor(self, on: bool) -> None:
-        if on:
-            self.wr(b"\x1b[?25h")
-        else:
-            self.wr(b"\x1b[?25l")
+        self.backbuf().cursor_on = on
+        self._drawn()
 
     def draw_box(self, left: int, top: int, width: int, height: int) -> None:
         """Draw a box on the screen.
@@ -135,96 +290,132 @@ class Screen:
             self.wr(title)
 
     def init_tty(self) -> None:
-        if os.name == "nt":
-            pass
-        else:
-            self.org_termios = termios.tcgetattr(0)
-            tty.setraw(0)
-        # TODO: (now) Figure out how to use it: self.screen_size(force_read=True)
-
+        Screen.backend.init_tty()
+        # If output isn't post-processed, LF can be used for cursor movement
+        self.backbuf().raw_lf = Screen.backend.raw_output
+        # Signal handlers can be set only from the main thread
+        if hasattr(signal, "SIGWINCH") and threading.current_thread() is threading.main_thread():
+            Screen._org_winch = signal.signal(signal.SIGWINCH, Screen._on_winch)
 
     def deinit_tty(self) -> None:
-        if os.name == "nt":
-            pass
-        elif self.org_termios:
-            termios.tcsetattr(0, termios.TCSANOW, self.org_termios)
+        self.flush()
+        self.backbuf().raw_lf = False
+        Screen.backend.deinit_tty()
+        if Screen._org_winch is not None:
+            signal.signal(signal.SIGWINCH, Screen._org_winch)
+            Screen._org_winch = None
+
+    @staticmethod
+    def _on_winch(_signum, _frame) -> None:
+        # Terminal was resized, size is read again when next needed. Signal
+        # handlers run between any two statements (e.g. in the middle of a
+        # redraw), so the rest is left to the event loop, see Widget.handle_resize()
+        Screen._size = None
+        Screen._resized_at = time.monotonic()
+        Screen.backend.wakeup()
 
     def enable_mouse(self) -> None:
-        # Mouse reporting - X10 compatibility mode
+        # Mouse reporting - button events and motion while a button is held,
+        # in SGR extended encoding (no column limit, tells which button was released).
+        # Terminals without SGR support report in the legacy X10 encoding.
         # https://invisible-island.net/xterm/ctlseqs/ctlseqs.html#h2-Mouse-Tracking
-        self.wr(b"\x1b[?1000h")  # SET_VT200_MOUSE
+        self.wr_ctl(b"\x1b[?1000h\x1b[?1002h\x1b[?1006h")
         # For "X10 compatibility mode" should be SET_X10_MOUSE 9:
         # self.wr(b"\x1b[?9h")  # SET_X10_MOUSE
-        #? "\x1b[?1003h\x1b[?1015h\x1b[?1006h"
 
     def disable_mouse(self) -> None:
-        # Mouse reporting - X10 compatibility mode
-        self.wr(b"\x1b[?1000l")
-        #? "\x1b[?1003l\x1b[?1015l\x1b[?1006l"
+        self.wr_ctl(b"\x1b[?1006l\x1b[?1002l\x1b[?1000l")
         # self.wr(b"\x1b[?9l")  # SET_X10_MOUSE - CLR
 
-    def screen_size(self, force_read: bool = True) -> tuple[int, int]:
-        if force_read or not self._screen_width or not self._screen_height:
-            self._screen_width, self._screen_height = os.get_terminal_size()
-            # if os.name == "nt":
-            #     self.wr(b"\x1b[18t")
-            #     resp = msvcrt.getch()
-            #     assert resp.startswith(b"\x1b[8;") and resp[-1:] == b"t"
-            #     vals = resp[:-1].split(b";")
-            #     self._screen_width, self._screen_height = int(vals[2]), int(vals[1])
-            # else:
-            #     # From GNU source of stty(1)
-            #     pad = "0" * 8
-            #     s = fcntl.ioctl(1, termios.TIOCGWINSZ, pad)
-            #     sz = struct.unpack('hhhh', s)
-            #     rows, columns, _xpixels, _ypixels = sz
-            #     # print("rows: {} columns: {}, xpixels: {}, ypixels: {}". format(*sz))
-            #     self._screen_width, self._screen_height = int(columns), int(rows)
-
-            #     # self.wr(b"\x1b[18t")
-            #     ## import select
-            #     #res = select.select([0], [], [], 0.2)[0]
-            #     # if not res:
-            #     #     return (80, 24)
-            #     # resp = os.read(0, 32)
-        return (self._screen_width, self._screen_height)
+    def enable_paste(self) -> None:
+        # Bracketed paste: pasted text arrives between markers, as one input event
+        self.wr_ctl(b"\x1b[?2004h")
+
+    def disable_paste(self) -> None:
+        self.wr_ctl(b"\x1b[?2004l")
+
+    def query_modes(self, *modes: int) -> None:
+        """Ask terminal whether it supports DEC private modes (DECRQM).
+
+        Replies arrive as input, and are handled by handle_report().
+        """
+        self.wr_ctl(b"".join(f"\x1b[?{mode}$p".encode() for mode in modes))
+        self.flush()
+
+    def handle_report(self, seq: bytes) -> None:
+        """Handle a terminal report (reply to a query) decoded from input."""
+        if seq.endswith(b"R"):
+            # CPR, the same as a modified F3 key would be, but those aren't supported
+            res = re.fullmatch(rb"\x1b\[\??(\d+);(\d+)R", seq)
+            if res:
+                Screen.cursor_report = (int(res.group(2)) - 1, int(res.group(1)) - 1)
+            return
+        if seq.endswith(b"c"):
+            res = re.fullmatch(rb"\x1b\[\?([\d;]*)c", seq)
+            if res:
+                Screen.device_attrs = tuple(int(p) for p in res.group(1).split(b";") if p)
+            return
+        res = re.fullmatch(rb"\x1b\[\?(\d+);(\d+)\$y", seq)
+        if res:
+            # DECRPM: 1 - set, 2 - reset, 3 - permanently set, 4 - permanently reset, 0 - unknown mode
+            mode, value = int(res.group(1)), int(res.group(2))
+            Screen.modes[mode] = value
+            supported = value in (1, 2, 3)
+            if mode == MODE_SYNC_OUTPUT:
+                Screen.sync_output = supported
+            elif mode == MODE_LRMM:
+                self.backbuf().lrmm = supported
+
+    def screen_size(self, force_read: bool = False) -> tuple[int, int]:
+        """Terminal size (width, height), cached until the terminal is resized (SIGWINCH)."""
+        if force_read or Screen._size is None:
+            size = Screen._size = tuple(Screen.backend.size())
+            buf = Screen._buf
+            if buf and all(size) and (buf.width, buf.height) != size:
+                buf.resize(*size)
+        return Screen._size
 
     # Set function to redraw an entire (client) screen
     # This is called to restore original screen, as we don't save it.
     def set_screen_redraw(self, handler) -> None:
         self.screen_redraw = handler
 
+    # Set function to relayout and redraw the screen when the terminal is resized.
+    # The event loop calls it as handler(screen), once per burst of resizes (e.g.
+    # while a window edge is dragged), with screen_size() giving the new size.
     def set_screen_resize(self, handler) -> None:
-        if sig := getattr(signal, 'SIGWINCH', None):
-            signal.signal(sig, lambda sig, stk: handler(self))
+        Screen._resize_handler = lambda: handler(self)
 
-    def get_cursor_pos(self) -> tuple[int, int]:
-        self.wr("\x1b[6n")
-        if os.name == "nt":
-            res = True
-        else:
-            # import select
-            res = select.select([0], [], [], 0.2)[0]
-            if not res:
-                return -1, -1
-        # if os.name == "nt":
-        #     resp = msvcrt.getch()
-        # else:
-        #     resp = os.read(0, 32)
-        # assert resp.startswith(b"\x1b[8;") and resp[-1:] == b"t"
-        # vals = resp[:-1].split(b";")
-        # return (int(vals[2]), int(vals[1]))
-
-        data = b""
-        while not data.endswith(b"R"):
-            if os.name == "nt":
-                data = data + msvcrt.getch()
+    def query_cursor_pos(self) -> None:
+        """Ask terminal for cursor position (CPR), reply is handled by handle_report()."""
+        self.wr_ctl(b"\x1b[6n")
+        self.flush()
+
+    def query_device_attrs(self) -> None:
+        """Ask terminal for its primary device attributes (DA1), reply is handled by handle_report()."""
+        self.wr_ctl(b"\x1b[c")
+        self.flush()
+
+    def get_cursor_pos(self, timeout: float = 0.2) -> tuple[int, int]:
+        """Cursor position, or (-1, -1) if terminal doesn't reply within timeout.
+
+        The reply is decoded from input like other reports, input which
+        arrives before it is kept to be handled as usual.
+        """
+        Screen.cursor_report = None
+        self.query_cursor_pos()
+        deadline = time.monotonic() + timeout
+        decoder = Screen.decoder
+        while Screen.cursor_report is None:
+            event = decoder.get()
+            if event is None:
+                remaining = deadline - time.monotonic()
+                data = Screen.backend.read(remaining) if remaining > 0 else b""
+                if not data:
+                    return -1, -1
+                decoder.feed(data)
+            elif isinstance(event, Report):
+                self.handle_report(event)
             else:
-                data = data + os.read(0, 32)
-        # response data = "^[[{y};{x}R"
-        res = re.match(r".*\[(?P<y>\d*);*(?P<x>\d*)R", data.decode())
-        if not res:
-            return -1, -1
-        x = int(res.group("x")) - 1
-        y = int(res.group("y")) - 1
-        return x, y
+                Screen._events.append(event)
+        return Screen.cursor_report
@@ -0,0 +1,70 @@
+"""Search module.
+
+Plain text and regular expression search in lines of text, for
+EditorExt.find() and replace_all(). Patterns are compiled once, and cached,
+so searching again as the pattern is typed, or for the next match, doesn't
+compile it again.
+"""
+
+from __future__ import annotations
+
+import functools
+import re
+from typing import Sequence
+
+
+@functools.lru_cache(maxsize=64)
+def compile_pattern(pattern: str, regex: bool = False, ignore_case: bool = False) -> re.Pattern:
+    if not regex:
+        pattern = re.escape(pattern)
+    return re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+
+
+class Search:
+    """Pattern to search lines for. Empty matches (possible with regex) are skipped."""
+
+    def __init__(self, pattern: str, regex: bool = False, ignore_case: bool = False) -> None:
+        self.pattern = pattern
+        self.regex = regex
+        self.re = compile_pattern(pattern, regex, ignore_case)
+
+    def spans(self, line: str) -> list[tuple[int, int]]:
+        """Matches in line, as (start, end)."""
+        return [m.span() for m in self.re.finditer(line) if m.end() > m.start()]
+
+    def first(self, line: str, col: int = 0) -> tuple[int, int] | None:
+        """First match in line at or after col, as (start, end)."""
+        for m in self.re.finditer(line, col):
+            if m.end() > m.start():
+                return m.span()
+        return None
+
+    def scan(self, lines: Sequence[str], line: int, col: int, count: int) -> tuple[int, int, int] | None:
+        """Look for the first match from line, col on, in count lines (after the last one,
+        the first one follows). Return its (line, start, end), or None if there is none."""
+        n = len(lines)
+        if not n:
+            return None
+        for i in range(line, line + count):
+            i %= n
+            span = self.first(lines[i], col)
+            if span:
+                return (i,) + span
+            col = 0
+        return None
+
+    def replace(self, line: str, repl: str) -> tuple[str, int]:
+        """Replace matches in line with repl (which can refer to regex groups), return the new line and their number."""
+        if not self.regex:
+            # Plain pattern can't match empty
+            return self.re.subn(repl.replace("\\", "\\\\"), line)
+        count = 0
+
+        def sub(m: re.Match) -> str:
+            nonlocal count
+            if m.end() == m.start():
+                return ""
+            count += 1
+            return m.expand(repl)
+
+        return self.re.sub(sub, line), count
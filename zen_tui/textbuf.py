@@ -0,0 +1,305 @@
+"""Text buffer module.
+
+Editor keeps text as a sequence of lines, in an object of Editor.buffer_class.
+It uses only len(), iteration, indexing, and item and slice assignment, so any
+mutable sequence works, e.g. list for widgets which don't edit their lines.
+
+PieceTable is the default. Inserting or deleting lines in a list moves all the
+lines after them, which stalls on large files. PieceTable keeps the lines as
+pieces - runs of lines in the original sequence or in the list of lines added
+since - in a balanced tree indexed by line number, so getting, replacing,
+inserting and deleting lines costs O(log number of pieces).
+
+MappedLines is a read-only sequence of the lines of a file, mapped into
+memory, for PieceTable to start with: lines are read and decoded only when
+got, and the file is indexed in slices (see Editor.load_file()).
+"""
+
+from __future__ import annotations
+
+import bisect
+import itertools
+import mmap
+import random
+from array import array
+from collections import OrderedDict
+from collections.abc import MutableSequence, Sequence as SequenceABC
+from typing import Iterable, Iterator, Sequence
+
+
+class _Piece:
+    """Tree node: run of count lines from lines[start:], and the subtree size in lines."""
+
+    __slots__ = ("lines", "start", "count", "total", "prio", "left", "right")
+
+    def __init__(self, lines: Sequence, start: int, count: int, prio: float | None = None) -> None:
+        self.lines = lines
+        self.start = start
+        self.count = count
+        self.total = count
+        # Treap priority, keeps the tree balanced on average
+        self.prio = random.random() if prio is None else prio
+        self.left: _Piece | None = None
+        self.right: _Piece | None = None
+
+    def update(self) -> None:
+        self.total = self.count + (self.left.total if self.left else 0) + (self.right.total if self.right else 0)
+
+
+def _split(node: _Piece | None, k: int) -> tuple[_Piece | None, _Piece | None]:
+    """Split tree into trees with the first k lines, and the rest."""
+    if node is None:
+        return None, None
+    left = node.left.total if node.left else 0
+    if k <= left:
+        a, b = _split(node.left, k)
+        node.left = b
+        node.update()
+        return a, node
+    if k >= left + node.count:
+        a, b = _split(node.right, k - left - node.count)
+        node.right = a
+        node.update()
+        return node, b
+    # Cut inside this piece, the tail goes right with the same priority
+    cut = k - left
+    tail = _Piece(node.lines, node.start + cut, node.count - cut, node.prio)
+    tail.right = node.right
+    tail.update()
+    node.count = cut
+    node.right = None
+    node.update()
+    return node, tail
+
+
+def _merge(a: _Piece | None, b: _Piece | None) -> _Piece | None:
+    """Join trees, all lines of a go before those of b."""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    if a.prio > b.prio:
+        a.right = _merge(a.right, b)
+        a.update()
+        return a
+    b.left = _merge(a, b.left)
+    b.update()
+    return b
+
+
+class PieceTable(MutableSequence):
+    """Mutable sequence of lines, stored as pieces of the original lines and of added ones.
+
+    The original lines aren't copied (e.g. they may be read from a file on
+    demand, see MappedLines) and must not change. Lines which are added or
+    replaced go to a separate list, and are replaced in it directly if
+    edited again, so typing on a line doesn't add pieces.
+    """
+
+    def __init__(self, lines: Sequence = ()) -> None:
+        self._original = lines
+        self._original_len = len(lines)
+        self._added: list = []
+        self._root = self._append(None, lines, 0, self._original_len)
+
+    def __len__(self) -> int:
+        return self._root.total if self._root else 0
+
+    def _index(self, i: int) -> int:
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("PieceTable index out of range")
+        return i
+
+    def _find(self, i: int) -> tuple[_Piece, int]:
+        """Piece with line i, and offset of the line in it."""
+        node = self._root
+        while True:
+            left = node.left.total if node.left else 0
+            if i < left:
+                node = node.left
+            elif i < left + node.count:
+                return node, i - left
+            else:
+                i -= left + node.count
+                node = node.right
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        node, off = self._find(self._index(i))
+        return node.lines[node.start + off]
+
+    def __setitem__(self, i, value) -> None:
+        if isinstance(i, slice):
+            start, stop, step = i.indices(len(self))
+            if step != 1:
+                raise ValueError("PieceTable supports only contiguous slices")
+            self._replace(start, max(stop, start), value)
+            return
+        i = self._index(i)
+        node, off = self._find(i)
+        if node.lines is self._added:
+            self._added[node.start + off] = value
+        else:
+            self._replace(i, i + 1, (value,))
+
+    def __delitem__(self, i) -> None:
+        if isinstance(i, slice):
+            self[i] = ()
+        else:
+            i = self._index(i)
+            self._replace(i, i + 1, ())
+
+    def insert(self, i: int, value) -> None:
+        i = min(max(i + len(self) if i < 0 else i, 0), len(self))
+        self._replace(i, i, (value,))
+
+    def _replace(self, start: int, stop: int, lines: Iterable) -> None:
+        """Replace lines [start, stop) with lines."""
+        head, rest = _split(self._root, start)
+        _, tail = _split(rest, stop - start)
+        added = self._added
+        pos = len(added)
+        added.extend(lines)
+        self._root = _merge(self._append(head, added, pos, len(added) - pos), tail)
+
+    def grow(self, count: int) -> None:
+        """Append the next count lines of the original sequence, after it got longer (see MappedLines)."""
+        pos = self._original_len
+        self._original_len += count
+        self._root = self._append(self._root, self._original, pos, count)
+
+    @staticmethod
+    def _append(head: _Piece | None, lines: Sequence, pos: int, count: int) -> _Piece | None:
+        """Append lines[pos:pos + count] to tree head, return the resulting tree."""
+        if not count:
+            return head
+        last = head
+        while last and last.right:
+            last = last.right
+        if not (last and last.lines is lines and last.start + last.count == pos):
+            return _merge(head, _Piece(lines, pos, count))
+        # Lines follow the last piece, e.g. with Enter pressed repeatedly, so it's
+        # extended, along with sizes of the subtrees it's in
+        node = head
+        while node:
+            node.total += count
+            if node.right is None:
+                node.count += count
+            node = node.right
+        return head
+
+    def __iter__(self) -> Iterator:
+        stack = []
+        node = self._root
+        while stack or node:
+            while node:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield from node.lines[node.start:node.start + node.count]
+            node = node.right
+
+    def pieces(self) -> int:
+        """Number of pieces the lines are stored in."""
+        stack = [self._root] if self._root else []
+        count = 0
+        while stack:
+            node = stack.pop()
+            count += 1
+            stack.extend(n for n in (node.left, node.right) if n)
+        return count
+
+
+class MappedLines(SequenceABC):
+    """Lines of a file, mapped into memory and indexed on demand.
+
+    The index is a newline count per block of the file, so it takes 8 bytes
+    per 64K. Lines are found by splitting the block they are in, the most
+    recently used blocks are kept split. Only indexed lines are counted by
+    len(), index_more() indexes the next part of the file, and complete
+    tells if it's all indexed. Lines end with "\n" or "\r\n", and are
+    decoded as UTF-8 when got.
+    """
+
+    block_size = 1 << 16
+    # Bytes indexed by one index_more() call
+    index_chunk = 1 << 22
+    # Blocks kept split into lines
+    cached_blocks = 8
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as f:
+            try:
+                self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty file can't be mapped
+                self._data = b""
+        self._size = len(self._data)
+        # Last line doesn't end with a newline
+        self._unterminated = bool(self._size) and self._data[self._size - 1:] != b"\n"
+        # Newlines before each indexed block, and in all of them
+        self._counts = array("q", [0])
+        self._indexed = 0
+        # Block number -> offsets in it just past each newline
+        self._blocks: OrderedDict[int, list[int]] = OrderedDict()
+        # Index at least as much as fits on the first screen
+        self.index_more()
+
+    @property
+    def complete(self) -> bool:
+        return self._indexed == self._size
+
+    def index_more(self, size: int | None = None) -> None:
+        """Index the next size (default index_chunk) bytes of the file."""
+        end = min(self._indexed + (size or self.index_chunk), self._size)
+        data, counts, block_size = self._data, self._counts, self.block_size
+        pos = self._indexed
+        while pos < end:
+            counts.append(counts[-1] + data[pos:pos + block_size].count(b"\n"))
+            pos = min(pos + block_size, self._size)
+        self._indexed = pos
+
+    def __len__(self) -> int:
+        count = self._counts[-1]
+        if self._unterminated and self.complete:
+            count += 1
+        return count
+
+    def _block(self, b: int) -> list[int]:
+        blocks = self._blocks
+        ends = blocks.get(b)
+        if ends is None:
+            data = self._data[b * self.block_size:(b + 1) * self.block_size]
+            ends = list(itertools.accumulate(len(part) + 1 for part in data.split(b"\n")[:-1]))
+            blocks[b] = ends
+            if len(blocks) > self.cached_blocks:
+                blocks.popitem(last=False)
+        else:
+            blocks.move_to_end(b)
+        return ends
+
+    def _newline(self, k: int) -> int:
+        """Offset of newline k (counting from 0), or the file size if there are only k newlines."""
+        counts = self._counts
+        if k >= counts[-1]:
+            return self._size
+        b = bisect.bisect_right(counts, k) - 1
+        return b * self.block_size + self._block(b)[k - counts[b]] - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("MappedLines index out of range")
+        start = self._newline(i - 1) + 1 if i else 0
+        line = self._data[start:self._newline(i)]
+        if line.endswith(b"\r"):
+            line = line[:-1]
+        return line.decode("utf-8", "replace")
@@ -0,0 +1,122 @@
+"""Undo module.
+
+Edits are journaled as records of what changed: at position (line, col),
+text removed was replaced with text inserted ("\n" separates lines). Undo
+replaces inserted with removed, redo does the opposite, so history costs
+only the size of the changed text, however large the buffer is. Edits made
+together (e.g. by replace all) are undone and redone together.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+
+
+class Edit:
+    """Journal record: at line, col, removed text was replaced with inserted."""
+
+    __slots__ = ("line", "col", "removed", "inserted")
+
+    def __init__(self, line: int, col: int, removed: str, inserted: str) -> None:
+        self.line = line
+        self.col = col
+        self.removed = removed
+        self.inserted = inserted
+
+    def size(self) -> int:
+        return len(self.removed) + len(self.inserted) + UndoJournal.record_overhead
+
+    def merge(self, line: int, col: int, removed: str, inserted: str) -> bool:
+        """Merge edit which continues this one on the same line (typing, backspacing, deleting), return False if it doesn't."""
+        if line != self.line or "\n" in removed + inserted + self.removed + self.inserted:
+            return False
+        if not removed and not self.removed and col == self.col + len(self.inserted):
+            self.inserted += inserted
+        elif not inserted and not self.inserted and col + len(removed) == self.col:
+            self.col = col
+            self.removed = removed + self.removed
+        elif not inserted and not self.inserted and col == self.col:
+            self.removed += removed
+        else:
+            return False
+        return True
+
+
+class UndoJournal:
+    """Undo and redo history, oldest edits are dropped when it grows past max_size.
+
+    Edits recorded one after another merge into one (e.g. typing a word),
+    until seal() is called (e.g. on cursor movement).
+    """
+
+    # Size of a record besides its text, in characters
+    record_overhead = 64
+
+    def __init__(self, max_size: int = 1 << 20) -> None:
+        # Approximate limit, in characters of changed text
+        self.max_size = max_size
+        # Groups of edits, undone together
+        self._undo: deque[list[Edit]] = deque()
+        self._redo: list[list[Edit]] = []
+        self._size = 0
+        self._open = False
+        # Changes on each edit, undo and redo, to tell if the text changed
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self._undo)
+
+    def record(self, line: int, col: int, removed: str, inserted: str) -> None:
+        """Record that at line, col, removed text was replaced with inserted."""
+        undo = self._undo
+        if self._open and undo and len(undo[-1]) == 1:
+            self.version += 1
+            self._redo.clear()
+            last = undo[-1][0]
+            size = last.size()
+            if last.merge(line, col, removed, inserted):
+                self._size += last.size() - size
+                self._evict()
+                return
+        self.record_group([Edit(line, col, removed, inserted)])
+        self._open = True
+
+    def record_group(self, edits: list[Edit]) -> None:
+        """Record edits made one after another, to be undone together."""
+        self.version += 1
+        self._redo.clear()
+        self._undo.append(edits)
+        self._size += sum(edit.size() for edit in edits)
+        self._open = False
+        self._evict()
+
+    def _evict(self) -> None:
+        undo = self._undo
+        while self._size > self.max_size and undo:
+            self._size -= sum(edit.size() for edit in undo.popleft())
+
+    def seal(self) -> None:
+        """Make the next edit a separate record."""
+        self._open = False
+
+    def undo(self) -> list[Edit]:
+        """Take the last edits to undo (to be reverted last first), empty if there are none."""
+        self._open = False
+        if not self._undo:
+            return []
+        self.version += 1
+        edits = self._undo.pop()
+        self._size -= sum(edit.size() for edit in edits)
+        self._redo.append(edits)
+        return edits
+
+    def redo(self) -> list[Edit]:
+        """Take the last undone edits to do again, empty if there are none."""
+        self._open = False
+        if not self._redo:
+            return []
+        self.version += 1
+        edits = self._redo.pop()
+        self._undo.append(edits)
+        self._size += sum(edit.size() for edit in edits)
+        return edits
@@ -0,0 +1,293 @@
+"""Virtual terminal module.
+
+Minimal VT100/xterm emulator, which parses the escape stream zen_tui emits
+into a grid of cells. Used by the headless backend to run widgets without a
+real terminal, and to assert on what they render. Like in the back buffer,
+wide characters take two cells, the second one "".
+"""
+
+from __future__ import annotations
+
+import codecs
+from unicodedata import combining, east_asian_width
+
+from .backbuf import ATTR_BG_INTENSE, ATTR_BG_SHIFT, ATTR_BOLD, ATTR_DEFAULT, BG_DEFAULT, FG_DEFAULT
+
+
+class VTerm:
+    """Virtual terminal screen."""
+
+    def __init__(self, width: int = 80, height: int = 24, modes: tuple[int, ...] = ()) -> None:
+        self.width = width
+        self.height = height
+        self.chars = [[" "] * width for _ in range(height)]
+        self.attrs = [[ATTR_DEFAULT] * width for _ in range(height)]
+        self.x = 0
+        self.y = 0
+        self.attr = ATTR_DEFAULT
+        self.cursor_on = True
+        # Cursor is past the last column, next character wraps
+        self.wrap_pending = False
+        # Scroll region and left/right margins
+        self.top = 0
+        self.bottom = height - 1
+        self.left = 0
+        self.right = width - 1
+        # DEC private modes which were set/reset
+        self.private_modes: dict[int, bool] = {}
+        # DEC private modes reported as supported to DECRQM, in addition to those set/reset
+        self.supported_modes = set(modes)
+        # Replies to queries, which the terminal would send as input
+        self.replies = bytearray()
+        self._pending = b""
+        self._decoder = codecs.getincrementaldecoder("utf-8")("replace")
+
+    def text(self) -> list[str]:
+        """Screen contents as lines of text."""
+        return ["".join(row) for row in self.chars]
+
+    def resize(self, width: int, height: int) -> None:
+        """Change screen size, keeping what still fits (without reflow)."""
+        self.chars = [(row + [" "] * width)[:width] for row in self.chars[:height]]
+        self.attrs = [(row + [ATTR_DEFAULT] * width)[:width] for row in self.attrs[:height]]
+        for _ in range(height - len(self.chars)):
+            self.chars.append([" "] * width)
+            self.attrs.append([ATTR_DEFAULT] * width)
+        self.width = width
+        self.height = height
+        self.x = min(self.x, width - 1)
+        self.y = min(self.y, height - 1)
+        self.wrap_pending = False
+        self.top = self.left = 0
+        self.bottom = height - 1
+        self.right = width - 1
+
+    def line(self, y: int) -> str:
+        return "".join(self.chars[y])
+
+    def take_replies(self) -> bytes:
+        res = bytes(self.replies)
+        self.replies.clear()
+        return res
+
+    def write(self, data: bytes) -> None:
+        """Process output from the application."""
+        data = self._pending + data
+        self._pending = b""
+        i = 0
+        n = len(data)
+        while i < n:
+            b = data[i]
+            if b == 0x1B:
+                end = self._escape(data, i)
+                if end < 0:
+                    self._pending = data[i:]
+                    return
+                i = end
+            elif b < 0x20 or b == 0x7F:
+                self._control(b)
+                i += 1
+            else:
+                j = i + 1
+                while j < n and data[j] >= 0x20 and data[j] not in (0x1B, 0x7F):
+                    j += 1
+                for c in self._decoder.decode(data[i:j]):
+                    self._put(c)
+                i = j
+
+    def _put(self, c: str) -> None:
+        row = self.chars[self.y]
+        if combining(c) and (self.x or self.wrap_pending):
+            # Joins the character before it
+            x = self.x if self.wrap_pending else self.x - 1
+            if not row[x] and x:
+                x -= 1
+            row[x] += c
+            return
+        wide = east_asian_width(c) in "WF"
+        if self.wrap_pending or wide and self.x == self.width - 1:
+            self.wrap_pending = False
+            self.x = self.left
+            self._linefeed()
+            row = self.chars[self.y]
+        x = self.x
+        end = x + 2 if wide else x + 1
+        self._erase_halves(row, x, end)
+        row[x:end] = [c, ""] if wide else [c]
+        self.attrs[self.y][x:end] = [self.attr] * (end - x)
+        if end == self.width:
+            self.x = self.width - 1
+            self.wrap_pending = True
+        else:
+            self.x = end
+
+    def _erase_halves(self, row: list[str], x1: int, x2: int) -> None:
+        """Blank halves of wide characters left outside of cells [x1, x2) when they change."""
+        if x1 >= x2:
+            return
+        if x1 and not row[x1]:
+            row[x1 - 1] = " "
+        if x2 < self.width and not row[x2]:
+            row[x2] = " "
+
+    def _control(self, b: int) -> None:
+        self.wrap_pending = False
+        if b == 0x0D:
+            self.x = self.left if self.x >= self.left else 0
+        elif b == 0x0A:
+            self._linefeed()
+        elif b == 0x08:
+            if self.x > 0:
+                self.x -= 1
+        elif b == 0x09:
+            self.x = min((self.x // 8 + 1) * 8, self.width - 1)
+
+    def _linefeed(self) -> None:
+        if self.y == self.bottom:
+            self._scroll(1)
+        elif self.y < self.height - 1:
+            self.y += 1
+
+    def _scroll(self, n: int) -> None:
+        """Scroll region up by n lines (down if n < 0)."""
+        left, right = self.left, self.right + 1
+        w = right - left
+        for grid, blank in ((self.chars, " "), (self.attrs, self.attr)):
+            rows = [row[left:right] for row in grid[self.top:self.bottom + 1]]
+            n = max(-len(rows), min(n, len(rows)))
+            if n > 0:
+                rows = rows[n:] + [[blank] * w for _ in range(n)]
+            else:
+                rows = [[blank] * w for _ in range(-n)] + rows[:len(rows) + n]
+            for i, part in enumerate(rows):
+                grid[self.top + i][left:right] = part
+
+    def _erase(self, y: int, x1: int, x2: int) -> None:
+        self._erase_halves(self.chars[y], x1, x2)
+        self.chars[y][x1:x2] = [" "] * (x2 - x1)
+        self.attrs[y][x1:x2] = [self.attr] * (x2 - x1)
+
+    def _escape(self, data: bytes, i: int) -> int:
+        """Process escape sequence at data[i], return index after it or -1 if incomplete."""
+        if i + 1 >= len(data):
+            return -1
+        if data[i + 1] != ord("["):
+            # Two-byte escapes aren't used by zen_tui, skip
+            return i + 2
+        j = i + 2
+        while j < len(data) and 0x30 <= data[j] <= 0x3F:
+            j += 1
+        params = data[i + 2:j].decode()
+        k = j
+        while k < len(data) and 0x20 <= data[k] <= 0x2F:
+            k += 1
+        if k >= len(data):
+            return -1
+        inter = data[j:k].decode()
+        self._csi(params, inter, chr(data[k]))
+        return k + 1
+
+    def _csi(self, params: str, inter: str, final: str) -> None:
+        private = params.startswith("?")
+        args = [int(p) if p.isdigit() else 0 for p in params.lstrip("?").split(";")] if params.lstrip("?") else []
+
+        def arg(idx, default=1):
+            return args[idx] if idx < len(args) and args[idx] else default
+
+        if final not in "mhlp":
+            self.wrap_pending = False
+        if private:
+            if final in "hl":
+                for mode in args:
+                    on = final == "h"
+                    self.private_modes[mode] = on
+                    if mode == 25:
+                        self.cursor_on = on
+            elif final == "p" and inter == "$":
+                mode = arg(0, 0)
+                if mode in self.private_modes:
+                    value = 1 if self.private_modes[mode] else 2
+                else:
+                    value = 2 if mode in self.supported_modes else 0
+                self.replies += f"\x1b[?{mode};{value}$y".encode()
+            return
+        if final in "Hf":
+            self.y = min(arg(0), self.height) - 1
+            self.x = min(arg(1), self.width) - 1
+        elif final == "A":
+            self.y = max(self.y - arg(0), 0)
+        elif final == "B":
+            self.y = min(self.y + arg(0), self.height - 1)
+        elif final == "C":
+            self.x = min(self.x + arg(0), self.width - 1)
+        elif final == "D":
+            self.x = max(self.x - arg(0), 0)
+        elif final == "J":
+            mode = arg(0, 0)
+            if mode == 0:
+                self._erase(self.y, self.x, self.width)
+                rows = range(self.y + 1, self.height)
+            elif mode == 1:
+                self._erase(self.y, 0, self.x + 1)
+                rows = range(0, self.y)
+            else:
+                rows = range(self.height)
+            for y in rows:
+                self._erase(y, 0, self.width)
+        elif final == "K":
+            mode = arg(0, 0)
+            if mode == 0:
+                self._erase(self.y, self.x, self.width)
+            elif mode == 1:
+                self._erase(self.y, 0, self.x + 1)
+            else:
+                self._erase(self.y, 0, self.width)
+        elif final == "X":
+            self._erase(self.y, self.x, min(self.x + arg(0), self.width))
+        elif final == "m":
+            self._sgr(args or [0])
+        elif final == "r":
+            self.top = arg(0) - 1
+            self.bottom = arg(1, self.height) - 1
+            self.x = self.y = 0
+        elif final == "s" and self.private_modes.get(69):
+            self.left = arg(0) - 1
+            self.right = arg(1, self.width) - 1
+            self.x = self.y = 0
+        elif final == "S":
+            self._scroll(arg(0))
+        elif final == "T":
+            self._scroll(-arg(0))
+        elif final == "n" and arg(0, 0) == 6:
+            self.replies += f"\x1b[{self.y + 1};{self.x + 1}R".encode()
+        elif final == "c" and arg(0, 0) == 0:
+            # VT220 with ANSI color
+            self.replies += b"\x1b[?62;22c"
+
+    def _sgr(self, args: list[int]) -> None:
+        attr = self.attr
+        for p in args:
+            if p == 0:
+                attr = ATTR_DEFAULT
+            elif p == 1:
+                attr |= ATTR_BOLD
+            elif p == 22:
+                attr &= ~ATTR_BOLD
+            elif 30 <= p <= 37 or p == 39:
+                attr = attr & ~0xF | (p - 30)
+            elif 40 <= p <= 47 or p == 49:
+                attr = attr & ~(0xF << ATTR_BG_SHIFT | ATTR_BG_INTENSE) | (p - 40) << ATTR_BG_SHIFT
+            elif 100 <= p <= 107:
+                attr = attr & ~(0xF << ATTR_BG_SHIFT) | (p - 100) << ATTR_BG_SHIFT | ATTR_BG_INTENSE
+        self.attr = attr
+
+    def colors_at(self, x: int, y: int) -> tuple[int, int]:
+        """Foreground and background color of a cell (FG_DEFAULT/BG_DEFAULT if default)."""
+        attr = self.attrs[y][x]
+        fg = attr & 0xF
+        if fg != FG_DEFAULT and attr & ATTR_BOLD:
+            fg += 8
+        bg = attr >> ATTR_BG_SHIFT & 0xF
+        if bg != BG_DEFAULT and attr & ATTR_BG_INTENSE:
+            bg += 8
+        return fg, bg
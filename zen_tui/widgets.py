@@ -60,6 +60,13 @@ class Dialog(Widget):
         self.childs.append(widget)
         widget.owner = self
 
+    def set_xy(self, x: int, y: int) -> None:
+        # Children are at screen coordinates, move them along
+        dx, dy = x - self.x, y - self.y
+        for w in self.childs:
+            w.set_xy(w.x + dx, w.y + dy)
+        super().set_xy(x, y)
+
     def autosize(self, extra_w: int=0, extra_h: int=0):
         w = 0
         h = 0
@@ -77,14 +84,21 @@ class Dialog(Widget):
             if self.focus_w:
                 self.focus_w.focus = True
 
-        # Redraw widgets with cursor off
-        self.cursor(on=False)
-        self.dialog_box(self.x, self.y, self.w, self.h, self.title)
-        for w in self.childs:
-            w.redraw()
-        # Then give widget in focus a chance to enable cursor
+        with self.frame():
+            # Redraw widgets with cursor off
+            self.cursor(on=False)
+            self.dialog_box(self.x, self.y, self.w, self.h, self.title)
+            for w in self.childs:
+                w.redraw()
+            # Then give widget in focus a chance to enable cursor
+            self.set_cursor()
+
+    def set_cursor(self):
+        # Cursor belongs to the widget in focus
         if self.focus_w:
             self.focus_w.set_cursor()
+        else:
+            super().set_cursor()
 
     def find_focusable_by_idx(self, from_idx, direction):
         sz = len(self.childs)
@@ -107,11 +121,10 @@ class Dialog(Widget):
             return
         if self.focus_w:
             self.focus_w.focus = False
-            self.focus_w.redraw()
+            self.focus_w.invalidate()
         self.focus_w = widget
         widget.focus = True
-        widget.redraw()
-        widget.set_cursor()
+        widget.invalidate()
 
     def move_focus(self, direction):
         prev_idx = (self.focus_idx + direction) % len(self.childs)
@@ -140,6 +153,21 @@ class Dialog(Widget):
                 return res
         return None
 
+    def handle_paste(self, text: str) -> bool | int | None:
+        if self.focus_w:
+            return self.focus_w.handle_paste(text)
+        return None
+
+    def handle_mouse_event(self, ev):
+        # Wheel scrolls the widget under the pointer, without moving focus
+        if ev.action == ev.WHEEL:
+            _idx, w = self.find_focusable_by_xy(ev[0], ev[1])
+        else:
+            w = self.focus_w
+        if w:
+            return w.handle_mouse_event(ev)
+        return None
+
     def handle_mouse(self, x, y):
         # Work in absolute coordinates
         if self.inside(x, y):
@@ -248,7 +276,7 @@ class WCheckbox(ChoiceWidget):
 
     def flip(self):
         self.choice = not self.choice
-        self.redraw()
+        self.invalidate()
         self.signal("changed")
 
     def handle_mouse(self, _x, _y):
@@ -286,7 +314,7 @@ class WRadioButton(ItemSelWidget):
 
     def handle_mouse(self, _x, y):
         self.choice = y - self.y
-        self.redraw()
+        self.invalidate()
         self.signal("changed")
 
     def handle_key(self, key) -> bool | int | None:
@@ -300,6 +328,9 @@ class WRadioButton(ItemSelWidget):
 class WListBox(EditorExt, ChoiceWidget):
     """ WListBox Widget class."""
 
+    # Items aren't edited, and may be of any type
+    buffer_class = list
+
     def __init__(self, w: int, h: int, items: list[str]):
         EditorExt.__init__(self)
         ChoiceWidget.__init__(self, 0)
@@ -307,12 +338,14 @@ class WListBox(EditorExt, ChoiceWidget):
         self.w = w
         self.height = h
         self.h = h
-        self.set_items(items)
+        self.items = items
+        self.set_lines(items)
         self.focus = False
 
     def set_items(self, items):
         self.items = items
         self.set_lines(items)
+        self.invalidate()
 
     def render_line(self, line) -> str:
         # Default identity implementation is suitable for
@@ -333,23 +366,41 @@ class WListBox(EditorExt, ChoiceWidget):
         if hlite:
             self.attr_reset()
 
+    def move_highlight(self, prev_line: int) -> None:
+        # Only the lines losing and getting highlight need redraw
+        self.choice = self.cur_line
+        if self.cur_line != prev_line:
+            self.invalidate_line(prev_line)
+            self.invalidate_line(self.cur_line)
+
     def handle_mouse(self, x, y):
+        prev_line = self.cur_line
         res = super().handle_mouse(x, y)
-        self.choice = self.cur_line
-        self.redraw()
+        self.move_highlight(prev_line)
         self.signal("changed")
         return res
 
     def handle_key(self, key) -> bool | int | None:
+        prev_line = self.cur_line
         res = super().handle_key(key)
-        self.choice = self.cur_line
-        self.redraw()
+        self.move_highlight(prev_line)
         self.signal("changed")
         return res
 
+    def handle_mouse_event(self, ev):
+        prev_line = self.cur_line
+        res = super().handle_mouse_event(ev)
+        if self.cur_line != prev_line:
+            self.move_highlight(prev_line)
+            self.signal("changed")
+        return res
+
     def handle_edit_key(self, key):
         pass
 
+    def handle_paste(self, _text: str) -> bool | int | None:
+        return None
+
     def set_cursor(self) -> None:
         Widget.set_cursor(self)
 
@@ -361,6 +412,7 @@ class WListBox(EditorExt, ChoiceWidget):
 class WPopupList(Dialog):
     """ WPopupList Widget class."""
 
+    save_under = True
     main_widget: EditableWidget | None = None
     class OneShotList(WListBox):
         """OneShotList Widget class."""
@@ -420,20 +472,24 @@ class WDropDown(ChoiceWidget):
 
     def handle_mouse(self, _x, _y):
         popup = WPopupList(self.x, self.y + 1, self.w, self.dropdown_h, self.items, self.choice)
-        res = popup.loop()
-        if res == ACTION_OK:
-            self.choice = popup.get_choice()
-            self.signal("changed")
-        self.owner.redraw()
+
+        def done(res):
+            if res == ACTION_OK:
+                self.choice = popup.get_choice()
+                self.signal("changed")
+                self.invalidate()
+
+        return self.popup(popup, done)
 
     def handle_key(self, _key) -> bool | int | None:
-        self.handle_mouse(0, 0)
-        return None
+        return self.handle_mouse(0, 0)
 
 
 class WTextEntry(EditorExt, EditableWidget):
     """WTextEntry Widget class."""
 
+    single_line = True
+
     def __init__(self, w: int, text: str):
         super(EditorExt, self).__init__(self, width=w, height=1)
         # super(EditableWidget, self).__init__()
@@ -456,7 +512,7 @@ class WTextEntry(EditorExt, EditableWidget):
         if super().handle_cursor_keys(key):
             if self.just_started:
                 self.just_started = False
-                self.redraw()
+                self.invalidate()
             return True
         return False
 
@@ -464,7 +520,7 @@ class WTextEntry(EditorExt, EditableWidget):
         if key == Keys.KEY_ENTER:
             # Don't treat as editing key
             return True
-        if self.just_started:
+        if self.just_started and key not in (Keys.KEY_UNDO, Keys.KEY_REDO):
             if key != Keys.KEY_BACKSPACE:
                 # Overwrite initial string with new content
                 self.set_lines([""])
@@ -476,7 +532,7 @@ class WTextEntry(EditorExt, EditableWidget):
     def handle_mouse(self, x, y):
         if self.just_started:
             self.just_started = False
-            self.redraw()
+            self.invalidate()
         super().handle_mouse(x, y)
 
     def show_line(self, line: str, i):
@@ -508,7 +564,7 @@ class WMultiEntry(EditorExt, EditableWidget):
         self.set_lines(lines)
 
     def get(self):
-        return self.content
+        return list(self.content)
 
     def set(self, lines):
         self.set_lines(lines)
@@ -544,16 +600,19 @@ class WComboBox(WTextEntry):
         choices = self.get_choices(self.get())
         popup = self.popup_class(self.x, self.y + 1, self.longest(choices) + 2, self.popup_h, choices)
         popup.main_widget = self
-        res = popup.loop()
-        if res == ACTION_OK:
-            val = popup.get_selected_value()
-            if val is not None:
-                self.set_lines([val])
-                self.margin = 0
-                self.col = sys.maxsize
-                self.adjust_cursor_eol()
-                self.just_started = False
-        self.owner.redraw()
+
+        def done(res):
+            if res == ACTION_OK:
+                val = popup.get_selected_value()
+                if val is not None:
+                    self.set_lines([val])
+                    self.margin = 0
+                    self.col = sys.maxsize
+                    self.adjust_cursor_eol()
+                    self.just_started = False
+                    self.invalidate()
+
+        return self.popup(popup, done)
 
     def handle_key(self, key) -> bool | int | None:
         if key == Keys.KEY_DOWN:
@@ -584,7 +643,7 @@ class WCompletionList(WPopupList):
             self.list.top_line = 0
             self.list.cur_line = 0
             self.list.row = 0
-            self.list.redraw()
+            self.list.invalidate()
         chk.on("changed", is_prefix_changed)
         self.add(1, h - 1, chk)
 